@@ -11,33 +11,35 @@ Abstraction:  LangChain ChatModel
 # Why: Securely manages API keys and credentials without hardcoding them in the code
 from dotenv import load_dotenv
 
-# ChatHuggingFace - LangChain wrapper for Hugging Face chat models
-# Why: Provides a standardized interface for chat-based interactions
-# HuggingFaceEndpoint - Connects to Hugging Face Inference API endpoints
-# Why: Enables remote model inference without downloading large models locally
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+# metrics - Per-call latency, time-to-first-token and token counts (see common/metrics.py)
+# Why: The repo root is put on sys.path so the shared common/ package can be imported
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import metrics
+
+# chat_model() - Builds a named chat model from the shared factory in common/
+# Why: The model settings live in one place, and langchain_huggingface (which pulls in
+#      transformers/torch) is only imported when the model is first used
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
 
 # load_dotenv() - Loads environment variables from .env file into the environment
 # Why: Makes API keys available to the application securely
-load_dotenv()  
+load_dotenv()
 
-# HuggingFaceEndpoint() - Creates a connection to the Hugging Face Inference API
+# metrics.enable() - Records every model call made by this script
+# Why: One line; set CHAT_METRICS=0 to turn it off, CHAT_METRICS_JSON=file.json to export
+metrics.enable()
+
+# chat_model() - ChatHuggingFace around the Hugging Face Inference API
 # Why: Allows us to use powerful models hosted on Hugging Face servers
-# Parameters:
+# Settings ("qwen-72b" in common/model_factory.py):
 #   - repo_id: Specifies which model to use (Qwen 2.5 72B Instruct model)
 #   - task: Defines the task type (text-generation for chat/completion)
 #   - temperature: Controls randomness (0.7 for balanced creativity/coherence)
 #   - max_new_tokens: Limits response length (256 tokens for concise answers)
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.7,
-    max_new_tokens=256,
-)
-
-# ChatHuggingFace() - Wraps the HuggingFace endpoint for chat-based interactions
-# Why: Provides a LangChain-compatible interface with chat-specific methods like invoke()
-model = ChatHuggingFace(llm=llm)
+# TransportConfig() - Reuses warm HTTP connections for every call (common/http_transport.py)
+model = chat_model("qwen-72b", transport=TransportConfig())
 
 # model.invoke() - Sends a prompt to the model and gets a response
 # Why: This is the main method to interact with the chat model for one-off queries
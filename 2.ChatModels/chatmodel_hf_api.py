@@ -13,6 +13,13 @@ Abstraction:  No LangChain
 #      Useful when you want to use pure HF without LangChain dependencies
 from huggingface_hub import InferenceClient
 
+# install() - Shares one pooled keep-alive HTTP client across every HF call in this process
+# Why: Repeated chat_completion() calls reuse the open connection instead of a new TCP + TLS handshake
+#      TransportConfig sets pool size, keep-alive, per-host limits, timeouts and optional HTTP/2
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.http_transport import TransportConfig, install
+
 # load_dotenv() - Loads environment variables from .env file
 # Why: Securely manages API tokens without hardcoding them
 from dotenv import load_dotenv
@@ -30,6 +37,12 @@ load_dotenv()
 # Note: HF_TOKEN must be set in .env file
 hf_token = os.getenv("HF_TOKEN")
 
+# install() - Must run before the first request so the client picks up the pooled transport
+# Parameters:
+#   - max_connections: Upper bound on open sockets
+#   - read_timeout: Seconds to wait for the model's answer before giving up
+install(TransportConfig(max_connections=10, read_timeout=120))
+
 # InferenceClient() - Initializes the Hugging Face Inference client
 # Why: Creates authenticated connection to HF Inference API for making model requests
 # Parameters:
@@ -5,6 +5,12 @@
 #      Useful for offline usage, privacy, or avoiding API costs
 from langchain_huggingface import ChatHuggingFace , HuggingFacePipeline
 
+# metrics - Per-call latency, time-to-first-token and token counts (see common/metrics.py)
+# Why: The repo root is put on sys.path so the shared common/ package can be imported
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import metrics
+
 # load_dotenv() - Loads environment variables from .env file
 # Why: Even for local models, may need tokens for downloading model weights from HF Hub
 from dotenv import load_dotenv
@@ -17,6 +23,10 @@ import os
 # Why: Makes HF token available if needed for model downloads
 load_dotenv()
 
+# metrics.enable() - Records every model call made by this script
+# Why: One line; set CHAT_METRICS=0 to turn it off, CHAT_METRICS_JSON=file.json to export
+metrics.enable()
+
 # HuggingFacePipeline.from_model_id() - Downloads and loads a model locally
 # Why: Creates a local inference pipeline that runs the model on your machine
 #      This is different from API-based approaches - model runs entirely locally
@@ -51,4 +61,12 @@ answer = model.invoke(question)
 
 # print() - Displays the model's response
 # Why: Shows the complete response object (includes content and metadata)
-print(answer)
\ No newline at end of file
+print(answer)
+
+# Note: This script loads the model for a single prompt.
+# To serve many requests from one loaded copy of the model (with dynamic batching),
+# run `python local_inference_worker.py serve` and use LocalWorkerChatModel instead.
+# For multi-turn chats, KVCacheChatModel in kv_cache_chat.py keeps each session's
+# key/value cache between turns, so a turn only prefills the new message.
+# For summaries and extractions that copy from the prompt, PromptLookupChatModel in
+# prompt_lookup_decoding.py drafts tokens from the prompt and gives the same greedy output faster.
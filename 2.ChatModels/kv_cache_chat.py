@@ -0,0 +1,261 @@
+'''
+Local chat model that keeps each session's KV cache between turns
+
+With HuggingFacePipeline (chatmodel_hf_local.py) every turn of a multi-turn chat
+re-encodes the system prompt and the whole conversation before generating, so
+prefill gets slower every turn. KVCacheChatModel keeps the transformer's past
+key/values per session and, on the next turn, only prefills the tokens that are
+new since then (the user's message plus the chat template around it):
+
+    turn 1   [system, user1]                         prefill everything
+    turn 2   [system, user1, ai1, user2]             reuse system..ai1, prefill user2
+    trimmed  [system, user5, ai5, user6]             reuse system only, prefill the rest
+
+Reuse is decided by comparing token ids, never by trusting the message list: the
+cache is cropped to the longest common prefix of what it holds and the new
+prompt. A trimmed, summarized or edited history therefore invalidates exactly
+the part of the cache that no longer matches.
+
+Memory: every cached token costs 2 x layers x kv_heads x head_dim x dtype bytes
+(~24 KB for Qwen2.5-0.5B in float32). Sessions are evicted least recently used
+once max_cache_bytes or max_sessions is exceeded, and no session keeps more than
+max_session_tokens tokens.
+
+Usage:
+    model = KVCacheChatModel(model_id="Qwen/Qwen2.5-0.5B-Instruct")
+    result = model.invoke(chat_history.messages(), session_id="customer-12345")
+    print(result.response_metadata["kv_cache"])      # reused / prefilled tokens, seconds
+
+    python kv_cache_chat.py --turns 12                # per-turn latency, cached vs uncached
+'''
+import argparse
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+DEFAULT_MODEL_ID = "Qwen/Qwen2.5-0.5B-Instruct"
+
+# LangChain message type -> chat template role
+_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+@dataclass
+class _SessionCache:
+    token_ids: list[int]    # tokens whose keys/values are in `cache`, in order
+    cache: object           # transformers DynamicCache
+
+
+def common_prefix_length(a: list[int], b: list[int]) -> int:
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+class SessionKVCache:
+    """LRU map of session id -> past key/values, bounded by bytes and session count."""
+
+    def __init__(self, bytes_per_token: int, max_cache_bytes: int = 512 * 2**20, max_sessions: int = 64,
+                 max_session_tokens: int = 8192):
+        self.bytes_per_token = bytes_per_token
+        self.max_cache_bytes = max_cache_bytes
+        self.max_sessions = max_sessions
+        self.max_session_tokens = max_session_tokens
+        self._sessions: OrderedDict[str, _SessionCache] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def cached_tokens(self) -> int:
+        return sum(len(entry.token_ids) for entry in self._sessions.values())
+
+    @property
+    def cached_bytes(self) -> int:
+        return self.cached_tokens * self.bytes_per_token
+
+    def checkout(self, session: str) -> _SessionCache | None:
+        """Remove and return the session's cache; the caller owns it until checkin()."""
+        # Why: generate() mutates the cache in place, so two concurrent turns of one
+        #      session must never share it; the second one simply starts cold
+        with self._lock:
+            return self._sessions.pop(session, None)
+
+    def checkin(self, session: str, entry: _SessionCache) -> None:
+        if len(entry.token_ids) > self.max_session_tokens:
+            # Keep the oldest tokens: the system prompt and early turns are what the next turn reuses
+            entry.cache.crop(self.max_session_tokens)
+            entry.token_ids = entry.token_ids[:self.max_session_tokens]
+        with self._lock:
+            self._sessions[session] = entry
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions
+                                                or self.cached_bytes > self.max_cache_bytes):
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def drop(self, session: str) -> None:
+        with self._lock:
+            self._sessions.pop(session, None)
+
+
+class KVCacheChatModel(BaseChatModel):
+    """Greedy local chat model with per-session prefix KV-cache reuse.
+
+    Pass session_id to invoke(); calls without one share the "default" session.
+    """
+
+    model_id: str = DEFAULT_MODEL_ID
+    max_new_tokens: int = 256
+    max_cache_bytes: int = 512 * 2**20
+    max_sessions: int = 64
+    max_session_tokens: int = 8192
+    reuse_cache: bool = True
+    _state: dict = PrivateAttr(default_factory=dict)
+    _load_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "kv-cache-local"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_id": self.model_id, "max_new_tokens": self.max_new_tokens}
+
+    def _load(self) -> dict:
+        # Loaded on first call, so building the model object is instant
+        if not self._state:
+            with self._load_lock:
+                if not self._state:
+                    import torch
+                    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+                    model = AutoModelForCausalLM.from_pretrained(self.model_id)
+                    model.eval()
+                    config = model.config
+                    head_dim = getattr(config, "head_dim", None) or config.hidden_size // config.num_attention_heads
+                    kv_heads = getattr(config, "num_key_value_heads", None) or config.num_attention_heads
+                    element = torch.finfo(model.dtype).bits // 8
+                    bytes_per_token = 2 * config.num_hidden_layers * kv_heads * head_dim * element
+                    self._state.update(
+                        torch=torch,
+                        tokenizer=AutoTokenizer.from_pretrained(self.model_id),
+                        model=model,
+                        caches=SessionKVCache(bytes_per_token, self.max_cache_bytes, self.max_sessions,
+                                              self.max_session_tokens),
+                    )
+        return self._state
+
+    @property
+    def session_caches(self) -> SessionKVCache:
+        return self._load()["caches"]
+
+    def _generate(self, messages, stop=None, run_manager=None, session_id: str = "default", **kwargs) -> ChatResult:
+        state = self._load()
+        torch, tokenizer, model, caches = state["torch"], state["tokenizer"], state["model"], state["caches"]
+        from transformers import DynamicCache
+
+        chat = [{"role": _ROLES.get(m.type, m.type), "content": m.content} for m in messages]
+        prompt_ids = tokenizer.apply_chat_template(chat, add_generation_prompt=True, tokenize=True)
+        if not isinstance(prompt_ids, list):
+            prompt_ids = prompt_ids["input_ids"]
+
+        entry = caches.checkout(session_id) if self.reuse_cache else None
+        reused = 0
+        if entry is not None:
+            reused = common_prefix_length(entry.token_ids, prompt_ids)
+            # At least one prompt token must be fed to the model to produce the next-token logits
+            reused = min(reused, len(prompt_ids) - 1)
+            if reused == 0:
+                entry = None
+            elif reused < len(entry.token_ids):
+                # History diverged (trimmed, summarized or edited): keep only the part that still matches
+                entry.cache.crop(reused)
+        cache = entry.cache if entry is not None else DynamicCache()
+
+        input_ids = torch.tensor([prompt_ids])
+        max_new_tokens = kwargs.get("max_new_tokens", self.max_new_tokens)
+        start = time.perf_counter()
+        with torch.inference_mode():
+            # generate() sees the whole prompt but skips the positions already in the cache
+            output = model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=cache,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+            )
+        elapsed = time.perf_counter() - start
+
+        sequence = output[0].tolist()
+        new_tokens = sequence[len(prompt_ids):]
+        # The last generated token was never fed back, so the cache ends one token earlier
+        cached_length = cache.get_seq_length()
+        caches.checkin(session_id, _SessionCache(token_ids=sequence[:cached_length], cache=cache))
+
+        text = tokenizer.decode(new_tokens, skip_special_tokens=True)
+        if stop:
+            for marker in stop:
+                text = text.split(marker)[0]
+        stats = {
+            "session_id": session_id,
+            "prompt_tokens": len(prompt_ids),
+            "reused_tokens": reused,
+            "prefilled_tokens": len(prompt_ids) - reused,
+            "generated_tokens": len(new_tokens),
+            "seconds": elapsed,
+            "cached_sessions": len(caches),
+            "cached_bytes": caches.cached_bytes,
+        }
+        message = AIMessage(content=text, response_metadata={"kv_cache": stats, "model": self.model_id},
+                            usage_metadata={"input_tokens": len(prompt_ids), "output_tokens": len(new_tokens),
+                                            "total_tokens": len(prompt_ids) + len(new_tokens)})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def bench(turns: int, max_new_tokens: int, model_id: str) -> None:
+    """Replay the same growing conversation with and without cache reuse and print per-turn latency."""
+    questions = [f"Tell me one more fact about river number {i}, in two sentences." for i in range(turns)]
+    cached = KVCacheChatModel(model_id=model_id, max_new_tokens=max_new_tokens)
+    uncached = KVCacheChatModel(model_id=model_id, max_new_tokens=max_new_tokens, reuse_cache=False)
+    # Share the loaded weights between both modes
+    uncached._state.update(cached._load(), caches=SessionKVCache(cached.session_caches.bytes_per_token))
+
+    print(f"{'turn':>4} {'prompt':>7} {'prefill (cached)':>17} {'cached s':>9} {'uncached s':>11}")
+    for label, model in (("cached", cached), ("uncached", uncached)):
+        history = [SystemMessage(content="You are a helpful assistant.")]
+        timings = []
+        for question in questions:
+            history.append(HumanMessage(content=question))
+            result = model.invoke(history, session_id="bench")
+            history.append(AIMessage(content=result.content))
+            timings.append(result.response_metadata["kv_cache"])
+        if label == "cached":
+            cached_timings = timings
+        else:
+            for turn, (c, u) in enumerate(zip(cached_timings, timings), 1):
+                print(f"{turn:>4} {c['prompt_tokens']:>7} {c['prefilled_tokens']:>17} "
+                      f"{c['seconds']:>9.2f} {u['seconds']:>11.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--model-id", default=DEFAULT_MODEL_ID)
+    args = parser.parse_args()
+    bench(args.turns, args.max_new_tokens, args.model_id)
+
+
+if __name__ == "__main__":
+    main()
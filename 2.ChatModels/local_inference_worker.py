@@ -0,0 +1,303 @@
+'''
+Long-lived local inference worker with dynamic request batching
+
+chatmodel_hf_local.py loads Qwen2.5-0.5B-Instruct inside the script and answers a
+single prompt, so every request pays for a full model load. This module runs the
+model in ONE persistent process and lets any number of clients share it:
+
+    server:  loads the model once, accepts requests on a local socket, and groups
+             concurrent prompts into one padded batch (up to max_batch_size),
+             waiting at most max_wait_ms for a batch to fill up
+    client:  LocalWorkerChatModel, a LangChain chat model with the same
+             invoke() / batch() interface as ChatHuggingFace
+
+Batching is static per window: a batch runs to completion before the next one
+starts (continuous batching, where new requests join a running batch, is not
+implemented).
+
+The socket unpickles whatever a connected client sends, so the auth key is what
+stands between other local users and code execution in the worker. serve()
+takes it from $LOCAL_WORKER_AUTHKEY or generates a random one and writes it to
+~/.cache/local_inference_worker/authkey (mode 0600), which clients read back.
+
+Usage:
+    python local_inference_worker.py serve                      # terminal 1
+    python local_inference_worker.py ask "What is the capital of India ?"
+    python local_inference_worker.py bench --requests 64 --concurrency 16
+
+    model = LocalWorkerChatModel()
+    answer = model.invoke("What is the capital of India ?")
+'''
+# argparse - Command line interface for serve / ask / bench
+import argparse
+
+# logging - Reports failed replies without stopping the batching loop
+import logging
+
+# os / secrets - Auth key from the environment or a freshly generated one
+import os
+import secrets
+
+# queue / threading - Hand requests from connection threads to the batching loop
+# Why: Each client connection gets its own reader thread; one loop thread owns the model
+import queue
+import threading
+import time
+
+# multiprocessing.connection - Local socket with pickled messages and an auth key
+# Why: Standard library only, and it already frames messages for us
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+DEFAULT_ADDRESS = ("127.0.0.1", 6070)
+AUTHKEY_ENV = "LOCAL_WORKER_AUTHKEY"
+AUTHKEY_FILE = os.path.join(os.path.expanduser("~"), ".cache", "local_inference_worker", "authkey")
+DEFAULT_MODEL_ID = "Qwen/Qwen2.5-0.5B-Instruct"
+
+# LangChain message type -> chat template role
+_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+logger = logging.getLogger(__name__)
+
+
+def server_authkey(path: str = AUTHKEY_FILE) -> bytes:
+    """Key for serve(): $LOCAL_WORKER_AUTHKEY, else a new random key written to path with mode 0600."""
+    if os.environ.get(AUTHKEY_ENV):
+        return os.environ[AUTHKEY_ENV].encode()
+    key = secrets.token_hex(32).encode()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    # Created with 0600 from the start
+    # Why: Writing first and chmod-ing afterwards leaves a window where other users can read it
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def client_authkey(path: str = AUTHKEY_FILE) -> bytes:
+    """Key for clients: $LOCAL_WORKER_AUTHKEY, else the file written by serve()."""
+    if os.environ.get(AUTHKEY_ENV):
+        return os.environ[AUTHKEY_ENV].encode()
+    try:
+        if os.stat(path).st_mode & 0o077:
+            raise RuntimeError(f"{path} is readable by other users; delete it and restart the worker")
+        with open(path, "rb") as f:
+            key = f.read().strip()
+    except FileNotFoundError:
+        key = b""
+    if not key:
+        raise RuntimeError(f"No auth key: set ${AUTHKEY_ENV} or start the worker first (it writes {path})")
+    return key
+
+
+class InferenceWorker:
+    """Owns the model and turns queued chat requests into padded generate() batches."""
+
+    def __init__(self, model_id: str = DEFAULT_MODEL_ID, max_batch_size: int = 8,
+                 max_wait_ms: float = 20, max_new_tokens: int = 256):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        # Left padding: generated tokens are appended on the right of every row
+        # Why: With right padding, shorter prompts would continue after their pad tokens
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id, padding_side="left")
+        self.model = AutoModelForCausalLM.from_pretrained(model_id)
+        self.model.eval()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_new_tokens = max_new_tokens
+        self.requests = queue.Queue()
+        self.batches_run = 0
+
+    def submit(self, request: dict, reply) -> None:
+        """Queue one request; reply(response_dict) is called when it is done."""
+        self.requests.put((request, reply))
+
+    def _collect_batch(self) -> list:
+        # Block for the first request, then gather more until the batch is full
+        # or the wait window closes
+        # Why: Trades at most max_wait_ms of latency for much higher throughput
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run_forever(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            try:
+                texts = self._generate([request for request, _ in batch])
+                responses = [{"id": request["id"], "content": text} for (request, _), text in zip(batch, texts)]
+            except Exception as exc:  # noqa: BLE001 - report to every waiting client instead of dying
+                responses = [{"id": request["id"], "error": f"{type(exc).__name__}: {exc}"} for request, _ in batch]
+            for (_, reply), response in zip(batch, responses):
+                # One client hanging up must not kill the only thread that serves everyone
+                try:
+                    reply(response)
+                except Exception:  # noqa: BLE001
+                    logger.exception("could not deliver response %s", response.get("id"))
+            self.batches_run += 1
+
+    def _generate(self, requests: list[dict]) -> list[str]:
+        prompts = [
+            self.tokenizer.apply_chat_template(request["messages"], tokenize=False, add_generation_prompt=True)
+            for request in requests
+        ]
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        max_new_tokens = max(request.get("max_new_tokens") or self.max_new_tokens for request in requests)
+        with self.torch.inference_mode():
+            output = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+            )
+        # Strip the (padded) prompt from every row; per-request limits are applied after decoding
+        new_tokens = output[:, inputs["input_ids"].shape[1]:]
+        return [
+            self.tokenizer.decode(row[:request.get("max_new_tokens") or self.max_new_tokens], skip_special_tokens=True)
+            for request, row in zip(requests, new_tokens)
+        ]
+
+
+def serve(address=DEFAULT_ADDRESS, authkey: bytes | None = None, **worker_kwargs) -> None:
+    """Load the model once and serve requests until interrupted."""
+    authkey = authkey or server_authkey()
+    if not authkey:
+        raise RuntimeError(f"Refusing to start without an auth key (set ${AUTHKEY_ENV})")
+    worker = InferenceWorker(**worker_kwargs)
+    threading.Thread(target=worker.run_forever, daemon=True).start()
+
+    def handle(conn):
+        send_lock = threading.Lock()
+
+        def reply(response):
+            with send_lock:
+                conn.send(response)
+
+        try:
+            while True:
+                worker.submit(conn.recv(), reply)
+        except (EOFError, ConnectionResetError):
+            conn.close()
+
+    # A deep accept backlog
+    # Why: The default backlog of 1 silently stalls clients that connect at the same moment
+    with Listener(address, authkey=authkey, backlog=128) as listener:
+        print(f"Inference worker listening on {address[0]}:{address[1]}")
+        while True:
+            # accept() also runs the auth handshake
+            # Why: A port probe (EOFError) or a client with the wrong key (AuthenticationError)
+            #      must not end the loop and take the only worker down with it
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, OSError) as exc:
+                logger.warning("rejected connection: %s: %s", type(exc).__name__, exc)
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+class LocalWorkerChatModel(BaseChatModel):
+    """ChatHuggingFace-compatible client for a running InferenceWorker.
+
+    Each thread uses its own connection, so concurrent invoke()/batch() calls
+    reach the worker at the same time and can be batched together.
+    """
+
+    host: str = DEFAULT_ADDRESS[0]
+    port: int = DEFAULT_ADDRESS[1]
+    # None: read it with client_authkey() on first connect
+    authkey: bytes | None = None
+    max_new_tokens: int = 256
+    model_id: str = DEFAULT_MODEL_ID
+    _local: threading.local = PrivateAttr(default_factory=threading.local)
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-inference-worker"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_id": self.model_id, "max_new_tokens": self.max_new_tokens}
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "conn", None) is None:
+            local.conn = Client((self.host, self.port), authkey=self.authkey or client_authkey())
+            local.next_id = 0
+        return local
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        local = self._connection()
+        local.next_id += 1
+        request = {
+            "id": local.next_id,
+            "messages": [{"role": _ROLES.get(m.type, m.type), "content": m.content} for m in messages],
+            "max_new_tokens": kwargs.get("max_new_tokens", self.max_new_tokens),
+        }
+        try:
+            local.conn.send(request)
+            response = local.conn.recv()
+        except (EOFError, OSError):
+            # Drop the broken connection so the next call reconnects
+            local.conn = None
+            raise
+        if "error" in response:
+            raise RuntimeError(f"Inference worker failed: {response['error']}")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response["content"]))])
+
+
+def bench(n_requests: int, concurrency: int, port: int = DEFAULT_ADDRESS[1]) -> None:
+    """Fire n_requests prompts from `concurrency` threads and report requests/sec."""
+    model = LocalWorkerChatModel(port=port, max_new_tokens=32)
+    prompts = [f"Give one fact about the number {i}." for i in range(n_requests)]
+    start = time.perf_counter()
+    model.batch(prompts, config={"max_concurrency": concurrency})
+    elapsed = time.perf_counter() - start
+    print(f"{n_requests} requests, concurrency {concurrency}: {elapsed:.1f}s, {n_requests / elapsed:.2f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = sub.add_parser("serve")
+    serve_cmd.add_argument("--model-id", default=DEFAULT_MODEL_ID)
+    serve_cmd.add_argument("--max-batch-size", type=int, default=8)
+    serve_cmd.add_argument("--max-wait-ms", type=float, default=20)
+    serve_cmd.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1])
+    ask_cmd = sub.add_parser("ask")
+    ask_cmd.add_argument("question")
+    ask_cmd.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1])
+    bench_cmd = sub.add_parser("bench")
+    bench_cmd.add_argument("--requests", type=int, default=64)
+    bench_cmd.add_argument("--concurrency", type=int, default=16)
+    bench_cmd.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "serve":
+        serve((DEFAULT_ADDRESS[0], args.port), model_id=args.model_id,
+              max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    elif args.command == "ask":
+        print(LocalWorkerChatModel(port=args.port).invoke(args.question).content)
+    else:
+        bench(args.requests, args.concurrency, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+'''
+Prompt-lookup speculative decoding for the local Qwen model on CPU
+
+Summaries ("write a 5 line summary of the following report", ostrOutputParser.py)
+and review extraction (02_with_structured_output_typeddict.py) copy long spans of
+their input. Plain greedy decoding still pays one full forward pass per token.
+Prompt lookup drafts the next tokens for free and checks them all in one pass:
+
+    1. take the last n tokens generated so far (n = ngram_max .. ngram_min)
+    2. find their most recent earlier occurrence in prompt + output
+    3. draft the num_draft tokens that followed it there
+    4. run the model once over [last token] + draft; keep the draft tokens up to the
+       first one that differs from the model's own greedy choice, plus that choice
+
+Every kept token is the model's argmax given the tokens before it, so the output
+is the same as greedy decoding; a rejected draft only costs the extra positions in
+one forward pass. Cache entries of rejected tokens are cropped away.
+
+Usage:
+    model = PromptLookupChatModel(model_id="Qwen/Qwen2.5-0.5B-Instruct")
+    result = model.invoke(prompt)
+    print(result.response_metadata["speculative"])   # acceptance rate, tokens/s, forward passes
+
+    python prompt_lookup_decoding.py                  # summary + review tasks, vs plain greedy
+'''
+import argparse
+import threading
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+DEFAULT_MODEL_ID = "Qwen/Qwen2.5-0.5B-Instruct"
+
+# LangChain message type -> chat template role
+_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+def find_draft(tokens: list[int], num_draft: int = 10, ngram_max: int = 3, ngram_min: int = 1) -> list[int]:
+    """Tokens that followed the latest earlier occurrence of the current suffix, longest n-gram first."""
+    length = len(tokens)
+    for n in range(min(ngram_max, length - 1), ngram_min - 1, -1):
+        suffix = tokens[length - n:]
+        # Search backwards: the most recent match is the most likely continuation
+        for start in range(length - n - 1, -1, -1):
+            if tokens[start:start + n] == suffix:
+                follow = tokens[start + n:start + n + num_draft]
+                if follow:
+                    return follow
+    return []
+
+
+def prompt_lookup_generate(model, input_ids: list[int], max_new_tokens: int, eos_token_ids: set[int],
+                           num_draft: int = 10, ngram_max: int = 3) -> tuple[list[int], dict]:
+    """Greedy generation with prompt-lookup drafts; returns (new token ids, stats)."""
+    import torch
+    from transformers import DynamicCache
+
+    cache = DynamicCache()
+    stats = {"drafted": 0, "accepted": 0, "forward_passes": 1}
+    start = time.perf_counter()
+    with torch.inference_mode():
+        logits = model(input_ids=torch.tensor([input_ids]), past_key_values=cache, use_cache=True).logits
+    # next_token is decided (greedy) but not yet in the cache
+    next_token = int(logits[0, -1].argmax())
+    tokens = list(input_ids)
+    generated: list[int] = []
+
+    while True:
+        generated.append(next_token)
+        tokens.append(next_token)
+        if next_token in eos_token_ids or len(generated) >= max_new_tokens:
+            break
+
+        draft = find_draft(tokens, num_draft=min(num_draft, max_new_tokens - len(generated)), ngram_max=ngram_max)
+        cached = cache.get_seq_length()
+        with torch.inference_mode():
+            logits = model(input_ids=torch.tensor([[next_token] + draft]), past_key_values=cache,
+                           use_cache=True).logits
+        stats["forward_passes"] += 1
+        # predictions[i] = greedy token after [next_token] + draft[:i]
+        predictions = logits[0].argmax(dim=-1).tolist()
+
+        accepted = 0
+        while accepted < len(draft) and draft[accepted] == predictions[accepted]:
+            accepted += 1
+        stats["drafted"] += len(draft)
+        stats["accepted"] += accepted
+
+        # Keep next_token and the accepted drafts in the cache; drop the rejected positions
+        cache.crop(cached + 1 + accepted)
+        stop = False
+        for token in draft[:accepted]:
+            generated.append(token)
+            tokens.append(token)
+            if token in eos_token_ids or len(generated) >= max_new_tokens:
+                stop = True
+                break
+        if stop:
+            break
+        next_token = predictions[accepted]
+
+    elapsed = time.perf_counter() - start
+    stats.update(
+        generated_tokens=len(generated),
+        seconds=elapsed,
+        tokens_per_s=len(generated) / elapsed if elapsed else 0.0,
+        acceptance_rate=stats["accepted"] / stats["drafted"] if stats["drafted"] else 0.0,
+        tokens_per_pass=len(generated) / stats["forward_passes"],
+    )
+    return generated, stats
+
+
+class PromptLookupChatModel(BaseChatModel):
+    """Local greedy chat model that decodes with prompt-lookup speculation."""
+
+    model_id: str = DEFAULT_MODEL_ID
+    max_new_tokens: int = 256
+    num_draft_tokens: int = 10
+    ngram_max: int = 3
+    _state: dict = PrivateAttr(default_factory=dict)
+    _load_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "prompt-lookup-local"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_id": self.model_id, "max_new_tokens": self.max_new_tokens,
+                "num_draft_tokens": self.num_draft_tokens, "ngram_max": self.ngram_max}
+
+    def _load(self) -> dict:
+        # Loaded on first call, so building the model object is instant
+        if not self._state:
+            with self._load_lock:
+                if not self._state:
+                    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+                    model = AutoModelForCausalLM.from_pretrained(self.model_id)
+                    model.eval()
+                    tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+                    eos = model.generation_config.eos_token_id
+                    eos = set(eos if isinstance(eos, list) else [eos]) | {tokenizer.eos_token_id}
+                    self._state.update(model=model, tokenizer=tokenizer, eos=eos - {None})
+        return self._state
+
+    def encode(self, messages) -> list[int]:
+        tokenizer = self._load()["tokenizer"]
+        chat = [{"role": _ROLES.get(m.type, m.type), "content": m.content} for m in messages]
+        ids = tokenizer.apply_chat_template(chat, add_generation_prompt=True, tokenize=True)
+        return ids if isinstance(ids, list) else ids["input_ids"]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        state = self._load()
+        prompt_ids = self.encode(messages)
+        new_tokens, stats = prompt_lookup_generate(
+            state["model"], prompt_ids, kwargs.get("max_new_tokens", self.max_new_tokens), state["eos"],
+            num_draft=self.num_draft_tokens, ngram_max=self.ngram_max,
+        )
+        text = state["tokenizer"].decode(new_tokens, skip_special_tokens=True)
+        if stop:
+            for marker in stop:
+                text = text.split(marker)[0]
+        message = AIMessage(content=text, response_metadata={"speculative": stats, "model": self.model_id},
+                            usage_metadata={"input_tokens": len(prompt_ids), "output_tokens": len(new_tokens),
+                                            "total_tokens": len(prompt_ids) + len(new_tokens)})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# ---------- Benchmark ----------
+
+REVIEW = """I recently upgraded to the Samsung Galaxy S24 Ultra, and I must say, it's an absolute powerhouse! The Snapdragon 8 Gen 3 processor makes everything lightning fast—whether I'm gaming, multitasking, or editing photos. The 5000mAh battery easily lasts a full day even with heavy use, and the 45W fast charging is a lifesaver.
+The S-Pen integration is a great touch for note-taking and quick sketches, though I don't use it often. What really blew me away is the 200MP camera—the night mode is stunning, capturing crisp, vibrant images even in low light. Zooming up to 100x actually works well for distant objects, but anything beyond 30x loses quality.
+However, the weight and size make it a bit uncomfortable for one-handed use. Also, Samsung's One UI still comes with bloatware—why do I need five different Samsung apps for things Google already provides? The $1,300 price tag is also a hard pill to swallow.
+Pros: Insanely powerful processor (great for gaming and productivity); Stunning 200MP camera with incredible zoom capabilities; Long battery life with fast charging; S-Pen support is unique and useful
+Cons: Bulky and heavy—not great for one-handed use; Bloatware still exists in One UI; Expensive compared to competitors
+Reviewed by Vanshdeep singh"""
+
+REVIEW_PROMPT = ("Extract the key_themes, summary, sentiment, pros, cons and name of the reviewer from the "
+                 "review below. Answer with one JSON object and quote the pros and cons as written.\n\n" + REVIEW)
+
+
+def bench(model_id: str, max_new_tokens: int, num_draft: int, ngram_max: int) -> None:
+    import torch
+    from langchain_core.messages import HumanMessage
+
+    model = PromptLookupChatModel(model_id=model_id, max_new_tokens=max_new_tokens,
+                                  num_draft_tokens=num_draft, ngram_max=ngram_max)
+    state = model._load()
+    hf_model, tokenizer = state["model"], state["tokenizer"]
+
+    def greedy(prompt_ids):
+        start = time.perf_counter()
+        with torch.inference_mode():
+            output = hf_model.generate(torch.tensor([prompt_ids]), attention_mask=torch.ones(1, len(prompt_ids),
+                                       dtype=torch.long), max_new_tokens=max_new_tokens, do_sample=False,
+                                       pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id)
+        return output[0, len(prompt_ids):].tolist(), time.perf_counter() - start
+
+    # Stage 1 of ostrOutputParser.py produces the report that stage 2 summarizes
+    report_ids, _ = greedy(model.encode([HumanMessage(content="Make a detailed report on the GenAI")]))
+    report = tokenizer.decode(report_ids, skip_special_tokens=True)
+    tasks = {
+        "summary": f"write a 5 line summary of the following report: {report}",
+        "review": REVIEW_PROMPT,
+    }
+
+    print(f"{'task':<9}{'tokens':>7}{'greedy t/s':>12}{'lookup t/s':>12}{'speedup':>9}"
+          f"{'accept':>8}{'tok/pass':>9}  identical")
+    for name, prompt in tasks.items():
+        prompt_ids = model.encode([HumanMessage(content=prompt)])
+        greedy(prompt_ids[:32])  # warm-up
+        reference, greedy_s = greedy(prompt_ids)
+        tokens, stats = prompt_lookup_generate(hf_model, prompt_ids, max_new_tokens, state["eos"],
+                                               num_draft=num_draft, ngram_max=ngram_max)
+        # generate() stops after the first eos token too, so both lists are comparable as-is
+        identical = tokens == reference[:len(tokens)] and len(tokens) == len(reference)
+        greedy_tps = len(reference) / greedy_s
+        print(f"{name:<9}{len(tokens):>7}{greedy_tps:>12.1f}{stats['tokens_per_s']:>12.1f}"
+              f"{stats['tokens_per_s'] / greedy_tps:>8.2f}x{stats['acceptance_rate']:>8.2f}"
+              f"{stats['tokens_per_pass']:>9.2f}  {identical}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-id", default=DEFAULT_MODEL_ID)
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    parser.add_argument("--num-draft", type=int, default=10)
+    parser.add_argument("--ngram-max", type=int, default=3)
+    args = parser.parse_args()
+    bench(args.model_id, args.max_new_tokens, args.num_draft, args.ngram_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,35 @@
-# HuggingFaceEmbeddings - LangChain wrapper for embedding models
-# Why: Converts text into numerical vectors for semantic similarity comparison
-from langchain_huggingface import HuggingFaceEmbeddings
+# CachedEmbeddings - HuggingFaceEmbeddings wrapper with a persistent on-disk cache
+# Why: Converts text into numerical vectors for semantic similarity comparison,
+#      but only runs the model for texts it has not embedded before
+from embedding_cache import CachedEmbeddings
 
 # load_dotenv() - Loads environment variables from .env file
 # Why: In case API tokens are needed (though this model runs locally)
 from dotenv import load_dotenv
 
-# cosine_similarity - Measures similarity between vectors
+# SimilaritySearchEngine - Vectorized top-k cosine similarity search
 # Why: Calculates how similar two embeddings are (1.0 = identical, 0 = unrelated, -1 = opposite)
 #      Cosine similarity is the standard metric for comparing text embeddings
-from sklearn.metrics.pairwise import cosine_similarity
-
-# numpy - Numerical computing library
-# Why: Used for array operations and numerical computations with embeddings
-import numpy as np 
+#      The engine normalizes the documents once and finds the best matches with argpartition
+from similarity_search_engine import SimilaritySearchEngine
 
 # load_dotenv() - Executes loading of environment variables
 # Why: Makes any necessary tokens available
 load_dotenv()
 
-# HuggingFaceEmbeddings() - Initializes the sentence transformer model
+# CachedEmbeddings() - Initializes the cached sentence transformer model
 # Why: Creates an embedding model that runs locally to convert text to vectors
+#      Re-running over an unchanged corpus reads vectors from disk instead of re-encoding
 # Parameters:
 #   - model_name: "all-MiniLM-L6-v2" is optimized for semantic similarity tasks
 #     Why: Fast, lightweight, and produces high-quality semantic embeddings
-embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+#   - cache_dir: Where the memory-mapped vectors and their index are stored
+#   - max_entries: Least recently used vectors are evicted beyond this size
+embedding = CachedEmbeddings(
+    model_name="sentence-transformers/all-MiniLM-L6-v2",
+    cache_dir=".embedding_cache",
+    max_entries=100_000,
+)
 
 # documents - List of text documents to search through
 # Why: This is our knowledge base / document corpus that we want to search
@@ -44,6 +49,7 @@ query= "What is Document similarity search ?"
 # Why: Generates embeddings for all documents in our corpus at once
 #      Returns a list of vectors, one for each document
 # Note: Use embed_documents() for batch processing of multiple texts (more efficient)
+#       Only documents missing from the cache are sent to the model
 doc_embeddings = embedding.embed_documents(documents)
 
 # embedding.embed_query() - Converts the search query into a vector
@@ -51,23 +57,18 @@ doc_embeddings = embedding.embed_documents(documents)
 #      Query and documents must be in the same vector space for comparison
 query_embedding = embedding.embed_query(query)
 
-# cosine_similarity() - Calculates similarity scores between query and all documents
-# Why: Compares the query vector with each document vector using cosine similarity
-#      Returns scores from -1 to 1 (higher = more similar)
-# Parameters:
-#   - [query_embedding]: Query vector wrapped in a list (required format)
-#   - doc_embeddings: All document vectors to compare against
-#   - [0]: Extracts the first (and only) row of results as a 1D array
-scores=cosine_similarity([query_embedding], doc_embeddings)[0]
+# SimilaritySearchEngine() - Builds the search engine over all document vectors
+# Why: Normalizes the document matrix once so every query is a single matrix product
+#      Build it once and reuse it for as many queries as you like
+engine = SimilaritySearchEngine(doc_embeddings)
 
-# sorted() - Sorts documents by similarity score
-# Why: Finds the document with the highest similarity score
-# Process:
-#   - enumerate(scores): Creates (index, score) pairs
-#   - list(): Converts to list
-#   - sorted(..., key=lambda x:x[1]): Sorts by score (x[1])
-#   - [-1]: Gets the last element (highest score)
-index,score=sorted(list(enumerate(scores)), key =lambda x:x[1])[-1]
+# engine.top_k() - Finds the k documents most similar to the query
+# Why: Scores all documents with one matrix product, then np.argpartition() picks the best k
+#      without sorting the whole corpus (O(n) instead of O(n log n) per query)
+# Returns: (indices, scores) arrays sorted best first
+#   - [0]: The single best match, since we asked for k=1
+indices, scores = engine.top_k(query_embedding, k=1)
+index, score = indices[0], scores[0]
 
 # print() - Displays the search query
 # Why: Shows what the user was searching for
@@ -0,0 +1,154 @@
+'''
+Approximate nearest-neighbor search with an inverted-file (IVF) index
+
+Documents are grouped into clusters around k-means centroids. A query is only
+compared with the documents of its `nprobe` closest clusters, so search cost
+grows with nprobe instead of corpus size.
+
+Recall/latency knob:
+    - nprobe = 1          -> fastest, lowest recall
+    - nprobe = n_lists    -> same result as exact search
+
+Usage:
+    index = IVFIndex.build(doc_embeddings, n_lists=1024)
+    indices, scores = index.top_k(query_embedding, k=5, nprobe=8)
+    index.save("docs.ivf.npz")
+    index = IVFIndex.load("docs.ivf.npz")
+'''
+# numpy - Numerical computing library
+# Why: k-means, cluster assignment and scoring are all batched matrix products
+import numpy as np
+
+# Reuse the exact engine's helpers
+# Why: Both indexes must normalize vectors and pick top-k exactly the same way
+from similarity_search_engine import normalize_rows, select_top_k
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Return the id of the most similar centroid for every (normalized) vector."""
+    labels = np.empty(vectors.shape[0], dtype=np.int64)
+    # Chunking bounds the (chunk x n_lists) score matrix on million-vector corpora
+    for start in range(0, vectors.shape[0], chunk_size):
+        scores = vectors[start:start + chunk_size] @ centroids.T
+        labels[start:start + chunk_size] = np.argmax(scores, axis=1)
+    return labels
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 20, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=n_clusters)
+        # Empty clusters are re-seeded with random points
+        # Why: Otherwise their centroid stays unused and its inverted list is wasted
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index over L2-normalized embeddings (cosine similarity)."""
+
+    def __init__(self, centroids: np.ndarray, vectors: np.ndarray, ids: np.ndarray, offsets: np.ndarray, nprobe: int = 8):
+        # centroids: (n_lists, dim), vectors/ids: documents grouped by list,
+        # offsets: list i holds rows offsets[i]:offsets[i + 1]
+        # Why: Storing lists contiguously (CSR layout) keeps each probe a single slice
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def build(
+        cls,
+        doc_embeddings,
+        n_lists: int | None = None,
+        n_iter: int = 20,
+        train_size: int = 100_000,
+        nprobe: int = 8,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """Train centroids on a sample of the corpus and bucket every document."""
+        vectors = normalize_rows(doc_embeddings)
+        n_docs = vectors.shape[0]
+        if n_docs == 0:
+            raise ValueError("Cannot build an index over an empty corpus")
+        # Default: about sqrt(n) lists, the usual balance between probe cost and list size
+        n_lists = min(n_lists or max(1, int(np.sqrt(n_docs))), n_docs)
+
+        # Train on a sample only
+        # Why: Centroid quality saturates quickly, while k-means cost grows with the sample
+        rng = np.random.default_rng(seed)
+        sample = vectors if n_docs <= train_size else vectors[rng.choice(n_docs, train_size, replace=False)]
+        n_lists = min(n_lists, sample.shape[0])
+        centroids = spherical_kmeans(sample, n_lists, n_iter=n_iter, seed=seed)
+
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_lists)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids, vectors[order], order.astype(np.int64), offsets, nprobe=nprobe)
+
+    def top_k(self, query_embedding, k: int = 1, nprobe: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) of the approximate k nearest documents to one query."""
+        indices, scores = self.top_k_batch([query_embedding], k, nprobe)
+        return indices[0], scores[0]
+
+    def top_k_batch(self, query_embeddings, k: int = 1, nprobe: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) of shape (n_queries, k); missing slots hold -1 / -inf."""
+        queries = normalize_rows(query_embeddings)
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probes, _ = select_top_k(queries @ self.centroids.T, nprobe)
+
+        out_indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        out_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for q, (query, lists) in enumerate(zip(queries, probes)):
+            rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+            if rows.size == 0:
+                continue
+            scores = (self.vectors[rows] @ query)[None, :]
+            best, best_scores = select_top_k(scores, k)
+            n = best.shape[1]
+            out_indices[q, :n] = self.ids[rows[best[0]]]
+            out_scores[q, :n] = best_scores[0]
+        return out_indices, out_scores
+
+    def save(self, path: str) -> None:
+        """Write the index to a single .npz file at exactly `path`."""
+        # Through an open file
+        # Why: np.savez() appends ".npz" to a path that lacks it, and load() would then miss the file
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                vectors=self.vectors,
+                ids=self.ids,
+                offsets=self.offsets,
+                nprobe=np.array(self.nprobe),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Read an index written by save()."""
+        with np.load(path) as data:
+            return cls(
+                data["centroids"],
+                data["vectors"],
+                data["ids"],
+                data["offsets"],
+                nprobe=int(data["nprobe"]),
+            )
@@ -0,0 +1,208 @@
+'''
+Length-bucketed, parallel batch embedding for sentence-transformers models
+
+Texts are sorted by token length so each batch holds similarly sized inputs
+(little padding), batch sizes are chosen so every batch has roughly the same
+token budget, and results are put back in the caller's order. Batches can be
+spread over a pool of worker processes, each pinned to a fixed number of torch
+threads so workers do not fight over cores.
+
+Usage:
+    embedder = BatchEmbedder("sentence-transformers/all-MiniLM-L6-v2", workers=4, threads_per_worker=2)
+    vectors = embedder.embed(texts)        # float32 array in the original order
+
+    python batch_embedding.py --texts 5000 --workers 1 2 4     # throughput report
+'''
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Per-worker-process model, created once by the pool initializer
+# Why: Loading the model for every batch would cost more than embedding it
+_worker_model = None
+
+
+def _load_model(model_name: str, encode_kwargs: dict):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs=encode_kwargs)
+
+
+def _init_worker(model_name: str, threads: int, encode_kwargs: dict) -> None:
+    global _worker_model
+    # Pin thread counts before torch spins up its thread pools
+    # Why: N workers x all-cores threads each oversubscribes the CPU and runs slower than one process.
+    #      Only pool workers are pinned; the caller's process keeps its own settings
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import torch
+
+    torch.set_num_threads(threads)
+    _worker_model = _load_model(model_name, encode_kwargs)
+
+
+def _embed_with(model, texts: list[str]) -> np.ndarray:
+    return np.asarray(model.embed_documents(texts), dtype=np.float32)
+
+
+def _embed_batch(texts: list[str]) -> np.ndarray:
+    return _embed_with(_worker_model, texts)
+
+
+def plan_batches(lengths, max_tokens_per_batch: int = 8192, max_batch_size: int = 256) -> list[np.ndarray]:
+    """Group text indices into length-sorted batches with a bounded padded token count.
+
+    A batch's padded cost is len(batch) * longest_text_in_batch, so short texts
+    get large batches and long texts get small ones.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(lengths, kind="stable")
+    batches, current, longest = [], [], 0
+    for i in order:
+        longest_if_added = max(longest, int(lengths[i]), 1)
+        if current and (
+            len(current) >= max_batch_size or (len(current) + 1) * longest_if_added > max_tokens_per_batch
+        ):
+            batches.append(np.array(current))
+            current, longest_if_added = [], max(int(lengths[i]), 1)
+        current.append(i)
+        longest = longest_if_added
+    if current:
+        batches.append(np.array(current))
+    return batches
+
+
+class BatchEmbedder:
+    """Embeds large text lists with length bucketing and an optional process pool."""
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        workers: int = 1,
+        threads_per_worker: int | None = None,
+        max_tokens_per_batch: int = 8192,
+        max_batch_size: int = 256,
+        encode_kwargs: dict | None = None,
+    ):
+        self.model_name = model_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_batch_size = max_batch_size
+        # batch_size == whole batch: our planner already decided how many texts go together
+        self.encode_kwargs = {**(encode_kwargs or {}), "batch_size": max_batch_size}
+        self._tokenizer = None
+        self._pool = None
+        # In-process model for workers == 1, tagged with what it was built from
+        # Why: Two embedders with different models in one process must not share a model
+        self._model = None
+        self._model_key = None
+
+    def _token_lengths(self, texts: list[str]) -> list[int]:
+        if self._tokenizer is None:
+            # Only the tokenizer is loaded in the parent process
+            # Why: It is tiny and fast; the model weights live in the workers
+            from transformers import AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        encoded = self._tokenizer(texts, add_special_tokens=True, truncation=True)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.threads_per_worker, self.encode_kwargs),
+            )
+        return self._pool
+
+    def _get_model(self):
+        key = (self.model_name, tuple(sorted(self.encode_kwargs.items())))
+        if self._model is None or self._model_key != key:
+            self._model = _load_model(self.model_name, self.encode_kwargs)
+            self._model_key = key
+        return self._model
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 array in the same order as texts."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        batches = plan_batches(self._token_lengths(texts), self.max_tokens_per_batch, self.max_batch_size)
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+        if self.workers > 1:
+            results = list(self._get_pool().map(_embed_batch, batch_texts))
+        else:
+            model = self._get_model()
+            results = [_embed_with(model, chunk) for chunk in batch_texts]
+
+        # Scatter each batch back to its original positions
+        output = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+        for batch, vectors in zip(batches, results):
+            output[batch] = vectors
+        return output
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """LangChain-style alias so BatchEmbedder can be used with ingest() and friends."""
+        return self.embed(texts).tolist()
+
+    def embed_documents_array(self, texts: list[str]) -> np.ndarray:
+        return self.embed(texts)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def synthetic_texts(n: int, seed: int = 0) -> list[str]:
+    """Mixed-length sentences, from a few words up to a long paragraph."""
+    rng = np.random.default_rng(seed)
+    words = ("language model embedding vector search document query token batch "
+             "framework semantic similarity chat prompt retrieval index corpus").split()
+    return [" ".join(rng.choice(words, int(rng.integers(3, 200)))) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.texts)
+    print(f"{args.texts} texts, {os.cpu_count()} CPUs")
+
+    # Baseline: plain HuggingFaceEmbeddings.embed_documents() in input order
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    baseline = HuggingFaceEmbeddings(model_name=args.model)
+    baseline.embed_documents(texts[:32])  # warm-up
+    start = time.perf_counter()
+    baseline.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{'baseline embed_documents':<40}{args.texts / elapsed:>10.1f} texts/sec")
+
+    for workers in args.workers:
+        with BatchEmbedder(args.model, workers=workers, threads_per_worker=args.threads_per_worker) as embedder:
+            embedder.embed(texts[:32 * workers])  # warm-up: loads the model in every worker
+            start = time.perf_counter()
+            embedder.embed(texts)
+            elapsed = time.perf_counter() - start
+        label = f"bucketed, {workers} worker(s) x {embedder.threads_per_worker} threads"
+        print(f"{label:<40}{args.texts / elapsed:>10.1f} texts/sec")
+
+
+if __name__ == "__main__":
+    main()
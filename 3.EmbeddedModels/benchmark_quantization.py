@@ -0,0 +1,67 @@
+'''
+Memory and recall report for quantized embedding storage
+
+Compares float32 exact search against float16 and int8 codes, with and
+without float32 rescoring, on the same corpus.
+
+Usage:
+    python benchmark_quantization.py --docs 200000 --k 10
+    python benchmark_quantization.py --embeddings doc_store/vectors.f32 --dim 384
+'''
+import argparse
+import time
+
+import numpy as np
+
+from benchmark_ann import recall_at_k, synthetic_corpus, time_per_query
+from quantized_search import SUPPORTED_DTYPES, QuantizedSearchEngine
+from similarity_search_engine import SimilaritySearchEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", help="A .npy matrix, or a raw float32 file together with --dim")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--docs", type=int, default=100_000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.embeddings is None:
+        corpus = synthetic_corpus(args.docs, dim=args.dim)
+    elif args.embeddings.endswith(".npy"):
+        corpus = np.load(args.embeddings, mmap_mode="r")
+    else:
+        corpus = np.memmap(args.embeddings, dtype=np.float32, mode="r").reshape(-1, args.dim)
+
+    rng = np.random.default_rng(1)
+    picks = rng.choice(corpus.shape[0], args.queries, replace=False)
+    queries = np.asarray(corpus[picks], dtype=np.float32)
+    queries += 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    exact = SimilaritySearchEngine(corpus)
+    exact_indices, _ = exact.top_k_batch(queries, args.k)
+    exact_ms = time_per_query(lambda q: exact.top_k(q, args.k), queries)
+    float32_bytes = exact.doc_matrix.shape[1] * 4
+
+    print(f"corpus: {corpus.shape[0]} x {corpus.shape[1]}, queries: {args.queries}, k: {args.k}")
+    print(f"{'storage':<22}{'bytes/vec':>10}{'vs f32':>8}{'recall@k':>10}{'ms/query':>10}")
+    print(f"{'float32 exact':<22}{float32_bytes:>10}{1.0:>8.1f}{1.0:>10.3f}{exact_ms:>10.3f}")
+    for dtype in SUPPORTED_DTYPES:
+        start = time.perf_counter()
+        engine = QuantizedSearchEngine(corpus, dtype=dtype, rescore_factor=args.rescore_factor)
+        build_s = time.perf_counter() - start
+        for rescore in (False, True):
+            indices, _ = engine.top_k_batch(queries, args.k, rescore=rescore)
+            ms = time_per_query(lambda q: engine.top_k(q, args.k, rescore=rescore), queries)
+            label = f"{dtype}{' + rescore' if rescore else ''}"
+            print(
+                f"{label:<22}{engine.bytes_per_vector:>10}{float32_bytes / engine.bytes_per_vector:>8.1f}"
+                f"{recall_at_k(indices, exact_indices):>10.3f}{ms:>10.3f}"
+            )
+        print(f"  ({dtype} quantization took {build_s:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+'''
+Embedding and retrieval benchmark suite with machine-readable results
+
+Two suites, each writing rows to one JSON file that later runs are compared against:
+
+    encode   all-MiniLM-L6-v2 throughput (texts/s) for every batch size x torch thread count,
+             on synthetic sentences of mixed length (needs sentence-transformers + torch)
+    search   per-query latency (p50/p95), build time, memory and recall@k for every corpus size:
+               cosine_similarity   the original script's path: sklearn cosine_similarity + argmax
+                                   per query (numpy equivalent when sklearn is missing)
+               engine              SimilaritySearchEngine, one query at a time
+               engine-batch        SimilaritySearchEngine.top_k_batch, all queries in one call
+               float16 / int8      QuantizedSearchEngine with float32 rescoring
+               ivf                 IVFIndex at --nprobe
+
+Memory is the tracemalloc peak (numpy allocations included) while building and
+while running the queries. Corpora are synthetic, clustered, 384-dim vectors
+like benchmark_ann.py uses, generated in chunks so 1M documents fit in ~1.5 GB.
+
+Usage:
+    python benchmark_suite.py run --out bench.json
+    python benchmark_suite.py run --suites search --sizes 1000 10000 100000 1000000 --out bench.json
+    python benchmark_suite.py run --suites encode --batch-sizes 16 64 256 --threads 1 2 4 --out enc.json
+    python benchmark_suite.py compare baseline.json bench.json --tolerance 0.10   # exit code 1 on regressions
+                                                                                  # or missing baseline rows
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from ann_index import IVFIndex
+from benchmark_ann import recall_at_k
+from quantized_search import QuantizedSearchEngine
+from similarity_search_engine import SimilaritySearchEngine
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# metric -> True if higher is better; metrics not listed here are informational only
+METRIC_DIRECTION = {
+    "texts_per_s": True,
+    "recall": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "build_s": False,
+    "build_peak_mb": False,
+    "query_peak_mb": False,
+}
+
+WORDS = ("language model embedding vector search document query retrieval semantic similarity "
+         "framework chain prompt token cosine index cluster batch latency memory throughput").split()
+
+
+# ---------- Synthetic data ----------
+
+def synthetic_corpus(n_docs: int, dim: int = 384, n_topics: int = 256, seed: int = 0,
+                     chunk_size: int = 100_000) -> np.ndarray:
+    """Same clustered distribution as benchmark_ann.synthetic_corpus, built chunk by chunk.
+
+    Why: The one-shot version needs several corpus-sized temporaries, too much at 1M x 384
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    corpus = np.empty((n_docs, dim), dtype=np.float32)
+    for start in range(0, n_docs, chunk_size):
+        n = min(chunk_size, n_docs - start)
+        first, second = rng.integers(0, n_topics, (2, n))
+        weight = rng.random((n, 1), dtype=np.float32)
+        corpus[start:start + n] = weight * topics[first] + (1 - weight) * topics[second]
+        corpus[start:start + n] += 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return corpus
+
+
+def synthetic_queries(corpus: np.ndarray, n_queries: int, seed: int = 1) -> np.ndarray:
+    """Perturbed corpus vectors, so queries land near documents like real ones do."""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(corpus.shape[0], min(n_queries, corpus.shape[0]), replace=False)
+    queries = np.asarray(corpus[picks], dtype=np.float32)
+    return queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+
+
+def synthetic_texts(n_texts: int, seed: int = 0) -> list[str]:
+    """Sentences of 4 to 120 words, skewed short like real documents."""
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.lognormal(3.0, 0.8, n_texts).astype(int), 4, 120)
+    return [" ".join(rng.choice(WORDS, length)) for length in lengths]
+
+
+# ---------- Measurement helpers ----------
+
+def measure(fn):
+    """Run fn() once; return (result, seconds, tracemalloc peak in MB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def latencies_ms(search, queries: np.ndarray) -> np.ndarray:
+    out = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        search(query)
+        out[i] = (time.perf_counter() - start) * 1e3
+    return out
+
+
+def cosine_similarity_search(corpus: np.ndarray):
+    """The pre-engine path: score every document with cosine_similarity, then take the best.
+
+    Nothing is prepared ahead of time, so each query re-normalizes the corpus like the old script did.
+    """
+    try:
+        from sklearn.metrics.pairwise import cosine_similarity
+    except ImportError:
+        def cosine_similarity(a, b):
+            a = np.asarray(a, dtype=np.float32)
+            b = np.asarray(b, dtype=np.float32)
+            return (a / np.linalg.norm(a, axis=1, keepdims=True)) @ (b / np.linalg.norm(b, axis=1, keepdims=True)).T
+
+    def search(query, k):
+        scores = cosine_similarity([query], corpus)[0]
+        return np.argsort(-scores)[:k]
+
+    return search
+
+
+# ---------- Suites ----------
+
+def encode_suite(args) -> list[dict]:
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+    except ImportError as error:
+        print(f"encode suite skipped: {error}")
+        return [{"suite": "encode", "name": "skipped", "params": {}, "metrics": {}, "note": str(error)}]
+
+    texts = synthetic_texts(args.encode_texts)
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    model.encode(texts[:32])  # warm-up: first call pays for lazy initialisation
+    rows = []
+    for threads in args.threads:
+        torch.set_num_threads(threads)
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            elapsed = time.perf_counter() - start
+            rows.append({"suite": "encode", "name": "minilm",
+                         "params": {"batch_size": batch_size, "threads": threads, "texts": len(texts)},
+                         "metrics": {"texts_per_s": len(texts) / elapsed, "seconds": elapsed}})
+            print(f"encode  threads={threads:<3} batch={batch_size:<5} {len(texts) / elapsed:10.1f} texts/s")
+    return rows
+
+
+def search_suite(args) -> list[dict]:
+    rows = []
+    for size in args.sizes:
+        corpus = synthetic_corpus(size)
+        queries = synthetic_queries(corpus, args.queries)
+        k = args.k
+
+        engine, build_s, build_mb = measure(lambda: SimilaritySearchEngine(corpus))
+        exact, _ = engine.top_k_batch(queries, k)
+
+        # name -> (build(), search(query), batch search(queries) or None, max corpus size)
+        methods = {
+            "cosine_similarity": (lambda: cosine_similarity_search(corpus), None, args.naive_max),
+            "engine": (lambda: engine, None, None),
+            "engine-batch": (lambda: engine, "batch", None),
+            "float16": (lambda: QuantizedSearchEngine(corpus, dtype="float16"), None, None),
+            "int8": (lambda: QuantizedSearchEngine(corpus, dtype="int8"), None, None),
+            "ivf": (lambda: IVFIndex.build(corpus), None, args.ivf_max),
+        }
+        for name in args.methods:
+            build, mode, max_size = methods[name]
+            if max_size is not None and size > max_size:
+                continue
+            if name.startswith("engine"):
+                index, seconds, peak = engine, build_s, build_mb
+            else:
+                index, seconds, peak = measure(build)
+
+            if name == "cosine_similarity":
+                def search(q, index=index):
+                    return index(q, k)
+
+                def search_all(qs, index=index):
+                    return np.array([index(q, k) for q in qs])
+            elif name == "ivf":
+                def search(q, index=index):
+                    return index.top_k(q, k, nprobe=args.nprobe)[0]
+
+                def search_all(qs, index=index):
+                    return index.top_k_batch(qs, k, nprobe=args.nprobe)[0]
+            else:
+                def search(q, index=index):
+                    return index.top_k(q, k)[0]
+
+                def search_all(qs, index=index):
+                    return index.top_k_batch(qs, k)[0]
+
+            found, _, query_mb = measure(lambda: search_all(queries))
+            if mode == "batch":
+                # One call for every query; report the amortised time per query
+                _, total, _ = measure(lambda: search_all(queries))
+                timings = np.full(len(queries), total * 1e3 / len(queries))
+            else:
+                search(queries[0])
+                timings = latencies_ms(search, queries)
+
+            metrics = {
+                "p50_ms": float(np.percentile(timings, 50)),
+                "p95_ms": float(np.percentile(timings, 95)),
+                "build_s": seconds,
+                "build_peak_mb": peak,
+                "query_peak_mb": query_mb,
+                "recall": recall_at_k(np.asarray(found), exact),
+            }
+            rows.append({"suite": "search", "name": name, "params": {"docs": size, "k": k}, "metrics": metrics})
+            print(f"search  docs={size:<8} {name:<18} p50 {metrics['p50_ms']:9.3f}ms  p95 {metrics['p95_ms']:9.3f}ms  "
+                  f"build {seconds:7.2f}s  build peak {peak:8.1f}MB  query peak {query_mb:7.1f}MB  "
+                  f"recall {metrics['recall']:.3f}")
+        del corpus, engine
+    return rows
+
+
+# ---------- Results and comparison ----------
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"timestamp": time.time(), "git_commit": commit, "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+
+def row_key(row: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(row["params"].items()))
+    return f"{row['suite']}/{row['name']}[{params}]"
+
+
+def compare(baseline: dict, current: dict, tolerance: float, recall_tolerance: float = 0.01
+            ) -> tuple[list[str], list[str]]:
+    """(regressions, missing): metrics that got worse by more than tolerance (relative) or
+    recall_tolerance, and baseline rows or metrics that the current results do not have."""
+    now = {row_key(row): row["metrics"] for row in current["results"]}
+    regressions, missing = [], []
+    for row in baseline["results"]:
+        old = row["metrics"]
+        # Rows without metrics (e.g. a skipped suite) have nothing to compare
+        if not old:
+            continue
+        new = now.get(row_key(row))
+        if new is None:
+            # A suite that got skipped or a method that dropped out must not pass as "no regressions"
+            missing.append(f"{row_key(row)}: missing from the current results")
+            continue
+        for metric, higher_is_better in METRIC_DIRECTION.items():
+            if metric not in old:
+                continue
+            if metric not in new:
+                missing.append(f"{row_key(row)} {metric}: missing from the current results")
+                continue
+            a, b = old[metric], new[metric]
+            if metric == "recall":
+                worse = a - b > recall_tolerance
+            elif higher_is_better:
+                worse = b < a * (1 - tolerance)
+            else:
+                # Sub-millisecond noise is not a regression
+                worse = b > a * (1 + tolerance) and b - a > 0.05
+            if worse:
+                regressions.append(f"{row_key(row)} {metric}: {a:.4g} -> {b:.4g}")
+    return regressions, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the suites and write a results file")
+    run.add_argument("--suites", nargs="+", choices=["encode", "search"], default=["encode", "search"])
+    run.add_argument("--out", default="embedding_bench.json")
+    run.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                     help="Corpus sizes; 1000000 needs ~3 GB of RAM")
+    run.add_argument("--queries", type=int, default=100)
+    run.add_argument("--k", type=int, default=10)
+    run.add_argument("--methods", nargs="+", default=["cosine_similarity", "engine", "engine-batch",
+                                                      "float16", "int8", "ivf"])
+    run.add_argument("--nprobe", type=int, default=8)
+    run.add_argument("--naive-max", type=int, default=100_000, help="Largest corpus for the cosine_similarity path")
+    run.add_argument("--ivf-max", type=int, default=1_000_000, help="Largest corpus to build an IVF index for")
+    run.add_argument("--encode-texts", type=int, default=2_000)
+    run.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 128, 512])
+    run.add_argument("--threads", type=int, nargs="+", default=sorted({1, max(1, (os.cpu_count() or 1) // 2),
+                                                                       os.cpu_count() or 1}))
+    run.add_argument("--compare", help="Baseline results file to compare against after the run")
+    run.add_argument("--tolerance", type=float, default=0.10)
+    run.add_argument("--allow-missing", action="store_true",
+                     help="Only warn about baseline rows missing from this run (e.g. when running a subset)")
+
+    cmp = commands.add_parser("compare", help="Compare two results files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--tolerance", type=float, default=0.10)
+    cmp.add_argument("--allow-missing", action="store_true",
+                     help="Only warn about baseline rows missing from the current results")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = []
+        if "encode" in args.suites:
+            results += encode_suite(args)
+        if "search" in args.suites:
+            results += search_suite(args)
+        current = {"environment": environment(), "results": results}
+        tmp = f"{args.out}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        os.replace(tmp, args.out)
+        print(f"\nwrote {len(results)} rows to {args.out}")
+        baseline_path = args.compare
+    else:
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, missing = compare(baseline, current, args.tolerance)
+        if missing:
+            print(f"\n{len(missing)} baseline result(s) missing:")
+            print("\n".join(f"  {line}" for line in missing))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            print("\n".join(f"  {line}" for line in regressions))
+        if regressions or (missing and not args.allow_missing):
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%} against {baseline_path}"
+              + (" (some baseline results missing, allowed)" if missing else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+'''
+Persistent embedding cache for HuggingFaceEmbeddings
+
+Each text is keyed by (model name, normalization, content hash). Vectors live in
+a memory-mapped float32 file and an on-disk JSON index maps keys to rows, so an
+unchanged corpus is served straight from disk without loading the model.
+
+Usage:
+    embedding = CachedEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    doc_embeddings = embedding.embed_documents(documents)
+    embedding.close()          # or use it as a context manager; also done at interpreter exit
+'''
+# atexit / weakref - Saves pending index changes when the script ends
+# Why: The index is written every save_every new vectors, not on every call
+import atexit
+import weakref
+
+# hashlib - Computes the content hash used as cache key
+# Why: The same text always maps to the same key, no matter where it appears in the corpus
+import hashlib
+
+# json / os - Index file persistence
+# Why: The index is small, so plain JSON written atomically with os.replace() is enough
+import json
+import os
+
+# numpy - Numerical computing library
+# Why: np.memmap gives us a float32 matrix on disk that is paged in lazily by the OS
+import numpy as np
+
+# Embeddings - LangChain base class for embedding models
+# Why: Keeps the same embed_documents() / embed_query() interface as HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """HuggingFaceEmbeddings wrapper that only sends cache misses to the model.
+
+    The underlying model is loaded lazily on the first miss, so a fully cached
+    run costs opening two files. Entries beyond ``max_entries`` are evicted in
+    least-recently-used order and their rows are reused for new vectors.
+
+    The index is saved every ``save_every`` new vectors, on close() and at exit,
+    so calls that only hit the cache never rewrite it. A crash loses the recency
+    and the entries added since the last save, never correctness: a row that the
+    saved index points to is not overwritten until an index without it is saved.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        cache_dir: str = ".embedding_cache",
+        max_entries: int = 100_000,
+        model_kwargs: dict | None = None,
+        encode_kwargs: dict | None = None,
+        embeddings: Embeddings | None = None,
+        save_every: int = 256,
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.model_name = model_name
+        self.model_kwargs = model_kwargs or {}
+        self.encode_kwargs = encode_kwargs or {}
+        self.normalize = bool(self.encode_kwargs.get("normalize_embeddings", False))
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self._embeddings = embeddings
+
+        # One directory per (model, normalization) pair
+        # Why: Vectors from different models or normalization settings are never interchangeable,
+        #      and they may not even share the same dimension
+        namespace = hashlib.sha256(f"{model_name}|normalize={self.normalize}".encode()).hexdigest()[:16]
+        self.cache_dir = os.path.join(cache_dir, namespace)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_path = os.path.join(self.cache_dir, "index.json")
+        self._vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+
+        self._entries = {}   # key -> [row, last_used]
+        # Rows that no saved index points to any more, safe to overwrite
+        self._free_rows = []
+        # Rows evicted since the last save; the index on disk may still point to them
+        # Why: Overwriting them before the index is saved would let a crash serve the wrong vector
+        self._evicted_rows = []
+        self._next_row = 0   # first row never handed out
+        self._unsaved = 0    # vectors stored since the last save
+        self._dirty = False  # recency or entries changed since the last save
+        self._dim = None
+        self._capacity = 0
+        self._clock = 0
+        self._vectors = None
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+        atexit.register(_save_at_exit, weakref.ref(self))
+
+    # ----- public Embeddings interface -----
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(texts, kind="document").tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text], kind="query")[0].tolist()
+
+    def embed_documents_array(self, texts: list[str]) -> np.ndarray:
+        """Same as embed_documents() but returns a float32 matrix instead of Python lists."""
+        return self._embed(texts, kind="document")
+
+    def close(self) -> None:
+        """Save the index if anything changed since the last save."""
+        if self._dirty:
+            self._save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----- cache internals -----
+
+    def _key(self, text: str, kind: str) -> str:
+        # kind is part of the key
+        # Why: embed_query() and embed_documents() may use different encode settings (e.g. prompts)
+        return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _embed(self, texts: list[str], kind: str) -> np.ndarray:
+        keys = [self._key(text, kind) for text in texts]
+
+        # Deduplicate misses so repeated texts in one call are embedded only once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._entries and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        # Copy the hits out before anything is evicted or stored
+        # Why: Storing this call's misses may recycle rows its hits were read from
+        result = None
+        if self._dim is not None:
+            result = np.empty((len(keys), self._dim), dtype=np.float32)
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._clock += 1
+                    entry[1] = self._clock
+                    result[i] = self._vectors[entry[0]]
+            self._dirty = self._dirty or len(missing) < len(keys)
+
+        if missing:
+            model = self._load_model()
+            miss_texts = list(missing.values())
+            if kind == "query":
+                new_vectors = np.asarray([model.embed_query(t) for t in miss_texts], dtype=np.float32)
+            else:
+                new_vectors = np.asarray(model.embed_documents(miss_texts), dtype=np.float32)
+            if result is None:
+                result = np.empty((len(keys), new_vectors.shape[1]), dtype=np.float32)
+            miss_rows = dict(zip(missing, new_vectors))
+            for i, key in enumerate(keys):
+                if key in miss_rows:
+                    result[i] = miss_rows[key]
+
+            # Make room for the whole batch with a single eviction pass, sparing this call's own keys
+            # Why: Sorting the index once per call is far cheaper than once per inserted vector
+            overflow = len(self._entries) + len(missing) - self.max_entries
+            if overflow > 0:
+                self._evict(overflow, pinned=set(keys))
+            for key, vector in miss_rows.items():
+                self._store(key, vector)
+
+        if self._unsaved >= self.save_every:
+            self._save_index()
+        if result is None:
+            return np.empty((len(keys), 0), dtype=np.float32)
+        return result
+
+    def _load_model(self) -> Embeddings:
+        if self._embeddings is None:
+            # Imported lazily
+            # Why: A fully cached run should not pay for importing torch/transformers
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            self._embeddings = HuggingFaceEmbeddings(
+                model_name=self.model_name,
+                model_kwargs=self.model_kwargs,
+                encode_kwargs=self.encode_kwargs,
+            )
+        return self._embeddings
+
+    def _store(self, key: str, vector: np.ndarray) -> None:
+        if self._dim is None:
+            self._dim = int(vector.shape[0])
+        elif vector.shape[0] != self._dim:
+            raise ValueError(f"Embedding dimension changed from {self._dim} to {vector.shape[0]}")
+
+        if len(self._entries) >= self.max_entries:
+            self._evict(len(self._entries) - self.max_entries + 1)
+
+        if not self._free_rows and self._next_row >= self.max_entries:
+            # Only evicted rows are left: save an index without them before reusing one
+            self._save_index()
+
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = self._next_row
+            self._next_row += 1
+            if row >= self._capacity:
+                self._grow(max(1024, self._capacity * 2))
+
+        self._vectors[row] = vector
+        self._clock += 1
+        self._entries[key] = [row, self._clock]
+        self._unsaved += 1
+        self._dirty = True
+
+    def _evict(self, count: int, pinned: set = frozenset()) -> None:
+        # Least recently used entries go first, keys of the current call last
+        victims = sorted(self._entries.items(), key=lambda item: (item[0] in pinned, item[1][1]))[:count]
+        for key, (row, _) in victims:
+            del self._entries[key]
+            self._evicted_rows.append(row)
+        self._dirty = True
+
+    def _grow(self, capacity: int) -> None:
+        capacity = max(min(capacity, self.max_entries), self._next_row)
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        # Opening with mode "r+" after resizing the file keeps existing rows in place
+        # Why: Growing never rewrites data that is already cached
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self._dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+        self._capacity = capacity
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._index_path) or not os.path.exists(self._vectors_path):
+            return
+        with open(self._index_path) as f:
+            index = json.load(f)
+        if index.get("model_name") != self.model_name or index.get("normalize") != self.normalize:
+            return
+        self._dim = index["dim"]
+        self._capacity = index["capacity"]
+        self._clock = index["clock"]
+        self._entries = index["entries"]
+        self._free_rows = index["free_rows"]
+        self._next_row = index.get("next_row", len(self._entries) + len(self._free_rows))
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+
+        # Respect a smaller max_entries than the one the cache was written with
+        if len(self._entries) > self.max_entries:
+            self._evict(len(self._entries) - self.max_entries)
+
+    def _save_index(self) -> None:
+        if self._vectors is None:
+            return
+        # Vectors reach the disk before the index that points to them
+        self._vectors.flush()
+        index = {
+            "model_name": self.model_name,
+            "normalize": self.normalize,
+            "dim": self._dim,
+            "capacity": self._capacity,
+            "clock": self._clock,
+            "entries": self._entries,
+            # Rows evicted since the last save are free once this index replaces the old one
+            "free_rows": self._free_rows + self._evicted_rows,
+            "next_row": self._next_row,
+        }
+        # Write to a temp file first, then swap it in
+        # Why: A crash mid-write must never leave a truncated index next to valid vectors
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path)
+        self._free_rows.extend(self._evicted_rows)
+        self._evicted_rows = []
+        self._unsaved = 0
+        self._dirty = False
+
+
+def _save_at_exit(ref: weakref.ref) -> None:
+    cache = ref()
+    if cache is not None:
+        cache.close()
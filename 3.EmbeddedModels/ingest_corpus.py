@@ -0,0 +1,219 @@
+'''
+Streaming corpus ingestion into a memory-mapped vector store
+
+Documents are read lazily from .txt (one document per line) or .jsonl files,
+embedded in fixed-size batches and appended to an on-disk store:
+
+    <store_dir>/vectors.f32   float32 (capacity, dim) numpy.memmap, grown by doubling
+    <store_dir>/texts.bin     UTF-8 document texts, back to back
+    <store_dir>/offsets.i64   int64 end offset of every text inside texts.bin
+    <store_dir>/meta.json     dim, capacity and number of stored documents
+
+Peak memory is bounded by one batch of texts and vectors, not by corpus size.
+meta.json is written last, so its count is the source of truth: bytes past it
+in texts.bin and offsets.i64 (left by a crash mid-append) are cut off when the
+store is opened for writing.
+
+Usage:
+    python ingest_corpus.py corpus.jsonl more_docs.txt --store doc_store --batch-size 256
+    store = VectorStore("doc_store", read_only=True)     # for search: vectors are mapped with mode="r"
+'''
+import argparse
+import json
+import os
+import time
+from itertools import islice
+
+import numpy as np
+
+
+def read_documents(paths, text_field: str = "text"):
+    """Yield document texts one at a time from .txt and .jsonl files.
+
+    Why a generator: only the current line is ever held in memory.
+    """
+    for path in paths:
+        is_jsonl = path.endswith((".jsonl", ".ndjson"))
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                yield json.loads(line)[text_field] if is_jsonl else line
+
+
+def batched(iterable, batch_size: int):
+    """Yield lists of up to batch_size items from any iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+class VectorStore:
+    """Append-only store of document vectors and texts backed by files."""
+
+    def __init__(self, directory: str, dim: int | None = None, initial_capacity: int = 4096,
+                 read_only: bool = False):
+        self.directory = directory
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._texts_path = os.path.join(directory, "texts.bin")
+        self._offsets_path = os.path.join(directory, "offsets.i64")
+
+        self.count = 0
+        self.capacity = 0
+        self.dim = dim
+        self._vectors = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if dim is not None and dim != meta["dim"]:
+                raise ValueError(f"Store at {directory} holds {meta['dim']}-dim vectors, got dim={dim}")
+            self.dim, self.capacity, self.count = meta["dim"], meta["capacity"], meta["count"]
+            self._open_vectors()
+            if not read_only:
+                self._truncate_to_count()
+        self._initial_capacity = initial_capacity
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored (count, dim) vectors; pages in from disk on access.
+
+        The view is read-only when the store was opened with read_only=True.
+        """
+        if self._vectors is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._vectors[:self.count]
+
+    def text(self, i: int) -> str:
+        """Return the text of document i without loading the others."""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        offsets = np.memmap(self._offsets_path, dtype=np.int64, mode="r", shape=(self.count,))
+        start = int(offsets[i - 1]) if i else 0
+        end = int(offsets[i])
+        with open(self._texts_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("utf-8")
+
+    def append(self, texts: list[str], vectors) -> None:
+        """Append one batch of texts and their vectors."""
+        if self.read_only:
+            raise ValueError(f"Store at {self.directory} was opened read-only")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] != len(texts):
+            raise ValueError("texts and vectors must have the same length")
+        if not texts:
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim vectors, got {vectors.shape[1]}")
+
+        needed = self.count + len(texts)
+        if needed > self.capacity:
+            # Double the preallocated file instead of growing it per batch
+            # Why: Keeps the number of file resizes logarithmic in corpus size
+            new_capacity = max(self.capacity or self._initial_capacity, 1)
+            while new_capacity < needed:
+                new_capacity *= 2
+            self._resize(new_capacity)
+        self._vectors[self.count:needed] = vectors
+
+        encoded = [text.encode("utf-8") for text in texts]
+        with open(self._texts_path, "ab") as f:
+            base = f.tell()
+            f.write(b"".join(encoded))
+        ends = base + np.cumsum([len(e) for e in encoded], dtype=np.int64)
+        with open(self._offsets_path, "ab") as f:
+            f.write(ends.tobytes())
+
+        self.count = needed
+        self._write_meta()
+
+    def flush(self) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+
+    def _resize(self, capacity: int) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.capacity = capacity
+        self._open_vectors()
+
+    def _open_vectors(self) -> None:
+        mode = "r" if self.read_only else "r+"
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+
+    def _truncate_to_count(self) -> None:
+        # Cut off texts and offsets of an append that crashed before meta.json was updated
+        # Why: The next append computes offsets from the end of texts.bin, so leftover
+        #      bytes would shift every later document's text
+        with open(self._offsets_path, "ab") as f:
+            f.truncate(self.count * 8)
+        end = 0
+        if self.count:
+            offsets = np.memmap(self._offsets_path, dtype=np.int64, mode="r", shape=(self.count,))
+            end = int(offsets[-1])
+            del offsets
+        with open(self._texts_path, "ab") as f:
+            f.truncate(end)
+
+    def _write_meta(self) -> None:
+        # Flush vectors before publishing the new count
+        # Why: meta.json must never claim rows that are not on disk yet
+        self.flush()
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity, "count": self.count}, f)
+        os.replace(tmp_path, self._meta_path)
+
+
+def ingest(documents, embedding, store: VectorStore, batch_size: int = 256) -> int:
+    """Embed an iterable of texts batch by batch and append them to the store."""
+    total = 0
+    for batch in batched(documents, batch_size):
+        # Prefer the array API of CachedEmbeddings when available
+        # Why: Skips building a list of Python float lists only to convert it back
+        if hasattr(embedding, "embed_documents_array"):
+            vectors = embedding.embed_documents_array(batch)
+        else:
+            vectors = embedding.embed_documents(batch)
+        store.append(batch, vectors)
+        total += len(batch)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help=".txt or .jsonl files to ingest")
+    parser.add_argument("--store", default="doc_store", help="Vector store directory")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--text-field", default="text", help="JSON key holding the text in .jsonl files")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    # Imported here so `--help` stays instant
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    embedding = HuggingFaceEmbeddings(model_name=args.model)
+    store = VectorStore(args.store)
+
+    start = time.perf_counter()
+    total = ingest(read_documents(args.paths, args.text_field), embedding, store, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {total} documents in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} docs/s)")
+    print(f"Store {args.store} now holds {len(store)} documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+'''
+Quantized ONNX Runtime backend for sentence-transformers embeddings on CPU
+
+HuggingFaceEmbeddings runs the float32 PyTorch model. OnnxEmbeddings exports
+the same transformer to ONNX once, optionally applies dynamic int8 weight
+quantization, caches both files on disk and runs them through ONNX Runtime.
+Mean pooling and L2 normalization (the rest of the all-MiniLM-L6-v2 pipeline)
+are done in numpy, so the vectors are interchangeable with the PyTorch ones.
+
+Cache layout (one directory per model / max_length / opset):
+    .onnx_cache/<hash>/model.onnx         float32 export
+    .onnx_cache/<hash>/model.int8.onnx    dynamic int8 quantization of it
+    .onnx_cache/<hash>/tokenizer.json     fast tokenizer, loaded without transformers
+    .onnx_cache/<hash>/meta.json          written last; its presence marks a complete export
+
+Only the first run needs torch + transformers (for the export). Later runs
+import onnxruntime and tokenizers only.
+
+Usage:
+    embedding = OnnxEmbeddings("sentence-transformers/all-MiniLM-L6-v2", quantize=True)
+    doc_embeddings = embedding.embed_documents(documents)
+    query_embedding = embedding.embed_query(query)
+
+    # Behind the persistent cache; a distinct model_name keeps int8 vectors apart from float32 ones
+    cached = CachedEmbeddings(model_name="all-MiniLM-L6-v2-onnx-int8", embeddings=embedding)
+
+    python onnx_embeddings.py --texts 2000          # agreement + speedup report vs PyTorch
+'''
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# plan_batches() - Length-sorted batches with a bounded padded token count
+# Why: The same bucketing that speeds up the PyTorch path cuts padding work for ONNX too
+from batch_embedding import plan_batches
+
+ONNX_OPSET = 17
+
+
+def _cache_dir(root: str, model_name: str, max_length: int) -> str:
+    key = f"{model_name}|max_length={max_length}|opset={ONNX_OPSET}"
+    return os.path.join(root, hashlib.sha256(key.encode()).hexdigest()[:16])
+
+
+def export_onnx(model_name: str, directory: str, max_length: int = 256) -> None:
+    """Export the transformer (without pooling) to directory/model.onnx and save its tokenizer."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["an example sentence", "another one"], padding=True, truncation=True,
+                       max_length=max_length, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(directory, "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+        )
+    tokenizer.backend_tokenizer.save(os.path.join(directory, "tokenizer.json"))
+
+
+def quantize_onnx(directory: str) -> None:
+    """Write model.int8.onnx: int8 weights, activations quantized on the fly at run time."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(os.path.join(directory, "model.onnx"), os.path.join(directory, "model.int8.onnx"),
+                     weight_type=QuantType.QInt8)
+
+
+class OnnxEmbeddings(Embeddings):
+    """Drop-in replacement for HuggingFaceEmbeddings that runs an ONNX export on CPU."""
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        quantize: bool = True,
+        cache_dir: str = ".onnx_cache",
+        normalize_embeddings: bool = True,
+        max_length: int = 256,
+        max_tokens_per_batch: int = 8192,
+        max_batch_size: int = 128,
+        threads: int | None = None,
+    ):
+        """
+        Parameters:
+            quantize: Use the dynamic int8 model (smaller and faster, slightly different vectors)
+            normalize_embeddings: all-MiniLM-L6-v2's sentence-transformers pipeline ends with a
+                Normalize layer, so True matches HuggingFaceEmbeddings for it
+            max_length: Token limit per text (all-MiniLM-L6-v2 was trained with 256)
+            threads: ONNX Runtime intra-op threads (default: all cores)
+        """
+        self.model_name = model_name
+        self.quantize = quantize
+        self.normalize = normalize_embeddings
+        self.max_length = max_length
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_batch_size = max_batch_size
+        self.threads = threads
+        self.directory = _cache_dir(cache_dir, model_name, max_length)
+        self._session = None
+        self._tokenizer = None
+        self._input_names = None
+
+    # ----- public Embeddings interface -----
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 matrix in the order of texts."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        session, tokenizer = self._load()
+        encodings = tokenizer.encode_batch(texts)
+        batches = plan_batches([len(e.ids) for e in encodings], self.max_tokens_per_batch, self.max_batch_size)
+
+        out = None
+        for batch in batches:
+            vectors = self._run(session, [encodings[i] for i in batch])
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[batch] = vectors
+        return out
+
+    # ----- internals -----
+
+    def _run(self, session, encodings) -> np.ndarray:
+        # Pad only to the longest text of this batch
+        width = max(len(e.ids) for e in encodings)
+        arrays = {
+            "input_ids": np.zeros((len(encodings), width), dtype=np.int64),
+            "attention_mask": np.zeros((len(encodings), width), dtype=np.int64),
+            "token_type_ids": np.zeros((len(encodings), width), dtype=np.int64),
+        }
+        for row, encoding in enumerate(encodings):
+            n = len(encoding.ids)
+            arrays["input_ids"][row, :n] = encoding.ids
+            arrays["attention_mask"][row, :n] = 1
+            arrays["token_type_ids"][row, :n] = encoding.type_ids
+        feeds = {name: arrays[name] for name in self._input_names}
+        hidden = session.run(["last_hidden_state"], feeds)[0]
+
+        # Mean pooling over real tokens, as sentence-transformers' Pooling layer does
+        mask = arrays["attention_mask"][:, :, None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.normalize:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors.astype(np.float32, copy=False)
+
+    def _load(self):
+        if self._session is None:
+            self._ensure_exported()
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_file(os.path.join(self.directory, "tokenizer.json"))
+            tokenizer.enable_truncation(self.max_length)
+            # Padding is done per batch in _run(), after length bucketing
+            tokenizer.no_padding()
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+            model_file = "model.int8.onnx" if self.quantize else "model.onnx"
+            session = ort.InferenceSession(os.path.join(self.directory, model_file), options,
+                                           providers=["CPUExecutionProvider"])
+            self._input_names = [i.name for i in session.get_inputs()]
+            self._tokenizer, self._session = tokenizer, session
+        return self._session, self._tokenizer
+
+    def _ensure_exported(self) -> None:
+        if os.path.exists(os.path.join(self.directory, "meta.json")):
+            return
+        # Export into a temporary sibling directory, then rename it into place
+        # Why: An interrupted export must not leave a half-written model that later runs would load
+        parent = os.path.dirname(self.directory) or "."
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix=".export-")
+        try:
+            export_onnx(self.model_name, staging, self.max_length)
+            quantize_onnx(staging)
+            with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"model_name": self.model_name, "max_length": self.max_length,
+                           "opset": ONNX_OPSET, "exported_at": time.time()}, f)
+            try:
+                os.rename(staging, self.directory)
+            except OSError:
+                # Another process finished the same export first; use theirs
+                if not os.path.exists(os.path.join(self.directory, "meta.json")):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+# ---------- Agreement and speedup report ----------
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Per-text cosine similarity between two embeddings of the same texts."""
+    a = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    b = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    return (a * b).sum(axis=1)
+
+
+def top1_agreement(reference: np.ndarray, candidate: np.ndarray, n_queries: int = 200) -> float:
+    """Fraction of queries (the first texts) whose nearest other text is the same under both embeddings."""
+    from similarity_search_engine import SimilaritySearchEngine
+
+    n_queries = min(n_queries, len(reference))
+    ref_idx, _ = SimilaritySearchEngine(reference).top_k_batch(reference[:n_queries], 2)
+    cand_idx, _ = SimilaritySearchEngine(candidate).top_k_batch(candidate[:n_queries], 2)
+    # Column 0 is the query itself
+    return float((ref_idx[:, 1] == cand_idx[:, 1]).mean())
+
+
+def main():
+    from benchmark_suite import synthetic_texts
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--texts", type=int, default=2000, help="Synthetic texts to embed")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--cache-dir", default=".onnx_cache")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.texts)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    reference_model = HuggingFaceEmbeddings(model_name=args.model, encode_kwargs={"batch_size": 128})
+    reference_model.embed_documents(texts[:32])  # warm-up
+    start = time.perf_counter()
+    reference = np.asarray(reference_model.embed_documents(texts), dtype=np.float32)
+    torch_s = time.perf_counter() - start
+
+    rows = [{"backend": "pytorch float32", "seconds": torch_s, "texts_per_s": len(texts) / torch_s,
+             "speedup": 1.0, "cosine_mean": 1.0, "cosine_min": 1.0, "top1_agreement": 1.0}]
+    for quantize in (False, True):
+        model = OnnxEmbeddings(args.model, quantize=quantize, cache_dir=args.cache_dir, threads=args.threads)
+        start = time.perf_counter()
+        model.embed_array(texts[:32])  # export on first use + session warm-up
+        setup_s = time.perf_counter() - start
+        start = time.perf_counter()
+        vectors = model.embed_array(texts)
+        seconds = time.perf_counter() - start
+        agreement = cosine_agreement(reference, vectors)
+        rows.append({"backend": f"onnx {'int8' if quantize else 'float32'}", "seconds": seconds,
+                     "texts_per_s": len(texts) / seconds, "speedup": torch_s / seconds,
+                     "cosine_mean": float(agreement.mean()), "cosine_min": float(agreement.min()),
+                     "top1_agreement": top1_agreement(reference, vectors), "setup_s": setup_s})
+
+    print(f"{args.texts} texts, model {args.model}\n")
+    print(f"{'backend':<18}{'texts/s':>10}{'speedup':>9}{'cos mean':>10}{'cos min':>9}{'top-1 same':>12}")
+    for row in rows:
+        print(f"{row['backend']:<18}{row['texts_per_s']:>10.1f}{row['speedup']:>8.2f}x"
+              f"{row['cosine_mean']:>10.4f}{row['cosine_min']:>9.4f}{row['top1_agreement']:>12.3f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "texts": args.texts, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
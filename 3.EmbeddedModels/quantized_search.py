@@ -0,0 +1,147 @@
+'''
+Quantized embedding storage with exact float32 rescoring
+
+Document vectors are kept in memory as float16 (2 bytes/dim) or int8 with a
+per-dimension scale (1 byte/dim) instead of float32 (4 bytes/dim). A coarse
+search runs over the compact codes, then only the best `k * rescore_factor`
+candidates are rescored against the original float32 vectors, which can stay on
+disk (e.g. the numpy.memmap of a VectorStore) since only a few rows are read.
+
+Speed: the coarse pass decodes about a thousand rows at a time into one reused,
+cache-sized float32 buffer, so int8 search is as fast as exact float32 search
+while holding a quarter of the memory. numpy has no fast float16 -> float32
+conversion, so float16 codes are ~6x slower to scan; pass cache_decoded=True to
+decode them once (speed of exact search, memory of float32 + float16).
+
+Usage:
+    store = VectorStore("doc_store", read_only=True)
+    engine = QuantizedSearchEngine(store.vectors, dtype="int8")
+    indices, scores = engine.top_k(query_embedding, k=5)
+'''
+import numpy as np
+
+from similarity_search_engine import normalize_rows, select_top_k
+
+SUPPORTED_DTYPES = ("float16", "int8")
+
+
+class QuantizedSearchEngine:
+    """Cosine top-k search over float16 / int8 codes with optional float32 rescoring."""
+
+    def __init__(
+        self,
+        doc_embeddings,
+        dtype: str = "int8",
+        rescore_factor: int = 4,
+        keep_full_vectors: bool = True,
+        chunk_size: int = 65536,
+        scan_rows: int = 1024,
+        query_batch_size: int = 256,
+        cache_decoded: bool = False,
+    ):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}, got {dtype!r}")
+        self.dtype = dtype
+        self.rescore_factor = rescore_factor
+        # chunk_size - Rows normalized and quantized at a time while building
+        # Why: Quantizing the whole matrix at once would bring back the float32 memory cost
+        self.chunk_size = chunk_size
+        # scan_rows - Rows decoded per step of the coarse pass, into one reused buffer
+        # Why: A buffer that fits in the CPU cache is scored right after decoding, before it is evicted;
+        #      large chunks make every query write and re-read a float32 copy of the corpus
+        self.scan_rows = scan_rows
+        # query_batch_size - Queries scored together; bounds the (queries x documents) score matrix
+        self.query_batch_size = query_batch_size
+        self.cache_decoded = cache_decoded
+        self._decoded = None
+
+        # Quantize chunk by chunk so a memmapped float32 corpus is never fully loaded
+        n_docs, dim = np.shape(doc_embeddings)
+        if dtype == "int8":
+            # Per-dimension scale = largest absolute value of that dimension / 127
+            # Why: MiniLM dimensions have very different ranges; one global scale wastes precision
+            max_abs = np.zeros(dim, dtype=np.float32)
+            for start in range(0, n_docs, chunk_size):
+                chunk = normalize_rows(doc_embeddings[start:start + chunk_size])
+                max_abs = np.maximum(max_abs, np.abs(chunk).max(axis=0))
+            max_abs[max_abs == 0] = 1.0
+            self.scale = max_abs / 127.0
+            self.codes = np.empty((n_docs, dim), dtype=np.int8)
+        else:
+            self.scale = None
+            self.codes = np.empty((n_docs, dim), dtype=np.float16)
+        for start in range(0, n_docs, chunk_size):
+            chunk = normalize_rows(doc_embeddings[start:start + chunk_size])
+            if dtype == "int8":
+                chunk = np.clip(np.rint(chunk / self.scale), -127, 127)
+            self.codes[start:start + chunk_size] = chunk.astype(self.codes.dtype)
+
+        # Reference only, no copy
+        # Why: Rescoring reads a handful of rows, so the float32 source can stay on disk
+        # Lists (what embed_documents() returns) are converted once; rescoring needs fancy indexing
+        if not keep_full_vectors:
+            self.full_vectors = None
+        elif isinstance(doc_embeddings, np.ndarray):
+            self.full_vectors = doc_embeddings
+        else:
+            self.full_vectors = np.asarray(doc_embeddings, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """In-memory cost of one document vector (the float32 originals are not counted)."""
+        return self.codes.shape[1] * self.codes.itemsize
+
+    def coarse_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate cosine scores of normalized queries against every document."""
+        if self.dtype == "int8":
+            # Fold the per-dimension scale into the query once
+            # Why: (q * scale) @ codes == q @ (codes * scale), without rescaling every document
+            queries = queries * self.scale
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if self.cache_decoded:
+            if self._decoded is None:
+                self._decoded = self.codes.astype(np.float32)
+            return queries @ self._decoded.T
+
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        buffer = np.empty((min(self.scan_rows, len(self)), self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(self), self.scan_rows):
+            block = buffer[:min(self.scan_rows, len(self) - start)]
+            np.copyto(block, self.codes[start:start + self.scan_rows], casting="unsafe")
+            np.matmul(queries, block.T, out=scores[:, start:start + block.shape[0]])
+        return scores
+
+    def top_k(self, query_embedding, k: int = 1, rescore: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) of the k documents most similar to one query."""
+        indices, scores = self.top_k_batch([query_embedding], k, rescore)
+        return indices[0], scores[0]
+
+    def top_k_batch(self, query_embeddings, k: int = 1, rescore: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) arrays of shape (n_queries, k)."""
+        queries = normalize_rows(query_embeddings)
+        rescore = rescore and self.full_vectors is not None and self.rescore_factor > 1
+        n_candidates = k * self.rescore_factor if rescore else k
+        parts = [select_top_k(self.coarse_scores(queries[start:start + self.query_batch_size]), n_candidates)
+                 for start in range(0, queries.shape[0], self.query_batch_size)]
+        if not parts:
+            k = min(k, len(self))
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k), dtype=np.float32)
+        candidates = np.concatenate([indices for indices, _ in parts])
+        coarse = np.concatenate([scores for _, scores in parts])
+        if not rescore:
+            return candidates, coarse
+
+        k = min(k, candidates.shape[1])
+        out_indices = np.empty((queries.shape[0], k), dtype=np.int64)
+        out_scores = np.empty((queries.shape[0], k), dtype=np.float32)
+        for q, (query, rows) in enumerate(zip(queries, candidates)):
+            # Sorted row order gives sequential reads when full_vectors is a memmap
+            rows = np.sort(rows)
+            exact = normalize_rows(self.full_vectors[rows]) @ query
+            best, best_scores = select_top_k(exact[None, :], k)
+            out_indices[q] = rows[best[0]]
+            out_scores[q] = best_scores[0]
+        return out_indices, out_scores
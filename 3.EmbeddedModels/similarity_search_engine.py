@@ -0,0 +1,90 @@
+'''
+Vectorized top-k cosine similarity search
+
+The document matrix is L2-normalized once when the engine is built, so every
+query is a single matrix product followed by np.argpartition. Only the k best
+candidates are ever sorted, instead of the whole corpus.
+
+Usage:
+    engine = SimilaritySearchEngine(doc_embeddings)
+    indices, scores = engine.top_k(query_embedding, k=3)
+    indices, scores = engine.top_k_batch(query_embeddings, k=3)
+'''
+# numpy - Numerical computing library
+# Why: A matrix product over float32 arrays replaces per-document Python work
+import numpy as np
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return a float32 copy of ``vectors`` with every row scaled to unit length."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    # Zero vectors stay zero instead of turning into NaN
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def select_top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Pick the k highest scores per row of a (n_queries, n_docs) score matrix.
+
+    Returns (indices, scores), both shaped (n_queries, k) and sorted best first.
+    """
+    n_docs = scores.shape[1]
+    k = min(k, n_docs)
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+
+    # np.argpartition() - Moves the k largest scores to the end in O(n)
+    # Why: Only those k candidates need sorting, not all n documents
+    if k < n_docs:
+        candidates = np.argpartition(scores, n_docs - k, axis=1)[:, n_docs - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n_docs), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+
+class SimilaritySearchEngine:
+    """Exact cosine-similarity search over a fixed document matrix."""
+
+    def __init__(self, doc_embeddings, batch_size: int = 1024):
+        # Normalize once at build time
+        # Why: After normalization cosine similarity is just a dot product
+        self.doc_matrix = normalize_rows(doc_embeddings)
+        if self.doc_matrix.ndim != 2:
+            raise ValueError("doc_embeddings must be a 2D array of shape (n_docs, dim)")
+        # batch_size - Number of queries scored per matrix product
+        # Why: Bounds the (queries x documents) score matrix for very large batches
+        self.batch_size = batch_size
+
+    def __len__(self) -> int:
+        return self.doc_matrix.shape[0]
+
+    def top_k(self, query_embedding, k: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) of the k documents most similar to one query."""
+        indices, scores = self.top_k_batch([query_embedding], k)
+        return indices[0], scores[0]
+
+    def top_k_batch(self, query_embeddings, k: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Return (indices, scores) arrays of shape (n_queries, k) for many queries at once."""
+        queries = normalize_rows(query_embeddings)
+        if queries.ndim != 2 or queries.shape[1] != self.doc_matrix.shape[1]:
+            raise ValueError(
+                f"query_embeddings must have shape (n_queries, {self.doc_matrix.shape[1]})"
+            )
+
+        all_indices, all_scores = [], []
+        for start in range(0, queries.shape[0], self.batch_size):
+            scores = queries[start:start + self.batch_size] @ self.doc_matrix.T
+            indices, top_scores = select_top_k(scores, k)
+            all_indices.append(indices)
+            all_scores.append(top_scores)
+
+        if not all_indices:
+            k = min(k, len(self))
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k), dtype=np.float32)
+        return np.concatenate(all_indices), np.concatenate(all_scores)
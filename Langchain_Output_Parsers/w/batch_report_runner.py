@@ -0,0 +1,180 @@
+'''
+Concurrent batch runner for the report -> summary chain in ostrOutputParser.py
+
+Every topic goes through the same two stages:
+    template1 -> model.ainvoke (detailed report) -> template2 -> model.ainvoke (5 line summary)
+
+`concurrency` workers each take one topic at a time through both stages, so at
+most `concurrency` requests are in flight and the stages pipeline: as soon as a
+worker's report finishes it asks for that summary, while the other workers are
+still generating reports. A shared FIFO limit over all tasks would instead queue
+every summary behind every pending report.
+
+Usage:
+    python batch_report_runner.py --topics topics.txt --concurrency 16
+    python batch_report_runner.py --stub --count 200 --concurrency 32    # no network, fake model
+'''
+import argparse
+import asyncio
+import pathlib
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import PromptTemplate
+
+# Repo root on sys.path for the shared common/ package
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+
+# Same prompts as ostrOutputParser.py
+template1 = PromptTemplate(
+    template="Make a detailed report on the {topic}",
+    input_variables=["topic"],
+)
+template2 = PromptTemplate(
+    template="write a 5 line summary of the following report: {report}",
+    input_variables=["report"],
+)
+
+
+@dataclass
+class TopicResult:
+    topic: str
+    report: str | None = None
+    summary: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class BatchStats:
+    report_latencies: list = field(default_factory=list)
+    summary_latencies: list = field(default_factory=list)
+    failures: int = 0
+    wall_time: float = 0.0
+
+    def describe(self, n_topics: int) -> str:
+        lines = [f"topics: {n_topics}, failures: {self.failures}, wall time: {self.wall_time:.2f}s, "
+                 f"throughput: {n_topics / max(self.wall_time, 1e-9):.2f} topics/s"]
+        for name, values in (("report", self.report_latencies), ("summary", self.summary_latencies)):
+            if values:
+                lines.append(f"{name:<8} p50 {percentile(values, 50):.3f}s  p95 {percentile(values, 95):.3f}s  "
+                             f"max {max(values):.3f}s  ({len(values)} calls)")
+        return "\n".join(lines)
+
+
+def percentile(values, pct: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+async def _timed_call(model, prompt, latencies: list):
+    start = time.perf_counter()
+    result = await model.ainvoke(prompt)
+    latencies.append(time.perf_counter() - start)
+    return result
+
+
+async def run_topic(topic: str, model, stats: BatchStats) -> TopicResult:
+    """Run both stages for one topic; errors are recorded instead of cancelling the batch."""
+    result = TopicResult(topic=topic)
+    try:
+        report = await _timed_call(model, template1.format_prompt(topic=topic), stats.report_latencies)
+        result.report = report.content
+        summary = await _timed_call(model, template2.format_prompt(report=report.content), stats.summary_latencies)
+        result.summary = summary.content
+    except Exception as exc:  # noqa: BLE001 - one bad topic must not stop hundreds of others
+        stats.failures += 1
+        result.error = f"{type(exc).__name__}: {exc}"
+    return result
+
+
+async def run_batch(topics, model, concurrency: int = 8) -> tuple[list[TopicResult], BatchStats]:
+    """Run the report -> summary chain for every topic; results keep the input order."""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    topics = list(topics)
+    results: list[TopicResult | None] = [None] * len(topics)
+    pending = iter(enumerate(topics))
+    stats = BatchStats()
+
+    async def worker():
+        # Each worker finishes its topic's summary before it starts another report
+        # Why: A summary never waits behind reports that were queued after it
+        for index, topic in pending:
+            results[index] = await run_topic(topic, model, stats)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(topics)))))
+    stats.wall_time = time.perf_counter() - start
+    return results, stats
+
+
+class StubChatModel(BaseChatModel):
+    """Local stand-in for ChatHuggingFace with a fixed per-call delay.
+
+    Lets the runner be exercised and benchmarked without network or API tokens.
+    """
+
+    delay: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.delay)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return self._reply(messages)
+
+    def _reply(self, messages) -> ChatResult:
+        text = f"Stub answer to: {messages[-1].content[:60]}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def build_model(args):
+    if args.stub:
+        return StubChatModel(delay=args.stub_delay)
+
+    from dotenv import load_dotenv
+
+    from common.http_transport import TransportConfig
+    from common.model_factory import build_chat_model
+
+    load_dotenv()
+    return build_chat_model("qwen-72b", transport=TransportConfig(), temperature=0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", help="Text file with one topic per line")
+    parser.add_argument("--count", type=int, default=100, help="Number of generated topics when --topics is not given")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stub", action="store_true", help="Use the local stub model instead of the HF endpoint")
+    parser.add_argument("--stub-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    from common import metrics
+
+    metrics.enable()
+    if args.topics:
+        with open(args.topics, encoding="utf-8") as f:
+            topics = [line.strip() for line in f if line.strip()]
+    else:
+        topics = [f"GenAI use case #{i}" for i in range(args.count)]
+
+    results, stats = asyncio.run(run_batch(topics, build_model(args), args.concurrency))
+    for result in results[:3]:
+        print(f"\n# {result.topic}\n{result.summary or result.error}")
+    print("\n" + stats.describe(len(topics)))
+
+
+if __name__ == "__main__":
+    main()
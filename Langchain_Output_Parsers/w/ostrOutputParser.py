@@ -1,14 +1,13 @@
-from langchain_huggingface import ChatHuggingFace,HuggingFaceEndpoint
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+from common import metrics
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv 
 load_dotenv()
-llm = HuggingFaceEndpoint(
-    repo_id ="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.5,
-    max_new_tokens=256
-)
-model = ChatHuggingFace (llm=llm)
+metrics.enable()  # per-call latency / token metrics, see common/metrics.py
+model = chat_model("qwen-72b", transport=TransportConfig(), temperature=0.5)
 # 1st prompt  
 template1 = PromptTemplate(
     template = "Make a detailed report on the {topic}",
@@ -1,22 +1,22 @@
-# Import required modules for LangChain and HuggingFace integration
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
 from dotenv import load_dotenv
+# Shared per-call latency / token metrics (common/metrics.py at the repo root)
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import metrics
+# chat_model() - Shared model settings (common/model_factory.py); langchain_huggingface is imported on first use
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
 from typing import TypedDict 
 
 # Load environment variables from .env file (for API keys and credentials)
 load_dotenv()
 
-# Create HuggingFace endpoint with model configuration
-# This initializes the Qwen2.5-72B model with specified parameters
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",  # Model repository ID
-    task="text-generation",                # Task type for the model
-    temperature=0.5,                       # Controls randomness (0.5 = moderate randomness)
-    max_new_tokens=256,                    # Maximum number of tokens to generate
-)
+# Record latency and token counts of every model call (CHAT_METRICS=0 turns it off)
+metrics.enable()
 
-# Create ChatHuggingFace model wrapper with the endpoint
-model = ChatHuggingFace(llm=llm)
+# Qwen2.5-72B-Instruct on the HF Inference API ("qwen-72b": text-generation, 256 new tokens)
+# temperature=0.5 controls randomness (0.5 = moderate randomness)
+model = chat_model("qwen-72b", transport=TransportConfig(), temperature=0.5)
 
 # Define a TypedDict for structured output
 # This specifies the structure of the response we want from the LLM
@@ -0,0 +1,62 @@
+# Streaming structured output: act on each field as soon as the model finishes it
+# 02_with_structured_output_typeddict.py waits for the whole JSON object before printing anything.
+# Here the same Review schema is parsed incrementally (see incremental_json.py), so
+# `summary` and `sentiment` are available while `pros` / `cons` are still being generated.
+
+from dotenv import load_dotenv
+# Shared per-call latency / token metrics (common/metrics.py at the repo root)
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import metrics
+# chat_model() - Shared model settings (common/model_factory.py); langchain_huggingface is imported on first use
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+from typing import TypedDict, Annotated, Optional
+import time
+
+# stream_structured() - Streaming version of model.with_structured_output(Review).invoke()
+# Why: Yields a partial Review dict every time another field closes, each field already
+#      validated against its TypedDict annotation
+from incremental_json import stream_structured
+
+# Load environment variables from .env file (for API keys and credentials)
+load_dotenv()
+
+# Record latency and token counts of every model call (CHAT_METRICS=0 turns it off)
+metrics.enable()
+
+# Same model settings as 02_with_structured_output_typeddict.py
+# temperature=0.5 controls randomness (0.5 = moderate randomness)
+model = chat_model("qwen-72b", transport=TransportConfig(), temperature=0.5)
+
+# Same Review schema as 02_, with summary and sentiment first
+# Why: Fields are generated in schema order, so the ones a consumer needs early should come first
+class Review(TypedDict):
+    summary: Annotated[str, "A brief summary of the review"]
+    sentiment: Annotated[str, "A brief sentiment of the review , either Positive , Negative or Neutral"]
+    key_themes: Annotated[list[str], "Write down all the key themes mentioned in  the review"]
+    pros: Optional[Annotated[list[str], "List down the pros mentioned in the review"]]
+    cons: Optional[Annotated[list[str], "List down the cons mentioned in the review"]]
+    name: Optional[Annotated[str, "Name of the person who reviewed the product"]]
+
+
+review_text = """I recently upgraded to the Samsung Galaxy S24 Ultra, and I must say, it's an absolute powerhouse! The Snapdragon 8 Gen 3 processor makes everything lightning fast. The 5000mAh battery easily lasts a full day even with heavy use.
+However, the weight and size make it a bit uncomfortable for one-handed use, One UI still comes with bloatware and the $1,300 price tag is a hard pill to swallow.
+Reviewed by Vanshdeep singh"""
+
+start = time.perf_counter()
+seen = set()
+review = {}
+# Each partial is a plain dict holding every field completed so far
+for review in stream_structured(model, Review, review_text):
+    for key in review.keys() - seen:
+        print(f"[{time.perf_counter() - start:5.2f}s] {key}: {review[key]}")
+
+        # Downstream work can start here, while the model is still listing pros and cons
+        # e.g. route negative reviews to the support team straight away
+        if key == "sentiment" and review["sentiment"].lower() == "negative":
+            print("        -> flagged for the support team")
+    seen |= review.keys()
+
+print(f"\nComplete review after {time.perf_counter() - start:.2f}s")
+print(review)
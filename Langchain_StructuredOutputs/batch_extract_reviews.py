@@ -0,0 +1,265 @@
+'''
+Batch structured extraction of the Review schema over a large review corpus
+
+02_with_structured_output_typeddict.py extracts one hard-coded review per run.
+This runner streams reviews from a file and extracts them concurrently:
+
+    reviews file --> bounded queue --> N workers (with_structured_output) --> results.jsonl
+
+- Reviews are read lazily, and the queue only holds a few per worker, so memory
+  stays flat whether the file has a hundred reviews or a million.
+- At most --concurrency model calls are in flight.
+- Only outputs that fail to parse or validate against Review are retried (up
+  to --max-retries). Other errors, such as HTTP failures, are recorded once.
+- Every finished review is appended to the output JSONL straight away. The
+  output doubles as the checkpoint: on restart, ids already in it are skipped.
+  Failed reviews count as done too, unless --retry-failed is given: then they
+  are extracted again and the new record is appended after the failed one (for
+  an id with several records, the last one wins).
+
+Input: JSONL with {"id": ..., "text": ...} per line, or plain text with one review
+per line (the line number becomes the id).
+
+Usage:
+    python batch_extract_reviews.py reviews.jsonl --out results.jsonl --concurrency 16
+    python batch_extract_reviews.py reviews.jsonl --out results.jsonl --retry-failed   # redo earlier failures
+    python batch_extract_reviews.py --stub --count 5000 --out /tmp/results.jsonl   # no network, fake model
+'''
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Annotated, Optional, TypedDict
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from incremental_json import TypedDictValidator, typeddict_validator
+
+
+# Same Review schema as 02_with_structured_output_typeddict.py
+class Review(TypedDict):
+    key_themes: Annotated[list[str], "Write down all the key themes mentioned in  the review"]
+    summary: Annotated[str, "A brief summary of the review "]
+    sentiment: Annotated[str, "A brief sentiment of the review , either Positive , Negative or Neutral"]
+    pros: Optional[Annotated[list[str], "List down the pros mentioned in the review"]]
+    cons: Optional[Annotated[list[str], "List down the cons mentioned in the review"]]
+    name: Optional[Annotated[str, "Name of the person who reviewed the product"]]
+
+
+@dataclass
+class ExtractionStats:
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0               # already in the output from an earlier run
+    retries: int = 0
+    attempts: Counter = field(default_factory=Counter)   # attempts needed -> number of reviews
+    wall_time: float = 0.0
+
+    def describe(self) -> str:
+        total = self.done + self.failed
+        lines = [
+            f"reviews: {total} processed, {self.skipped} skipped (checkpoint), wall time: {self.wall_time:.2f}s",
+            f"throughput: {total / max(self.wall_time, 1e-9):.1f} reviews/s, "
+            f"failure rate: {self.failed / max(total, 1):.2%}, retries: {self.retries}",
+        ]
+        if self.attempts:
+            lines.append("attempts: " + ", ".join(f"{n}x{count}" for n, count in sorted(self.attempts.items())))
+        return "\n".join(lines)
+
+
+def read_reviews(path: str):
+    """Yield (id, text) pairs one at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                yield str(record["id"]), record["text"]
+            else:
+                yield str(line_number), line
+
+
+def load_checkpoint(path: str, retry_failed: bool = False) -> set[str]:
+    """Ids already written to the output; a torn last line from a crash is cut off.
+
+    With retry_failed, only ids with a successful record (one holding "review") count.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    good_bytes = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                review_id = record["id"]
+            except (ValueError, KeyError, TypeError):
+                break
+            if not retry_failed or "review" in record:
+                done.add(review_id)
+            good_bytes += len(line)
+    if good_bytes != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_bytes)
+    return done
+
+
+class ParseFailure(Exception):
+    """The model answered, but not with a valid Review."""
+
+
+async def extract_one(structured_model, validator: TypedDictValidator, text: str) -> dict:
+    # include_raw=True returns parsing errors instead of raising them,
+    # so they can be told apart from network errors
+    output = await structured_model.ainvoke(text)
+    if output["parsing_error"] is not None or output["parsed"] is None:
+        raise ParseFailure(str(output["parsing_error"] or "no structured output in the reply"))
+    error = validator.errors(output["parsed"])
+    if error:
+        raise ParseFailure(error)
+    return output["parsed"]
+
+
+async def run_extraction(reviews, model, out_path: str, concurrency: int = 8, max_retries: int = 2,
+                         fsync_every: int = 100, retry_failed: bool = False) -> ExtractionStats:
+    """Extract every (id, text) in reviews not yet in out_path; append results as they finish."""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    structured_model = model.with_structured_output(Review, include_raw=True)
+    validator = typeddict_validator(Review)
+    done_ids = load_checkpoint(out_path, retry_failed)
+    stats = ExtractionStats()
+    # Why: A small bound keeps reading just ahead of the workers instead of loading the whole file
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    out = open(out_path, "a", encoding="utf-8")
+
+    def write(record: dict) -> None:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        if (stats.done + stats.failed) % fsync_every == 0:
+            os.fsync(out.fileno())
+
+    async def producer():
+        for review_id, text in reviews:
+            if review_id in done_ids:
+                stats.skipped += 1
+                continue
+            await queue.put((review_id, text))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker():
+        while (item := await queue.get()) is not None:
+            review_id, text = item
+            record = {"id": review_id}
+            for attempt in range(1, max_retries + 2):
+                try:
+                    record["review"] = await extract_one(structured_model, validator, text)
+                    break
+                except ParseFailure as exc:
+                    record["error"] = f"ParseFailure: {exc}"
+                    if attempt <= max_retries:
+                        stats.retries += 1
+                except Exception as exc:  # noqa: BLE001 - record it and keep the batch going
+                    record["error"] = f"{type(exc).__name__}: {exc}"
+                    break
+            if "review" in record:
+                record.pop("error", None)
+                stats.done += 1
+            else:
+                stats.failed += 1
+            record["attempts"] = attempt
+            stats.attempts[attempt] += 1
+            write(record)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    finally:
+        out.flush()
+        os.fsync(out.fileno())
+        out.close()
+        stats.wall_time = time.perf_counter() - start
+    return stats
+
+
+class StubChatModel(BaseChatModel):
+    """Tool-calling stand-in for ChatHuggingFace with a per-call delay and a bad-output rate."""
+
+    delay: float = 0.02
+    bad_output_rate: float = 0.1
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-structured-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        text = messages[-1].content
+        args = {"key_themes": ["stub"], "summary": text[:60], "sentiment": "Neutral", "pros": None, "cons": None}
+        if random.random() < self.bad_output_rate:
+            args["sentiment"] = ["not", "a", "string"]  # fails Review validation
+        message = AIMessage(content="", tool_calls=[{"name": "Review", "args": args, "id": "stub"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return asyncio.run(self._agenerate(messages))
+
+
+def build_model(args):
+    if args.stub:
+        return StubChatModel(delay=args.stub_delay, bad_output_rate=args.stub_bad_rate)
+
+    from dotenv import load_dotenv
+
+    from common.http_transport import TransportConfig
+    from common.model_factory import build_chat_model
+
+    load_dotenv()
+    # Same settings as 02_with_structured_output_typeddict.py
+    return build_chat_model("qwen-72b", transport=TransportConfig(), temperature=0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("reviews", nargs="?", help="JSONL ({id, text}) or plain text file, one review per line")
+    parser.add_argument("--out", default="reviews_extracted.jsonl", help="Output JSONL, also used as the checkpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=2, help="Retries for outputs that fail to parse/validate")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Extract again the reviews whose earlier record in --out is a failure")
+    parser.add_argument("--stub", action="store_true", help="Use a local fake model instead of the HF endpoint")
+    parser.add_argument("--count", type=int, default=1000, help="Generated reviews when no file is given (with --stub)")
+    parser.add_argument("--stub-delay", type=float, default=0.02)
+    parser.add_argument("--stub-bad-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # Repo root on sys.path for the shared common/ package
+    sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+    from common import metrics
+
+    metrics.enable()
+    if args.reviews:
+        reviews = read_reviews(args.reviews)
+    else:
+        reviews = ((str(i), f"Review #{i}: the battery is great but the camera is average.") for i in range(args.count))
+    stats = asyncio.run(run_extraction(reviews, build_model(args), args.out, args.concurrency, args.max_retries,
+                                         retry_failed=args.retry_failed))
+    print(stats.describe())
+
+
+if __name__ == "__main__":
+    main()
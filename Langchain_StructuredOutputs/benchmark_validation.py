@@ -0,0 +1,155 @@
+'''
+Parse + validate cost of the Review schema in all three schema styles
+
+Each style validates the same batch of model-style JSON outputs, once through
+the cached validators from validators.py and once the naive way (validator
+rebuilt on every call), at batch sizes from 1 to 100k:
+
+    typeddict           generated TypedDict checker (json/orjson parse + checks)
+    typeddict+adapter   the same TypedDict through pydantic.TypeAdapter
+    pydantic            BaseModel through TypeAdapter.validate_json
+    jsonschema          Review's JSON Schema, validator built once
+    *-uncached          naive baseline, e.g. jsonschema.validate(data, schema) per response
+
+Reported per row: build time of the validator, mean microseconds per response,
+responses/s, and the tracemalloc peak while validating the batch (results kept).
+
+Usage:
+    python benchmark_validation.py
+    python benchmark_validation.py --sizes 1 100 10000 --uncached-max 1000
+'''
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Annotated, Optional
+
+import jsonschema
+from pydantic import BaseModel, Field, TypeAdapter
+# typing_extensions.TypedDict, because pydantic rejects typing.TypedDict before Python 3.12
+from typing_extensions import TypedDict
+
+from incremental_json import TypedDictValidator
+from validators import SchemaValidationError, clear_cache, get_validator
+
+
+# Review in the three styles described in intro_to_structuredoutput.py
+class ReviewDict(TypedDict):
+    key_themes: Annotated[list[str], "Write down all the key themes mentioned in  the review"]
+    summary: Annotated[str, "A brief summary of the review "]
+    sentiment: Annotated[str, "A brief sentiment of the review , either Positive , Negative or Neutral"]
+    pros: Optional[Annotated[list[str], "List down the pros mentioned in the review"]]
+    cons: Optional[Annotated[list[str], "List down the cons mentioned in the review"]]
+    name: Optional[Annotated[str, "Name of the person who reviewed the product"]]
+
+
+class ReviewModel(BaseModel):
+    key_themes: list[str] = Field(description="Write down all the key themes mentioned in the review")
+    summary: str = Field(description="A brief summary of the review")
+    sentiment: str = Field(description="A brief sentiment of the review, either Positive, Negative or Neutral")
+    pros: Optional[list[str]] = Field(default=None, description="List down the pros mentioned in the review")
+    cons: Optional[list[str]] = Field(default=None, description="List down the cons mentioned in the review")
+    name: Optional[str] = Field(default=None, description="Name of the person who reviewed the product")
+
+
+REVIEW_JSON_SCHEMA = ReviewModel.model_json_schema()
+
+WORDS = "battery camera screen price bloatware speed weight zoom charging design software support".split()
+
+
+def make_outputs(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+
+    def phrases(k):
+        return [" ".join(rng.choices(WORDS, k=rng.randint(2, 6))) for _ in range(k)]
+
+    return [json.dumps({
+        "key_themes": phrases(rng.randint(2, 5)),
+        "summary": " ".join(rng.choices(WORDS, k=rng.randint(15, 40))),
+        "sentiment": rng.choice(["Positive", "Negative", "Neutral"]),
+        "pros": phrases(rng.randint(0, 4)) or None,
+        "cons": phrases(rng.randint(0, 4)) or None,
+        "name": rng.choice([None, "Vanshdeep singh", "A. Reviewer"]),
+    }) for _ in range(n)]
+
+
+# name -> (build(), validate(validator, text)); build() is timed separately
+CACHED = {
+    "typeddict": (lambda: get_validator(ReviewDict), lambda v, text: v.validate_json(text)),
+    "typeddict+adapter": (lambda: get_validator(ReviewDict, backend="pydantic"), lambda v, text: v.validate_json(text)),
+    "pydantic": (lambda: get_validator(ReviewModel), lambda v, text: v.validate_json(text)),
+    "jsonschema": (lambda: get_validator(REVIEW_JSON_SCHEMA), lambda v, text: v.validate_json(text)),
+}
+
+
+def _uncached_typeddict(_, text):
+    data = json.loads(text)
+    error = TypedDictValidator(ReviewDict, require_optional=True).errors(data)
+    if error:
+        raise SchemaValidationError(error)
+    return data
+
+
+UNCACHED = {
+    "typeddict-uncached": (lambda: None, _uncached_typeddict),
+    "typeddict+adapter-uncached": (lambda: None, lambda _, text: TypeAdapter(ReviewDict).validate_json(text)),
+    "jsonschema-uncached": (lambda: None, lambda _, text: jsonschema.validate(json.loads(text), REVIEW_JSON_SCHEMA)),
+}
+
+
+def run_batch(build, validate, outputs: list[str], measure_memory: bool) -> tuple[float, float, int]:
+    """Return (build seconds, validate seconds, tracemalloc peak bytes or 0)."""
+    # Start cold so "build" includes compiling the validator
+    clear_cache()
+    start = time.perf_counter()
+    validator = build()
+    build_time = time.perf_counter() - start
+
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    results = [validate(validator, text) for text in outputs]
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    del results
+    return build_time, elapsed, peak
+
+
+def check_rejects_bad_output() -> None:
+    bad = json.dumps({"key_themes": "not a list", "summary": "s", "sentiment": "Positive"})
+    for name, (build, validate) in CACHED.items():
+        try:
+            validate(build(), bad)
+        except (SchemaValidationError, ValueError):
+            continue
+        raise AssertionError(f"{name} accepted an invalid Review")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--uncached-max", type=int, default=1_000, help="Largest batch for the slow naive baselines")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (it slows validation)")
+    args = parser.parse_args()
+
+    check_rejects_bad_output()
+    print(f"{'style':<28} {'batch':>7} {'build':>9} {'us/item':>9} {'items/s':>10} {'peak KB':>9}")
+    for size in args.sizes:
+        outputs = make_outputs(size)
+        rows = dict(CACHED)
+        if size <= args.uncached_max:
+            rows.update(UNCACHED)
+        for name, (build, validate) in rows.items():
+            build_time, elapsed, _ = run_batch(build, validate, outputs, measure_memory=False)
+            peak = 0 if args.no_memory else run_batch(build, validate, outputs, measure_memory=True)[2]
+            print(f"{name:<28} {size:>7} {build_time * 1e3:>7.2f}ms {elapsed / size * 1e6:>9.1f} "
+                  f"{size / elapsed:>10.0f} {peak / 1024:>9.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
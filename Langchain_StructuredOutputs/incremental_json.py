@@ -0,0 +1,334 @@
+'''
+Incremental streaming parser for structured outputs
+
+model.with_structured_output(Review).invoke() only returns once the whole JSON
+object has been generated. LangChain's own streaming mode re-parses the full
+partial JSON on every chunk, which grows quadratically with the output.
+
+StreamingStructuredParser reads the JSON text once, character range by
+character range, and notices when a top-level field closes. Only that field's
+text is handed to json.loads and checked against the TypedDict annotation, so:
+
+    {"summary": "Great phone", "sentiment": "Positive", "pros": [...
+                            ^ summary ready          ^ sentiment ready, pros still generating
+
+Usage:
+    for partial in stream_structured(model, Review, review_text):
+        print(partial)            # {'summary': ...}, then {'summary': ..., 'sentiment': ...}, ...
+
+    parser = StreamingStructuredParser(Review)
+    for chunk in chunks:
+        for key, value in parser.feed(chunk):
+            ...
+    review = parser.finish()
+'''
+import functools
+import json
+import re
+import types
+import typing
+from typing import Any, Literal, Union, get_args, get_origin, get_type_hints, is_typeddict
+
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+class FieldValidationError(ValueError):
+    """A completed field does not match the TypedDict annotation."""
+
+
+# ---------- Validation: TypedDict annotations compiled once into checker functions ----------
+
+def _compile(tp):
+    """Return check(value) -> error message or None, for one annotation."""
+    if tp is Any:
+        return lambda value: None
+    if tp is type(None):
+        return lambda value: None if value is None else "expected null"
+
+    origin = get_origin(tp)
+    if origin in (Union, types.UnionType):
+        options = [_compile(arg) for arg in get_args(tp)]
+        names = " | ".join(getattr(arg, "__name__", str(arg)) for arg in get_args(tp))
+
+        def check_union(value):
+            if any(option(value) is None for option in options):
+                return None
+            return f"expected {names}"
+        return check_union
+    if origin is Literal:
+        allowed = get_args(tp)
+        return lambda value: None if value in allowed else f"expected one of {list(allowed)}"
+    if origin in (list, typing.List):
+        (item_type,) = get_args(tp) or (Any,)
+        check_item = _compile(item_type)
+
+        def check_list(value):
+            if not isinstance(value, list):
+                return "expected list"
+            for i, item in enumerate(value):
+                error = check_item(item)
+                if error:
+                    return f"[{i}]: {error}"
+            return None
+        return check_list
+    if origin in (dict, typing.Dict):
+        _, value_type = get_args(tp) or (str, Any)
+        check_value = _compile(value_type)
+
+        def check_dict(value):
+            if not isinstance(value, dict):
+                return "expected object"
+            for key, item in value.items():
+                error = check_value(item)
+                if error:
+                    return f"[{key!r}]: {error}"
+            return None
+        return check_dict
+    if is_typeddict(tp):
+        nested = TypedDictValidator(tp)
+
+        def check_typeddict(value):
+            if not isinstance(value, dict):
+                return "expected object"
+            return nested.errors(value)
+        return check_typeddict
+    if tp is bool:
+        return lambda value: None if isinstance(value, bool) else "expected bool"
+    if tp is int:
+        # Why: bool is a subclass of int, but true/false is not a valid integer field
+        return lambda value: None if isinstance(value, int) and not isinstance(value, bool) else "expected int"
+    if tp is float:
+        return lambda value: None if isinstance(value, (int, float)) and not isinstance(value, bool) else "expected number"
+    if isinstance(tp, type):
+        return lambda value: None if isinstance(value, tp) else f"expected {tp.__name__}"
+    # Anything exotic (TypeVar, Callable, ...) is not checked
+    return lambda value: None
+
+
+class TypedDictValidator:
+    """Per-field checkers for a TypedDict, built once and reused for every response."""
+
+    def __init__(self, schema, require_optional: bool = False):
+        # include_extras=False strips Annotated[...] descriptions, leaving the real types
+        hints = get_type_hints(schema)
+        self.schema = schema
+        self.checks = {name: _compile(tp) for name, tp in hints.items()}
+        required_keys = getattr(schema, "__required_keys__", hints)
+        # Optional[...] fields may be left out by the model, matching with_structured_output,
+        # unless require_optional asks for the TypedDict's own __required_keys__ (as pydantic does)
+        self.required = {name for name in required_keys
+                         if require_optional or self.checks[name](None) is not None}
+
+    def check_field(self, key: str, value) -> None:
+        if key not in self.checks:
+            raise FieldValidationError(f"{self.schema.__name__}: unexpected field {key!r}")
+        error = self.checks[key](value)
+        if error:
+            raise FieldValidationError(f"{self.schema.__name__}.{key}: {error}, got {value!r}")
+
+    def errors(self, data: dict) -> str | None:
+        """First problem with a complete dict, or None if it is valid."""
+        for key, value in data.items():
+            try:
+                self.check_field(key, value)
+            except FieldValidationError as exc:
+                return str(exc)
+        missing = self.required - data.keys()
+        return f"missing {sorted(missing)}" if missing else None
+
+
+@functools.lru_cache(maxsize=None)
+def typeddict_validator(schema, require_optional: bool = False) -> TypedDictValidator:
+    """Shared TypedDictValidator per schema, so each stream does not recompile the checks."""
+    return TypedDictValidator(schema, require_optional)
+
+
+# ---------- Parsing: find top-level field boundaries without re-reading the buffer ----------
+
+_STRING_STOP = re.compile(r'["\\]')
+_CONTAINER_STOP = re.compile(r'["\\\[\]{}]')
+_SCALAR_END = re.compile(r"[\s,}]")
+
+# States
+_BEFORE_OBJECT, _EXPECT_KEY, _IN_KEY, _EXPECT_COLON, _EXPECT_VALUE, _IN_VALUE, _AFTER_VALUE, _DONE = range(8)
+
+
+class StreamingStructuredParser:
+    """Feed JSON text in arbitrary chunks; get each top-level field as soon as it closes.
+
+    Each character is scanned once. Text before the opening brace (e.g. a ```json
+    fence) is skipped, as is anything after the closing brace.
+    """
+
+    def __init__(self, schema=None):
+        self.validator = typeddict_validator(schema) if schema is not None else None
+        self.result: dict = {}
+        self._buf = ""
+        self._pos = 0
+        self._state = _BEFORE_OBJECT
+        self._key = None
+        self._start = 0          # where the current key / value text starts in _buf
+        self._kind = None        # "string", "container" or "scalar"
+        self._depth = 0
+        self._in_string = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        """Add a chunk; return the (key, value) pairs that completed in it, validated."""
+        if self._state == _DONE or not text:
+            return []
+        self._buf += text
+        completed = []
+        buf = self._buf
+        n = len(buf)
+        pos = self._pos
+
+        while pos < n:
+            state = self._state
+            if state == _IN_VALUE:
+                pos = self._scan_value(buf, pos, n)
+                if self._state != _AFTER_VALUE:
+                    break  # value continues in a later chunk
+                completed.append(self._complete(buf[self._start:pos]))
+                continue
+            if state == _IN_KEY:
+                match = _STRING_STOP.search(buf, pos)
+                if match is None:
+                    pos = n
+                elif match.group() == "\\":
+                    if match.end() >= n:
+                        pos = match.start()  # wait for the escaped character
+                        break
+                    pos = match.end() + 1
+                else:
+                    self._key = json.loads(buf[self._start:match.end()])
+                    self._state = _EXPECT_COLON
+                    pos = match.end()
+                continue
+
+            char = buf[pos]
+            if char.isspace():
+                pos += 1
+                continue
+            if state == _BEFORE_OBJECT:
+                if char == "{":
+                    self._state = _EXPECT_KEY
+                pos += 1
+            elif state == _EXPECT_KEY:
+                if char == '"':
+                    self._state, self._start = _IN_KEY, pos
+                elif char == "}":
+                    self._state = _DONE
+                    break
+                elif char != ",":
+                    raise ValueError(f"expected a field name at offset {pos}, got {char!r}")
+                pos += 1
+            elif state == _EXPECT_COLON:
+                if char != ":":
+                    raise ValueError(f"expected ':' at offset {pos}, got {char!r}")
+                self._state = _EXPECT_VALUE
+                pos += 1
+            elif state == _EXPECT_VALUE:
+                self._state, self._start, self._depth, self._in_string = _IN_VALUE, pos, 0, False
+                self._kind = "string" if char == '"' else "container" if char in "[{" else "scalar"
+                if self._kind != "scalar":
+                    pos += 1
+                    self._depth = 1
+                    self._in_string = self._kind == "string"
+            elif state == _AFTER_VALUE:
+                if char == ",":
+                    self._state = _EXPECT_KEY
+                elif char == "}":
+                    self._state = _DONE
+                    break
+                else:
+                    raise ValueError(f"expected ',' or '}}' at offset {pos}, got {char!r}")
+                pos += 1
+
+        # Drop text that has been fully consumed so the buffer stays small
+        keep_from = self._start if self._state in (_IN_KEY, _IN_VALUE) else pos
+        self._buf = buf[keep_from:]
+        self._start -= keep_from
+        self._pos = pos - keep_from
+        return completed
+
+    def _scan_value(self, buf: str, pos: int, n: int) -> int:
+        """Advance through the current value; switch to _AFTER_VALUE when it ends."""
+        if self._kind == "scalar":
+            match = _SCALAR_END.search(buf, pos)
+            if match is None:
+                return n
+            self._state = _AFTER_VALUE
+            return match.start()
+
+        while pos < n:
+            match = (_STRING_STOP if self._in_string else _CONTAINER_STOP).search(buf, pos)
+            if match is None:
+                return n
+            char = match.group()
+            if char == "\\":
+                if match.end() >= n:
+                    return match.start()  # escaped character not here yet
+                pos = match.end() + 1
+                continue
+            pos = match.end()
+            if char == '"':
+                self._in_string = not self._in_string
+                if self._kind == "string":
+                    self._state = _AFTER_VALUE
+                    return pos
+            elif char in "[{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = _AFTER_VALUE
+                    return pos
+        return pos
+
+    def _complete(self, text: str) -> tuple[str, Any]:
+        value = json.loads(text)
+        if self.validator is not None:
+            self.validator.check_field(self._key, value)
+        self.result[self._key] = value
+        return self._key, value
+
+    def finish(self) -> dict:
+        """Return the complete dict; raises if the object never closed or misses required fields."""
+        if self._state != _DONE:
+            raise ValueError("stream ended before the JSON object was closed")
+        if self.validator is not None:
+            missing = self.validator.required - self.result.keys()
+            if missing:
+                raise FieldValidationError(f"{self.validator.schema.__name__}: missing {sorted(missing)}")
+        return self.result
+
+
+# ---------- Model integration ----------
+
+def chunk_text(chunk) -> str:
+    """JSON text carried by one AIMessageChunk: tool-call argument fragments, else content."""
+    tool_chunks = getattr(chunk, "tool_call_chunks", None)
+    if tool_chunks:
+        return "".join(tc.get("args") or "" for tc in tool_chunks)
+    return chunk.content if isinstance(chunk.content, str) else ""
+
+
+def stream_structured(model, schema, model_input, **kwargs):
+    """Streaming counterpart of model.with_structured_output(schema).invoke().
+
+    Yields a copy of the partial dict every time another field completes, and
+    returns (StopIteration.value) the final validated dict.
+    """
+    tool_name = convert_to_openai_tool(schema)["function"]["name"]
+    bound = model.bind_tools([schema], tool_choice=tool_name)
+    parser = StreamingStructuredParser(schema)
+    for chunk in bound.stream(model_input, **kwargs):
+        if parser.feed(chunk_text(chunk)):
+            yield dict(parser.result)
+        if parser.done:
+            break
+    return parser.finish()
@@ -0,0 +1,164 @@
+'''
+One validation layer for the three schema styles in intro_to_structuredoutput.py
+
+    TypedDict    -> checker functions generated from the annotations (incremental_json.TypedDictValidator)
+    Pydantic     -> pydantic.TypeAdapter, parses and validates JSON in one pass in Rust
+    JSON Schema  -> jsonschema validator class checked and built once
+
+Building a validator is the expensive part (TypeAdapter builds a pydantic-core
+schema, jsonschema.validate() re-checks the schema itself on every call), so
+get_validator() builds each one once and hands the same object back after that.
+
+Usage:
+    validator = get_validator(Review)                  # TypedDict, BaseModel or JSON Schema dict
+    review = validator.validate_json(model_output)     # str/bytes -> validated object
+    review = validator.validate_python(parsed_dict)
+
+Every backend raises SchemaValidationError (a ValueError) on bad data, and all
+three agree on required keys: a TypedDict key is required if it is in
+__required_keys__, even when its type is Optional[...] (the value may be null,
+the key may not be missing). The streaming parser in incremental_json is more
+lenient and lets the model leave Optional keys out.
+
+clear_cache() drops every built validator, e.g. to time cold builds.
+'''
+import functools
+import json
+
+from incremental_json import typeddict_validator
+
+# orjson is optional; it parses JSON several times faster than the json module
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+class SchemaValidationError(ValueError):
+    """Data does not match the schema, whichever backend found it."""
+
+
+class TypedDictBackend:
+    kind = "typeddict"
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._validator = typeddict_validator(schema, require_optional=True)
+
+    def validate_python(self, data):
+        if not isinstance(data, dict):
+            raise SchemaValidationError(f"{self.schema.__name__}: expected object, got {type(data).__name__}")
+        error = self._validator.errors(data)
+        if error:
+            raise SchemaValidationError(error)
+        return data
+
+    def validate_json(self, text):
+        try:
+            data = _loads(text)
+        except ValueError as exc:
+            raise SchemaValidationError(f"invalid JSON: {exc}") from None
+        return self.validate_python(data)
+
+
+class PydanticBackend:
+    kind = "pydantic"
+
+    def __init__(self, schema):
+        from pydantic import TypeAdapter
+
+        self.schema = schema
+        self._adapter = TypeAdapter(schema)
+
+    def validate_python(self, data):
+        from pydantic import ValidationError
+
+        try:
+            return self._adapter.validate_python(data)
+        except ValidationError as exc:
+            raise SchemaValidationError(str(exc)) from None
+
+    def validate_json(self, text):
+        from pydantic import ValidationError
+
+        # Why: validate_json parses straight into the schema, skipping the intermediate dict
+        try:
+            return self._adapter.validate_json(text)
+        except ValidationError as exc:
+            raise SchemaValidationError(str(exc)) from None
+
+
+class JSONSchemaBackend:
+    kind = "jsonschema"
+
+    def __init__(self, schema: dict):
+        import jsonschema
+
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)  # once here instead of on every jsonschema.validate() call
+        self.schema = schema
+        self._validator = cls(schema)
+
+    def validate_python(self, data):
+        # best_match looks at every error; only pay for it when the data is invalid
+        if not self._validator.is_valid(data):
+            import jsonschema
+
+            raise SchemaValidationError(jsonschema.exceptions.best_match(self._validator.iter_errors(data)).message)
+        return data
+
+    def validate_json(self, text):
+        try:
+            data = _loads(text)
+        except ValueError as exc:
+            raise SchemaValidationError(f"invalid JSON: {exc}") from None
+        return self.validate_python(data)
+
+
+def _is_pydantic_model(schema) -> bool:
+    try:
+        from pydantic import BaseModel
+    except ImportError:
+        return False
+    return isinstance(schema, type) and issubclass(schema, BaseModel)
+
+
+@functools.lru_cache(maxsize=256)
+def _cached(schema, backend: str):
+    if backend == "jsonschema":
+        if isinstance(schema, str):
+            return JSONSchemaBackend(json.loads(schema))
+        # TypedDict / BaseModel class: validate against its generated JSON Schema
+        from pydantic import TypeAdapter
+
+        return JSONSchemaBackend(TypeAdapter(schema).json_schema())
+    if backend == "pydantic":
+        return PydanticBackend(schema)
+    return TypedDictBackend(schema)
+
+
+def clear_cache() -> None:
+    """Forget every validator built by get_validator()."""
+    _cached.cache_clear()
+    typeddict_validator.cache_clear()
+
+
+def get_validator(schema, backend: str | None = None):
+    """Compiled validator for schema, built on first use and cached.
+
+    schema:  TypedDict class, Pydantic BaseModel class, or JSON Schema dict
+    backend: force "typeddict", "pydantic" or "jsonschema"; by default picked from the schema.
+             backend="pydantic" also works for a TypedDict (TypeAdapter supports both; before
+             Python 3.12 it needs typing_extensions.TypedDict), and
+             backend="jsonschema" validates a class against its generated JSON Schema.
+    """
+    if isinstance(schema, dict):
+        # dicts are not hashable; the canonical JSON text is the cache key
+        return _cached(json.dumps(schema, sort_keys=True), "jsonschema")
+    if backend is None:
+        backend = "pydantic" if _is_pydantic_model(schema) else "typeddict"
+    if backend not in ("typeddict", "pydantic", "jsonschema"):
+        raise ValueError(f"unknown backend {backend!r}; use 'typeddict', 'pydantic' or 'jsonschema'")
+    return _cached(schema, backend)
@@ -1,21 +1,27 @@
-from langchain_huggingface import ChatHuggingFace
-from langchain_huggingface import HuggingFaceEndpoint
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+from common import metrics
 from dotenv import load_dotenv
-import streamlit as st 
+import streamlit as st
 
 load_dotenv()
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.7,
-    max_new_tokens=50,
-)
-model = ChatHuggingFace(llm=llm)
+metrics.enable()  # per-call latency / token metrics, see common/metrics.py
+
+# Built once per server process instead of on every widget interaction
+@st.cache_resource
+def get_model():
+    # Qwen2.5-72B-Instruct, temperature 0.7, short 50-token answers
+    return chat_model("qwen-72b", transport=TransportConfig(), max_new_tokens=50)
+
+
+model = get_model()
 
 st.header('Research Assistant')
 
 user_input=st.text_input('Enter your Query...')
 if st.button('Summarize'):
-    result=model.invoke(user_input)
-    st.write(result.content)
-# Static Prompt example 
+    # Stream tokens into the page as they arrive
+    st.write_stream(chunk.content for chunk in model.stream(user_input))
+# Static Prompt example
@@ -1,18 +1,55 @@
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+from common import metrics
 from dotenv import load_dotenv
 import streamlit as st
-from langchain_core.prompts import PromptTemplate,load_prompt
+from response_cache import ResponseCache
+from template_registry import build_default_registry
 
 load_dotenv()
+metrics.enable()  # per-call latency / token metrics, see common/metrics.py
 
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.7,
-    max_new_tokens=256
-)
+# Streamlit re-runs this whole script on every widget interaction.
+# @st.cache_resource builds an object once per server process and shares it
+# across reruns and sessions, so the client, template and cache are not rebuilt.
+@st.cache_resource
+def get_model():
+    # Qwen2.5-72B-Instruct, temperature 0.7, 256 new tokens
+    return chat_model("qwen-72b", transport=TransportConfig())
+
+
+@st.cache_resource
+def get_templates():
+    # Load and precompile the prompt templates, including template.json (once per process)
+    return build_default_registry()
+
+
+@st.cache_resource
+def get_cache():
+    # Exact response cache (memory LRU + SQLite on disk)
+    # temperature=0.7 samples, so caching is an explicit opt-in here:
+    # the same paper/style/length selection returns the stored explanation
+    return ResponseCache(".response_cache.sqlite", allow_nondeterministic=True)
 
-model = ChatHuggingFace(llm=llm)
+
+# @st.cache_data memoizes by argument values
+# Why: Re-formatting the same (paper, style, length) on every rerun is wasted work
+@st.cache_data
+def build_prompt(paper, style, length):
+    return get_templates().format(
+        "research_summary",
+        paper_input=paper,
+        style_input=style,
+        length_input=length
+        # LEFT SIDE (keyword argument) = placeholder name in template string
+        # RIGHT SIDE (value) = Python variable holding actual data
+    )
+
+
+model = get_model()
+cache = get_cache()
 
 st.header('Research Assistant')
 
@@ -30,26 +67,19 @@ length_input = st.selectbox(
     "Select Explanation Length",
     ["Short (1-2 paragraphs)", "Medium (3-5 paragraphs)", "Long (detailed explanation)"]
 )
-# Load the prompt template from the JSON file
-template= load_prompt('template.json')
 
 
-# renaming for clarity 
+# renaming for clarity
 selected_paper = paper_input
 selected_style = style_input
 selected_length = length_input
 
-prompt = template.format(
-    paper_input=selected_paper, 
-    style_input=selected_style,   
-    length_input=selected_length  
-    # LEFT SIDE (keyword argument) = placeholder name in template string
-    # RIGHT SIDE (value) = Python variable holding actual data
-
-)
+prompt = build_prompt(selected_paper, selected_style, selected_length)
 
 if st.button('Generate Explanation'):
-    result = model.invoke(prompt)
-    st.write(result.content)     
+    # st.write_stream() renders tokens as they arrive from the endpoint;
+    # cached explanations (per paper/style/length) are shown immediately
+    st.write_stream(cache.stream(model, prompt))
+    st.caption(f"cache: {cache.stats()}")
 
-#refer 2.1 for any variable related doubt 
+#refer 2.1 for any variable related doubt
@@ -1,21 +1,28 @@
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+from common import metrics
 from dotenv import load_dotenv
+from streaming import stream_reply
 load_dotenv()
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.7,
-    max_new_tokens=256,
+metrics.enable()  # per-call latency / token metrics, see common/metrics.py
 
-)
-model = ChatHuggingFace(llm=llm)
+# Stream tokens to the console as they arrive and show per-turn timing
+STREAMING = True
+# Qwen2.5-72B-Instruct, temperature 0.7, 256 new tokens (built on first use)
+model = chat_model("qwen-72b", transport=TransportConfig())
 
 while True:
     user_input= input("you:")
     if user_input =='exit' :
         break
-    result=model.invoke(user_input)
-    print("Ai:",result.content)
+    if STREAMING:
+        result, stats = stream_reply(model, user_input)
+        print(stats)
+    else:
+        result=model.invoke(user_input)
+        print("Ai:",result.content)
     
     # The problem in above chatbot is that it does not have any history , it cannot remember previous conversation.
 
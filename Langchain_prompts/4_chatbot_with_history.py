@@ -1,35 +1,44 @@
-# ChatHuggingFace - LangChain wrapper for Hugging Face chat models
-# Why: Provides standardized chat interface with conversation history support
-# HuggingFaceEndpoint - Connects to Hugging Face Inference API
-# Why: Enables remote access to large language models without local resources
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+# chat_model() - Builds a named chat model from the shared factory in common/
+# Why: The model settings live in one place, and langchain_huggingface (which pulls in
+#      transformers/torch) is only imported when the first message is sent,
+#      so the "you:" prompt appears immediately
+# sys.path.append() - Makes the repo root (and common/) importable from this folder
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+from common import metrics
 
 # load_dotenv() - Loads environment variables from .env file
 # Why: Securely manages API keys needed for Hugging Face API authentication
 from dotenv import load_dotenv
 
+# stream_reply() - Streams the answer to the console and returns it with timing stats
+# Why: The user sees the first words within the time-to-first-token instead of
+#      waiting for the whole answer to be generated
+from streaming import stream_reply
+
+# STREAMING - Switch between streamed and blocking responses
+# Why: Set to False to get the original invoke() behaviour
+STREAMING = True
+
 # load_dotenv() - Executes the loading of environment variables
 # Why: Makes HUGGINGFACEHUB_API_TOKEN available for authentication
 load_dotenv()
 
-# HuggingFaceEndpoint() - Initializes connection to Hugging Face model
-# Why: Sets up the base LLM with specific parameters for text generation
-# Parameters explained:
-#   - repo_id: Qwen 2.5 72B is a powerful multilingual instruction-following model
+# metrics.enable() - Records latency, time-to-first-token and token counts of every model call
+# Why: Shows whether a slow answer was the network or generation (see common/metrics.py)
+metrics.enable()
+
+# chat_model() - Chat model wrapper around the Hugging Face Inference API
+# Why: Sets up the LLM with specific generation parameters
+# Settings ("qwen-72b" in common/model_factory.py):
+#   - repo_id: Qwen 2.5 72B is a powerful instruction-following model
 #   - task: text-generation enables chat/completion capabilities
-#   - temperature: 0.7 balances creativity with coherence
+#   - temperature: 0.7 (balances creativity with coherence)
 #   - max_new_tokens: 256 limits response length for faster responses
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.7,
-    max_new_tokens=256,
-
-)
-
-# ChatHuggingFace() - Wraps the endpoint for chat functionality
-# Why: Enables conversation with context by passing message history
-model = ChatHuggingFace(llm=llm)
+# Note: The model is built on first use, so nothing heavy is loaded at startup
+model = chat_model("qwen-72b", transport=TransportConfig())
 
 # chat_history - List to store all conversation messages
 # Why: Maintains context so the AI can reference previous messages in the conversation
@@ -54,15 +63,22 @@ while True:
     # model.invoke() - Sends entire chat history to the model
     # Why: By passing the full history, the model can understand context and reference
     #      previous messages (e.g., "multiply the bigger one" references earlier conversation)
-    result=model.invoke(chat_history )
-    
+    #      With STREAMING, stream_reply() prints chunks as they arrive and still
+    #      returns the complete message, plus time-to-first-token and tokens/sec
+    if STREAMING:
+        result, stats = stream_reply(model, chat_history)
+        print(stats)
+    else:
+        result=model.invoke(chat_history )
+
     # chat_history.append() - Adds AI response to history
     # Why: Stores the AI's response so it can be referenced in future turns
     chat_history.append(result.content)
     
     # print() - Displays the AI's response
-    # Why: Shows the user what the AI responded
-    print("Ai:",result.content)
+    # Why: Shows the user what the AI responded (already printed while streaming)
+    if not STREAMING:
+        print("Ai:",result.content)
 
 # print() - Displays full conversation history
 # Why: Useful for debugging and seeing the complete conversation flow
@@ -1,13 +1,20 @@
-# ChatHuggingFace - LangChain wrapper for HF chat models
-# HuggingFaceEndpoint - Connects to Hugging Face Inference API
-# Why: Enables structured chat with proper message handling
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
-
 # SystemMessage, HumanMessage, AIMessage - Explicit message type classes
 # Why: Differentiates between system instructions, user input, and AI responses
 #      Better than plain strings as it makes conversation structure clear to the model
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage 
 
+# metrics - Per-call latency, time-to-first-token and token counts (see common/metrics.py)
+# Why: The repo root is put on sys.path so the shared common/ package can be imported
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common import metrics
+
+# chat_model() - Builds a named chat model from the shared factory in common/
+# Why: The model settings live in one place, and langchain_huggingface (which pulls in
+#      transformers/torch) is only imported when the model is first used
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+
 # load_dotenv() - Loads environment variables from .env file
 # Why: Securely manages API keys without hardcoding
 from dotenv import load_dotenv
@@ -16,24 +23,18 @@ from dotenv import load_dotenv
 # Why: Makes HUGGINGFACEHUB_API_TOKEN available for authentication
 load_dotenv()
 
-# HuggingFaceEndpoint() - Initializes connection to HF Inference API
-# Why: Sets up the base LLM with specific generation parameters
-# Parameters:
+# metrics.enable() - Records every model call made by this script
+# Why: One line; set CHAT_METRICS=0 to turn it off, CHAT_METRICS_JSON=file.json to export
+metrics.enable()
+
+# chat_model() - ChatHuggingFace around the HF Inference API, built on first use
+# Why: Provides invoke() method and handles message objects properly
+# Settings ("qwen-72b" in common/model_factory.py):
 #   - repo_id: Qwen 2.5 72B is a powerful instruction-following model
 #   - task: text-generation enables chat/completion capabilities
 #   - temperature: 0.7 balances creativity with coherence
 #   - max_new_tokens: 256 limits response length
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.7,
-    max_new_tokens=256
-
-)
-
-# ChatHuggingFace() - Wraps the endpoint for chat-based interactions
-# Why: Provides invoke() method and handles message objects properly
-model = ChatHuggingFace(llm=llm)
+model = chat_model("qwen-72b", transport=TransportConfig())
 
 # messages - List of message objects representing the conversation
 # Why: Using SystemMessage/HumanMessage instead of strings provides:
@@ -1,8 +1,14 @@
 
-# ChatHuggingFace - LangChain wrapper for HF chat models
-# HuggingFaceEndpoint - Connects to Hugging Face Inference API
-# Why: Enables structured chat interactions with API-hosted models
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+# chat_model() - Builds a named chat model from the shared factory in common/
+# Why: The model settings live in one place, and langchain_huggingface (which pulls in
+#      transformers/torch) is only imported when the first message is sent,
+#      so the "you:" prompt appears immediately
+# sys.path.append() - Makes the repo root (and common/) importable from this folder
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.model_factory import chat_model
+from common.http_transport import TransportConfig
+from common import metrics
 
 # SystemMessage, HumanMessage, AIMessage - Explicit message type classes
 # Why: These classes solve the problem from 4_chatbot_with_history.py where plain strings
@@ -13,33 +19,55 @@ from langchain_core.messages import SystemMessage , HumanMessage, AIMessage
 # Why: Securely manages API keys without hardcoding
 from dotenv import load_dotenv
 
+# stream_reply() - Streams the answer to the console and returns it with timing stats
+# Why: The user sees the first words within the time-to-first-token instead of
+#      waiting for the whole answer to be generated
+from streaming import stream_reply
+
+# TokenBudgetHistory - Chat history that stays under a token budget
+# hf_token_counter() - Counts tokens with the model's own tokenizer
+# Why: Sending the whole conversation every turn makes each turn slower than the last
+from history_manager import TokenBudgetHistory, hf_token_counter
+
+# STREAMING - Switch between streamed and blocking responses
+# Why: Set to False to get the original invoke() behaviour
+STREAMING = True
+
 # load_dotenv() - Executes loading of environment variables
 # Why: Makes HUGGINGFACEHUB_API_TOKEN available for authentication
 load_dotenv()
 
-# HuggingFaceEndpoint() - Initializes connection to HF Inference API
-# Why: Sets up the base LLM with specific generation parameters
-# Parameters:
+# metrics.enable() - Records latency, time-to-first-token and token counts of every model call
+# Why: Shows whether a slow answer was the network or generation (see common/metrics.py)
+metrics.enable()
+
+# chat_model() - Chat model wrapper around the Hugging Face Inference API
+# Why: Sets up the LLM with specific generation parameters
+# Settings ("qwen-72b" in common/model_factory.py):
 #   - repo_id: Qwen 2.5 72B is a powerful instruction-following model
 #   - task: text-generation enables chat/completion capabilities
-#   - temperature: 0.7 balances creativity with coherence
+#   - temperature: 0.3 (overridden here for more focused answers)
 #   - max_new_tokens: 256 limits response length for faster responses
-llm = HuggingFaceEndpoint(
-    repo_id="Qwen/Qwen2.5-72B-Instruct",
-    task="text-generation",
-    temperature=0.3,
-    max_new_tokens=256,
+# Note: The model is built on first use, so nothing heavy is loaded at startup
+model = chat_model("qwen-72b", transport=TransportConfig(), temperature=0.3)
 
-)
-# ChatHuggingFace() - Wraps the endpoint for chat-based interactions
-# Why: Provides invoke() method and handles message objects properly
-model = ChatHuggingFace(llm=llm)
-
-# chat_history - List initialized with SystemMessage
+# chat_history - Token-budgeted history initialized with SystemMessage
 # Why: SystemMessage sets the AI's behavior for the entire conversation
 #      Unlike 4_chatbot_with_history.py (plain list), this explicitly defines the assistant's role
 #      All subsequent messages reference this system instruction
-chat_history =[SystemMessage(content='You are a helpful assistant.')]
+#      TokenBudgetHistory always keeps the SystemMessage, and once the conversation
+#      exceeds max_tokens it folds the oldest turns into a running summary,
+#      so per-turn latency stays flat instead of growing with every message
+# Parameters:
+#   - max_tokens: Budget for what is sent each turn (the reply's 256 tokens come on top)
+#   - token_counter: Counts tokens with the Qwen tokenizer; each message is counted once and cached
+#   - summarizer: The same model condenses trimmed turns into a summary
+chat_history = TokenBudgetHistory(
+    SystemMessage(content='You are a helpful assistant.'),
+    max_tokens=2048,
+    token_counter=hf_token_counter("Qwen/Qwen2.5-72B-Instruct"),
+    summarizer=model,
+)
 
 
 # while True - Infinite loop for continuous conversation
@@ -63,13 +91,19 @@ while True:
     chat_history.append(HumanMessage(content=user_input))
     
     
-    # model.invoke() - Sends entire chat history with proper message types to the model
+    # model.invoke() - Sends the (budgeted) chat history with proper message types to the model
     # Why: By passing messages with explicit types (System/Human/AI), the model understands:
     #      1. What's the system instruction
     #      2. What the user asked
     #      3. What the AI previously responded
     #      This is much better than 4_chatbot_with_history.py where everything was just strings
-    result=model.invoke(chat_history )
+    #      With STREAMING, stream_reply() prints chunks as they arrive and still
+    #      assembles the complete AIMessage, plus time-to-first-token and tokens/sec
+    if STREAMING:
+        result, stats = stream_reply(model, chat_history.messages())
+        print(stats)
+    else:
+        result=model.invoke(chat_history.messages())
     
     
     # AIMessage - Creates a message object for AI's response
@@ -80,11 +114,12 @@ while True:
     
     
     # print() - Displays the AI's response
-    # Why: Shows the user what the AI responded
-    print("Ai:",result.content)
+    # Why: Shows the user what the AI responded (already printed while streaming)
+    if not STREAMING:
+        print("Ai:",result.content)
 
 # print() - Displays full conversation history with message types
 # Why: Shows the structured conversation format with explicit roles
 #      Example output: [SystemMessage(...), HumanMessage(...), AIMessage(...), ...]
 #      Compare this to 4_chatbot_with_history.py which just showed strings
-print(chat_history )
\ No newline at end of file
+print(chat_history.messages())
\ No newline at end of file
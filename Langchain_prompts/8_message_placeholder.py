@@ -1,4 +1,8 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+# ChatHistoryStore - per-session, append-only history with tail reads
+# Why: Loading the prompt's history costs the same on turn 5 and on turn 5000
+from history_store import ChatHistoryStore
+
 # chat template
 chat_template = ChatPromptTemplate([
     ('system','You are a helpful customer support agent'),
@@ -6,14 +10,25 @@ chat_template = ChatPromptTemplate([
     ('human','{query}')
 ])
 
-chat_history = []
-# load chat history
-with open('chat_history.txt') as f:
-    chat_history.extend(f.readlines())
+store = ChatHistoryStore()
+session_id = 'customer-12345'
+
+# one-time import of the old flat file into this session
+if store.count(session_id) == 0:
+    store.import_legacy_file(session_id, 'chat_history.txt')
+
+# load chat history - only the newest messages, already typed (HumanMessage / AIMessage)
+chat_history = store.tail(session_id, n=20)
 
 print(chat_history)
 
+query = 'Where is my refund'
 # create prompt
-prompt = chat_template.invoke({'chat_history':chat_history, 'query':'Where is my refund'})
+prompt = chat_template.invoke({'chat_history':chat_history, 'query':query})
+
+print(prompt)
 
-print(prompt)
\ No newline at end of file
+# No model is called here, so nothing is written back
+# Why: Storing the question without an answer would add another unanswered copy on every run.
+#      Once a model has replied, record the whole turn at once (messages from langchain_core.messages):
+#      store.extend(session_id, [HumanMessage(content=query), AIMessage(content=result.content)])
@@ -0,0 +1,79 @@
+'''
+Micro-benchmark: precompiled templates vs LangChain formatting
+
+Compares, per call:
+    - load_prompt("template.json").format(...)   vs  CompiledTemplate.format(...)
+    - ChatPromptTemplate.format_messages(...)    vs  CompiledChatTemplate.format_messages(...)
+and checks that both produce identical output. Like 2_Dynamic_prompt_ui.py,
+template.json is loaded once; only .format() is timed.
+
+Usage:
+    python benchmark_templates.py --calls 100000
+'''
+import argparse
+import os
+import time
+
+from langchain_core.prompts import load_prompt
+
+from template_registry import build_default_registry
+
+# Saved by promt_template.py at the repo root
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template.json")
+
+RESEARCH_INPUTS = {
+    "paper_input": "Attention Is All You Need",
+    "style_input": "Technical",
+    "length_input": "Short (1-2 paragraphs)",
+}
+DOMAIN_INPUTS = {"domain": "AI", "topic": "LangChain vs LangGraph"}
+SUPPORT_INPUTS = {
+    "chat_history": [
+        ("human", "I want to request a refund for my order #12345."),
+        ("ai", "Your refund request for order #12345 has been initiated."),
+    ],
+    "query": "Where is my refund",
+}
+
+
+def per_call_us(fn, calls: int) -> float:
+    for _ in range(min(calls, 1000)):  # warm-up
+        fn()
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50_000)
+    args = parser.parse_args()
+
+    registry = build_default_registry(TEMPLATE_PATH)
+    cases = [
+        ("research_summary", "format", RESEARCH_INPUTS),
+        ("domain_assistant", "format_messages", DOMAIN_INPUTS),
+        ("support_agent", "format_messages", SUPPORT_INPUTS),
+    ]
+
+    print(f"{args.calls} calls each")
+    print(f"{'template':<20}{'langchain us':>14}{'compiled us':>14}{'speedup':>10}")
+    for name, method, inputs in cases:
+        compiled = registry.get(name)
+        if method == "format_messages":
+            original = compiled.chat_template
+        else:
+            original = load_prompt(TEMPLATE_PATH)
+        original_fn = getattr(original, method)
+        compiled_fn = getattr(compiled, method)
+        if original_fn(**inputs) != compiled_fn(**inputs):
+            raise SystemExit(f"{name}: compiled output differs from LangChain output")
+
+        baseline = per_call_us(lambda: original_fn(**inputs), args.calls)
+        fast = per_call_us(lambda: compiled_fn(**inputs), args.calls)
+        print(f"{name:<20}{baseline:>14.2f}{fast:>14.2f}{baseline / fast:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
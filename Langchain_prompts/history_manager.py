@@ -0,0 +1,169 @@
+'''
+Token-budgeted chat history for the message-history chatbot
+
+6_chatbot_with_history_using_messages.py used to send every message ever
+exchanged on every turn, so each turn got slower (and more expensive) until the
+model's context limit was hit. TokenBudgetHistory keeps what is sent under a
+fixed token budget:
+
+    [SystemMessage]            always kept
+    [running summary]          optional, older turns folded into one SystemMessage
+    [recent turns ...]         as many of the newest turns as fit
+
+Turns are evicted whole (a question together with its answer), and once the
+budget is exceeded the history is trimmed down to a low-water mark
+(low_water * max_tokens), so the next several appends fit without trimming
+and summaries are made in batches instead of on almost every turn.
+
+Each message is tokenized exactly once, when it is added, and its count is
+cached, so trimming never re-tokenizes the conversation.
+
+With a summarizer, folding evicted turns into the summary costs a model call
+(more if the new summary pushes further turns out) made synchronously inside
+append(), so the turn that triggers it waits for the summary before the next
+prompt can be built.
+
+Usage:
+    history = TokenBudgetHistory(SystemMessage(content="You are a helpful assistant."), max_tokens=2048)
+    history.append(HumanMessage(content=user_input))
+    result = model.invoke(history.messages())
+    history.append(AIMessage(content=result.content))
+'''
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+# Rough cost of the chat template around each message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation below, adding onto the previous summary. "
+    "Keep names, numbers and decisions. Return only the new summary.\n\n"
+    "Previous summary:\n{summary}\n\nNew lines of conversation:\n{lines}\n\nNew summary:"
+)
+
+
+def hf_token_counter(model_id: str):
+    """Return a function counting tokens with the model's own Hugging Face tokenizer."""
+    tokenizer = None
+
+    def count(text: str) -> int:
+        nonlocal tokenizer
+        # Loaded on the first count, not when the counter is created
+        # Why: Importing transformers would otherwise delay the chatbot's first prompt
+        if tokenizer is None:
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(model_id)
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count
+
+
+class TokenBudgetHistory:
+    """Chat history that stays under max_tokens by trimming or summarizing old turns."""
+
+    def __init__(
+        self,
+        system_message: SystemMessage,
+        max_tokens: int = 2048,
+        token_counter=None,
+        summarizer=None,
+        low_water: float = 0.75,
+    ):
+        """
+        Parameters:
+            system_message: Instruction that is always sent first
+            max_tokens: Budget for everything sent to the model (leave room for the reply)
+            token_counter: fn(text) -> int, e.g. hf_token_counter("Qwen/Qwen2.5-72B-Instruct").
+                Defaults to a ~4 characters per token estimate.
+            summarizer: Chat model used to fold trimmed turns into a running summary.
+                It is called inside append(), on the request path.
+                If None, trimmed turns are simply dropped.
+            low_water: Fraction of max_tokens to trim down to once the budget is exceeded
+        """
+        if not 0 < low_water <= 1:
+            raise ValueError("low_water must be in (0, 1]")
+        self.max_tokens = max_tokens
+        self.count_tokens = token_counter or (lambda text: max(1, len(text) // 4))
+        self.summarizer = summarizer
+        self.low_water = low_water
+
+        self.system_message = system_message
+        self._system_tokens = None  # counted on first use, see _count_system()
+        self.summary = ""
+        self._summary_tokens = 0
+        # Parallel lists: message and its cached token count
+        self._turns: list[BaseMessage] = []
+        self._turn_tokens: list[int] = []
+        self._total = 0
+
+    def _count(self, message: BaseMessage) -> int:
+        return self.count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+    def _count_system(self) -> None:
+        if self._system_tokens is None:
+            self._system_tokens = self._count(self.system_message)
+            self._total += self._system_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens that messages() will send (system + summary + kept turns)."""
+        self._count_system()
+        return self._total
+
+    def append(self, message: BaseMessage) -> None:
+        """Add a message and trim to the budget; may block on one or more summarizer calls."""
+        self._count_system()
+        tokens = self._count(message)
+        self._turns.append(message)
+        self._turn_tokens.append(tokens)
+        self._total += tokens
+        self._enforce_budget()
+
+    def messages(self) -> list[BaseMessage]:
+        """The message list to pass to model.invoke()."""
+        head = [self.system_message]
+        if self.summary:
+            head.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        return head + self._turns
+
+    def _enforce_budget(self) -> None:
+        if self._total <= self.max_tokens:
+            return
+        evicted = self._evict_turns()
+        if evicted and self.summarizer is not None:
+            self._fold_into_summary(evicted)
+
+    def _evict_turns(self) -> list[BaseMessage]:
+        """Pop the oldest whole turns until the low-water mark is met; return them."""
+        target = int(self.max_tokens * self.low_water)
+        # Never evict the newest turn (the last human message and whatever follows it)
+        # Why: It is the question being asked right now, or the answer to it
+        last_turn = len(self._turns) - 1
+        while last_turn > 0 and not isinstance(self._turns[last_turn], HumanMessage):
+            last_turn -= 1
+        if last_turn == 0 and not isinstance(self._turns[0], HumanMessage):
+            last_turn = len(self._turns) - 1
+        evicted = []
+        while self._total > target and last_turn > 0:
+            evicted.append(self._turns.pop(0))
+            self._total -= self._turn_tokens.pop(0)
+            last_turn -= 1
+            # Drop whole turns: an AI reply without its question is confusing context
+            while last_turn > 0 and not isinstance(self._turns[0], HumanMessage):
+                evicted.append(self._turns.pop(0))
+                self._total -= self._turn_tokens.pop(0)
+                last_turn -= 1
+        return evicted
+
+    def _fold_into_summary(self, evicted: list[BaseMessage]) -> None:
+        # The summary itself takes room, which can push more turns out; those are folded in too
+        # Why: Every turn that leaves the prompt must end up in the summary, or it is silently lost.
+        #      Each pass evicts at least one turn, so this stops once the turns fit
+        while evicted:
+            lines = "\n".join(f"{message.type}: {message.content}" for message in evicted)
+            result = self.summarizer.invoke(SUMMARY_PROMPT.format(summary=self.summary or "(none)", lines=lines))
+            self._total -= self._summary_tokens
+            self.summary = result.content.strip()
+            self._summary_tokens = self.count_tokens(self.summary) + MESSAGE_OVERHEAD_TOKENS
+            self._total += self._summary_tokens
+            evicted = self._evict_turns() if self._total > self.max_tokens else []
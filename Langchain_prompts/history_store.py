@@ -0,0 +1,232 @@
+'''
+Append-only chat history store with per-session files and tail reads
+
+8_message_placeholder.py used to read all of chat_history.txt on every prompt
+build, so each turn cost more I/O than the last, and every conversation shared
+one file. ChatHistoryStore keeps one directory per session:
+
+    .chat_history/<session>/
+        seg-000000.log   message records, JSON, append-only (rolls over at segment_bytes)
+        index.bin        one fixed 20-byte entry per message: segment, offset, length, tokens
+
+The Nth message's index entry sits at byte N * 20, so reading the last N
+messages (or the last N tokens' worth) touches only those entries and their
+records, through mmap. Turn load time stays flat however long the history gets.
+
+Usage:
+    store = ChatHistoryStore()
+    store.append("customer-12345", HumanMessage(content="Where is my refund?"))
+    chat_history = store.tail("customer-12345", n=20)              # typed BaseMessage objects
+    chat_history = store.tail_tokens("customer-12345", max_tokens=1024)
+
+One writer process per session is assumed; readers can run alongside it.
+'''
+import ast
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from history_manager import MESSAGE_OVERHEAD_TOKENS
+
+# segment number, byte offset in the segment, record length, token count
+INDEX_ENTRY = struct.Struct("<IQII")
+
+_SESSION_ID = re.compile(r"[A-Za-z0-9_.-]{1,128}")
+_LEGACY_LINE = re.compile(r"^(Human|AI|System)Message\(content=(.*)\)\s*$")
+
+
+def _estimate_tokens(text: str) -> int:
+    # Same ~4 characters per token estimate as TokenBudgetHistory
+    return max(1, len(text) // 4)
+
+
+class ChatHistoryStore:
+    """Per-session append-only message log with an offset index."""
+
+    def __init__(self, root: str = ".chat_history", segment_bytes: int = 8 * 1024 * 1024, token_counter=None):
+        """
+        Parameters:
+            root: Directory holding one sub-directory per session
+            segment_bytes: Size at which a new segment file is started
+            token_counter: fn(text) -> int, e.g. history_manager.hf_token_counter(...);
+                counted once per message at append time and stored in the index
+        """
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.count_tokens = token_counter or _estimate_tokens
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- Paths ----------
+
+    def _session_dir(self, session: str) -> str:
+        if not _SESSION_ID.fullmatch(session):
+            raise ValueError(f"invalid session id {session!r}: use letters, digits, '_', '-' or '.'")
+        return os.path.join(self.root, session)
+
+    @staticmethod
+    def _segment_path(directory: str, segment: int) -> str:
+        return os.path.join(directory, f"seg-{segment:06d}.log")
+
+    # ---------- Writing ----------
+
+    def append(self, session: str, message: BaseMessage) -> None:
+        self.extend(session, [message])
+
+    def extend(self, session: str, messages: list[BaseMessage]) -> None:
+        """Append messages to the session's log, records first, then their index entries."""
+        if not messages:
+            return
+        directory = self._session_dir(session)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            index_path = os.path.join(directory, "index.bin")
+            segment, offset = self._write_position(index_path)
+
+            # Group records by the segment they go to: (segment, start offset, records, [(length, tokens)])
+            groups = [(segment, offset, bytearray(), [])]
+            for message in messages:
+                record = json.dumps(message_to_dict(message), ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+                segment, start, records, sizes = groups[-1]
+                if start + len(records) > 0 and start + len(records) + len(record) > self.segment_bytes:
+                    groups.append((segment + 1, 0, bytearray(), []))
+                    records, sizes = groups[-1][2], groups[-1][3]
+                tokens = self.count_tokens(message.content if isinstance(message.content, str) else str(message.content))
+                sizes.append((len(record), tokens + MESSAGE_OVERHEAD_TOKENS))
+                records += record
+
+            entries = bytearray()
+            for segment, start, records, sizes in groups:
+                position = self._write_segment(self._segment_path(directory, segment), start, records)
+                for length, tokens in sizes:
+                    entries += INDEX_ENTRY.pack(segment, position, length, tokens)
+                    position += length
+            # Why: The index is written last, so a crash mid-append leaves unindexed bytes, never a dangling entry
+            self._append(index_path, entries)
+
+    @staticmethod
+    def _write_segment(path: str, expected_end: int, data: bytes) -> int:
+        """Write data at expected_end of a segment, cutting off unindexed bytes; returns the real start offset."""
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Bytes past the last indexed record come from a crashed append (in this segment or a
+            # segment that was being started); new records must not land behind them
+            if os.fstat(fd).st_size != expected_end:
+                os.ftruncate(fd, expected_end)
+            position = os.lseek(fd, 0, os.SEEK_END)
+            os.write(fd, data)
+            return position
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _append(path: str, data: bytes) -> None:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def _write_position(self, index_path: str) -> tuple[int, int]:
+        """Segment and offset where the next record goes, from the last index entry; drops a torn entry."""
+        size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+        if size % INDEX_ENTRY.size:
+            with open(index_path, "r+b") as f:
+                f.truncate(size - size % INDEX_ENTRY.size)
+            size -= size % INDEX_ENTRY.size
+        if size == 0:
+            return 0, 0
+        with open(index_path, "rb") as f:
+            f.seek(size - INDEX_ENTRY.size)
+            segment, offset, length, _ = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+        # Start right after the last indexed record; _write_segment() cuts off anything beyond it
+        return segment, offset + length
+
+    # ---------- Reading ----------
+
+    def sessions(self) -> list[str]:
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, "index.bin")))
+
+    def count(self, session: str) -> int:
+        """Number of messages in the session, from the index size alone."""
+        index_path = os.path.join(self._session_dir(session), "index.bin")
+        try:
+            return os.path.getsize(index_path) // INDEX_ENTRY.size
+        except FileNotFoundError:
+            return 0
+
+    def tail(self, session: str, n: int) -> list[BaseMessage]:
+        """The last n messages of the session, oldest first."""
+        entries = self._tail_entries(session, n=n)
+        return self._load(session, entries)
+
+    def tail_tokens(self, session: str, max_tokens: int) -> list[BaseMessage]:
+        """The longest run of newest messages whose stored token counts fit in max_tokens."""
+        entries = self._tail_entries(session, max_tokens=max_tokens)
+        return self._load(session, entries)
+
+    def _tail_entries(self, session: str, n: int | None = None, max_tokens: int | None = None) -> list[tuple]:
+        """Index entries of the newest messages, walking the index backwards."""
+        directory = self._session_dir(session)
+        index_path = os.path.join(directory, "index.bin")
+        total = self.count(session)
+        if total == 0:
+            return []
+        with open(index_path, "rb") as f, mmap.mmap(f.fileno(), total * INDEX_ENTRY.size, access=mmap.ACCESS_READ) as index:
+            entries = []
+            used = 0
+            position = total
+            while position > 0:
+                if n is not None and len(entries) >= n:
+                    break
+                entry = INDEX_ENTRY.unpack_from(index, (position - 1) * INDEX_ENTRY.size)
+                if max_tokens is not None:
+                    if used + entry[3] > max_tokens:
+                        break
+                    used += entry[3]
+                entries.append(entry)
+                position -= 1
+        entries.reverse()
+        return entries
+
+    def _load(self, session: str, entries: list[tuple]) -> list[BaseMessage]:
+        directory = self._session_dir(session)
+        records = []
+        segment_map = None
+        current = None
+        try:
+            for segment, offset, length, _ in entries:
+                if segment != current:
+                    if segment_map is not None:
+                        segment_map.close()
+                    with open(self._segment_path(directory, segment), "rb") as f:
+                        # Why: mmap pages in only the records we slice, not the whole segment
+                        segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    current = segment
+                records.append(json.loads(segment_map[offset:offset + length]))
+        finally:
+            if segment_map is not None:
+                segment_map.close()
+        return messages_from_dict(records)
+
+    # ---------- Migration ----------
+
+    def import_legacy_file(self, session: str, path: str) -> int:
+        """Append the HumanMessage(content="...") lines of an old chat_history.txt; returns the count."""
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        classes = {"Human": HumanMessage, "AI": AIMessage, "System": SystemMessage}
+        messages = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                match = _LEGACY_LINE.match(line)
+                if match:
+                    messages.append(classes[match.group(1)](content=ast.literal_eval(match.group(2))))
+        self.extend(session, messages)
+        return len(messages)
@@ -0,0 +1,283 @@
+'''
+Two-tier exact response cache for ChatHuggingFace calls
+
+A response is keyed on the normalized message list plus the model id and the
+generation parameters (temperature, max_new_tokens, ...). Lookups go through:
+    1. an in-process LRU dict        (free, lost when the process exits)
+    2. a SQLite file on disk         (survives restarts, shared by processes)
+Both tiers honour a TTL; the disk tier is also capped by number of rows.
+
+Sampled generations (temperature > 0) are NOT cached unless the cache was
+created with allow_nondeterministic=True, since the same prompt is expected to
+give different answers there.
+
+Usage:
+    cache = ResponseCache(".response_cache.sqlite", allow_nondeterministic=True)
+    result = cache.invoke(model, prompt)     # instead of model.invoke(prompt)
+    print(cache.stats())
+'''
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, convert_to_messages
+from langchain_core.prompt_values import PromptValue
+
+# Generation settings that change the answer and therefore belong in the key
+GENERATION_PARAMS = (
+    "temperature", "max_new_tokens", "top_p", "top_k", "typical_p",
+    "repetition_penalty", "do_sample", "seed", "stop_sequences",
+)
+
+
+def _as_messages(model_input) -> list:
+    if isinstance(model_input, str):
+        return [HumanMessage(content=model_input)]
+    if isinstance(model_input, PromptValue):
+        return model_input.to_messages()
+    return convert_to_messages(model_input)
+
+
+def normalize_messages(model_input) -> list[tuple[str, str]]:
+    """Turn a string / PromptValue / message list into [(role, content), ...].
+
+    Line endings and surrounding whitespace are normalized so that cosmetic
+    differences (e.g. a trailing newline from a text box) still hit the cache.
+    """
+    normalized = []
+    for message in _as_messages(model_input):
+        content = message.content
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True)
+        normalized.append((message.type, content.replace("\r\n", "\n").strip()))
+    return normalized
+
+
+def generation_config(model) -> dict:
+    """Model id and generation parameters of a ChatHuggingFace (or bare LLM) instance."""
+    llm = getattr(model, "llm", model)
+    config = {
+        "model_id": getattr(model, "model_id", None)
+        or getattr(llm, "repo_id", None)
+        or getattr(llm, "model_id", None)
+        or getattr(llm, "model", None),
+        "backend": type(llm).__name__,
+    }
+    for name in GENERATION_PARAMS:
+        value = getattr(llm, name, None)
+        if value is not None:
+            config[name] = value
+    # HuggingFacePipeline keeps its generation settings in pipeline_kwargs
+    config.update(getattr(llm, "pipeline_kwargs", None) or {})
+    return config
+
+
+def is_deterministic(config: dict) -> bool:
+    """True when the same prompt always yields the same answer (greedy decoding)."""
+    if config.get("temperature") == 0:
+        return True
+    # Local pipelines decode greedily when do_sample is off, whatever the temperature
+    return config.get("backend") == "HuggingFacePipeline" and not config.get("do_sample", False)
+
+
+class ResponseCache:
+    """In-process LRU in front of a SQLite table of cached responses."""
+
+    def __init__(
+        self,
+        path: str = ".response_cache.sqlite",
+        memory_entries: int = 256,
+        ttl_seconds: float | None = 7 * 24 * 3600,
+        max_disk_entries: int = 10_000,
+        allow_nondeterministic: bool = False,
+    ):
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.allow_nondeterministic = allow_nondeterministic
+
+        self._memory = OrderedDict()  # key -> (created, payload)
+        # One connection shared across threads, guarded by a lock
+        # Why: Streamlit serves every browser session from its own thread
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    # ----- keys -----
+
+    @staticmethod
+    def make_key(model_input, config: dict) -> str:
+        payload = json.dumps(
+            {"messages": normalize_messages(model_input), "config": config},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ----- tiers -----
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key: str) -> tuple[dict | None, str | None]:
+        """Return (payload, tier) where tier is "memory", "disk" or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1], "memory"
+                del self._memory[key]
+
+            row = self._db.execute("SELECT payload, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                payload, created = json.loads(row[0]), row[1]
+                if not self._expired(created, now):
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    # Promote to the memory tier so the next hit skips SQLite
+                    self._remember(key, created, payload)
+                    self.disk_hits += 1
+                    return payload, "disk"
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+
+            self.misses += 1
+            return None, None
+
+    def put(self, key: str, payload: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, payload)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload, default=str), now, now),
+            )
+            # Size-based eviction: drop the least recently accessed rows beyond the cap
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, created: float, payload: dict) -> None:
+        self._memory[key] = (created, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    # ----- callbacks -----
+
+    @staticmethod
+    def _tag_miss(kwargs: dict) -> dict:
+        """Add response_cache="miss" to the run metadata so callback handlers can label the call."""
+        config = dict(kwargs.get("config") or {})
+        config["metadata"] = {**(config.get("metadata") or {}), "response_cache": "miss"}
+        return {**kwargs, "config": config}
+
+    @staticmethod
+    def _report_hit(model_input, config: dict, message: AIMessage, tier: str, kwargs: dict) -> None:
+        """Replay a hit as a finished chat model run, so metrics and tracing see it too.
+
+        Hits never reach the model, so no callbacks would fire otherwise.
+        """
+        from langchain_core.callbacks import CallbackManager
+        from langchain_core.outputs import ChatGeneration, LLMResult
+
+        run_config = kwargs.get("config") or {}
+        manager = CallbackManager.configure(
+            inheritable_callbacks=run_config.get("callbacks"),
+            inheritable_metadata={**(run_config.get("metadata") or {}),
+                                  "ls_model_name": config.get("model_id"), "response_cache": tier},
+        )
+        # Nothing is listening: skip building the run
+        if not manager.handlers:
+            return
+        for run in manager.on_chat_model_start({"name": config.get("backend", "ResponseCache")}, [_as_messages(model_input)]):
+            run.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+    # ----- model calls -----
+
+    def should_cache(self, config: dict) -> bool:
+        return self.allow_nondeterministic or is_deterministic(config)
+
+    def invoke(self, model, model_input, **kwargs) -> AIMessage:
+        """Cached drop-in for model.invoke(model_input, **kwargs)."""
+        config = generation_config(model)
+        if not self.should_cache(config):
+            self.bypassed += 1
+            return model.invoke(model_input, **kwargs)
+
+        key = self.make_key(model_input, config)
+        payload, tier = self.get(key)
+        if payload is not None:
+            message = AIMessage(content=payload["content"], response_metadata={**payload["response_metadata"], "cache": tier})
+            self._report_hit(model_input, config, message, tier, kwargs)
+            return message
+
+        result = model.invoke(model_input, **self._tag_miss(kwargs))
+        self.put(key, {"content": result.content, "response_metadata": result.response_metadata})
+        return result
+
+    def stream(self, model, model_input, **kwargs):
+        """Cached drop-in for model.stream() that yields text pieces.
+
+        A hit yields the stored answer in one piece; a miss streams from the
+        model and stores the answer once the stream has completed.
+        """
+        config = generation_config(model)
+        if not self.should_cache(config):
+            self.bypassed += 1
+            for chunk in model.stream(model_input, **kwargs):
+                yield chunk.content
+            return
+
+        key = self.make_key(model_input, config)
+        payload, tier = self.get(key)
+        if payload is not None:
+            message = AIMessage(content=payload["content"], response_metadata={**payload["response_metadata"], "cache": tier})
+            self._report_hit(model_input, config, message, tier, kwargs)
+            yield payload["content"]
+            return
+
+        full = None
+        for chunk in model.stream(model_input, **self._tag_miss(kwargs)):
+            full = chunk if full is None else full + chunk
+            yield chunk.content
+        # Only complete answers are stored
+        # Why: A stream abandoned halfway (e.g. a Streamlit rerun) must not poison the cache
+        if full is not None:
+            self.put(key, {"content": full.content, "response_metadata": full.response_metadata})
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,87 @@
+'''
+Token streaming helper for the console chatbots
+
+model.invoke() only returns after the whole answer is generated, so the user
+stares at an empty prompt for the full generation time. stream_reply() uses
+model.stream() instead: chunks are printed the moment they arrive, the final
+AIMessage is still assembled for the chat history, and per-turn timing is
+recorded (time-to-first-token and tokens/sec).
+
+Usage:
+    reply, stats = stream_reply(model, chat_history)
+    chat_history.append(reply)
+    print(stats)
+'''
+# time.perf_counter() - High resolution timer
+# Why: Time-to-first-token is usually well under a second
+import time
+
+# dataclass - Lightweight container for the per-turn numbers
+# Why: Gives readable printing and attribute access without boilerplate
+from dataclasses import dataclass
+
+# AIMessage - The message type stored in chat history
+# Why: The streamed chunks are merged back into one normal AIMessage
+from langchain_core.messages import AIMessage
+
+
+@dataclass
+class TurnStats:
+    """Timing of one streamed model turn."""
+
+    time_to_first_token: float  # seconds from request to first non-empty chunk
+    total_time: float           # seconds from request to last chunk
+    output_tokens: int          # from usage metadata when provided, else number of chunks
+
+    @property
+    def tokens_per_second(self) -> float:
+        # Measured after the first token
+        # Why: TTFT is mostly queueing + prompt processing, not generation speed
+        generation_time = self.total_time - self.time_to_first_token
+        if generation_time <= 0 or self.output_tokens <= 1:
+            return 0.0
+        return (self.output_tokens - 1) / generation_time
+
+    def __str__(self) -> str:
+        return (
+            f"[ttft {self.time_to_first_token * 1000:.0f} ms | "
+            f"{self.output_tokens} tokens | {self.tokens_per_second:.1f} tok/s | "
+            f"total {self.total_time:.2f} s]"
+        )
+
+
+def stream_reply(model, messages, prefix: str = "Ai: ", printer=print) -> tuple[AIMessage, TurnStats]:
+    """Stream a reply to the console and return it as an AIMessage plus timing stats.
+
+    Parameters:
+        model: Any LangChain chat model (e.g. ChatHuggingFace)
+        messages: Whatever model.invoke() would accept (string, list of messages, ...)
+        prefix: Printed once before the first chunk
+        printer: print-compatible function, swap it out to stream somewhere else
+    """
+    start = time.perf_counter()
+    first_token_at = None
+    full = None
+    chunk_count = 0
+
+    printer(prefix, end="", flush=True)
+    for chunk in model.stream(messages):
+        if chunk.content:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunk_count += 1
+            printer(chunk.content, end="", flush=True)
+        # AIMessageChunk supports "+" to merge content and metadata
+        # Why: Rebuilds exactly what invoke() would have returned
+        full = chunk if full is None else full + chunk
+    end = time.perf_counter()
+    printer()
+
+    usage = getattr(full, "usage_metadata", None) or {}
+    stats = TurnStats(
+        time_to_first_token=(first_token_at or end) - start,
+        total_time=end - start,
+        output_tokens=usage.get("output_tokens") or chunk_count,
+    )
+    content = full.content if full is not None else ""
+    return AIMessage(content=content, response_metadata=getattr(full, "response_metadata", {})), stats
@@ -0,0 +1,195 @@
+'''
+Precompiled prompt template registry
+
+PromptTemplate.format() and ChatPromptTemplate.format_messages() re-validate
+inputs and walk the template on every call. The registry loads every template
+once at startup and compiles it:
+
+    - string templates: the f-string is split into literal pieces and
+      placeholder names up front, so formatting is a single "".join()
+    - chat templates: messages without variables are built once and reused;
+      only messages with variables (and MessagesPlaceholder slots) are filled
+      per call
+
+Usage:
+    registry = build_default_registry()
+    prompt = registry.format("research_summary", paper_input=..., style_input=..., length_input=...)
+    messages = registry.format_messages("domain_assistant", domain="AI", topic="LangChain")
+'''
+import os
+from string import Formatter
+
+from langchain_core.messages import AIMessage, ChatMessage, HumanMessage, SystemMessage, convert_to_messages
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate, load_prompt
+from langchain_core.prompts.chat import (
+    AIMessagePromptTemplate,
+    ChatMessagePromptTemplate,
+    HumanMessagePromptTemplate,
+    SystemMessagePromptTemplate,
+)
+
+# Message prompt template class -> message class it produces
+_MESSAGE_CLASSES = {
+    SystemMessagePromptTemplate: SystemMessage,
+    HumanMessagePromptTemplate: HumanMessage,
+    AIMessagePromptTemplate: AIMessage,
+}
+
+# Repo root, where template.json lives
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CompiledTemplate:
+    """An f-string template pre-split into literal pieces and placeholder names."""
+
+    def __init__(self, template: str, partial_variables: dict | None = None):
+        self.template = template
+        pieces = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            if field_name is not None and (format_spec or conversion or not field_name.isidentifier()):
+                # Attribute access, indexing or format specs: not worth specializing
+                raise ValueError(f"Unsupported placeholder {{{field_name}}} in template")
+            pieces.append((literal, field_name))
+        self._pieces = tuple(pieces)
+        self.input_variables = tuple(dict.fromkeys(name for _, name in pieces if name is not None))
+        self.partial_variables = dict(partial_variables or {})
+
+    @classmethod
+    def from_prompt(cls, prompt: PromptTemplate) -> "CompiledTemplate":
+        if prompt.template_format != "f-string":
+            raise ValueError(f"Only f-string templates can be compiled, got {prompt.template_format!r}")
+        return cls(prompt.template, prompt.partial_variables)
+
+    def format(self, **kwargs) -> str:
+        if self.partial_variables:
+            kwargs = {**self.partial_variables, **kwargs}
+        try:
+            return "".join([
+                literal if name is None else literal + str(kwargs[name])
+                for literal, name in self._pieces
+            ])
+        except KeyError as exc:
+            raise KeyError(f"Missing template variable {exc.args[0]!r}; expected {list(self.input_variables)}") from None
+
+
+class CompiledChatTemplate:
+    """A ChatPromptTemplate with static messages pre-built and variable slots compiled."""
+
+    def __init__(self, chat_template: ChatPromptTemplate):
+        self.chat_template = chat_template
+        self.partial_variables = dict(chat_template.partial_variables)
+        # Each slot is (kind, payload):
+        #   ("static", message)                      prebuilt, reused as is
+        #   ("format", (message_factory, compiled))  fill placeholders per call
+        #   ("placeholder", (name, optional))        MessagesPlaceholder
+        #   ("fallback", message_prompt_template)    anything else, formatted by LangChain
+        self._slots = []
+        for message in chat_template.messages:
+            self._slots.append(self._compile_message(message))
+        self.input_variables = tuple(chat_template.input_variables)
+
+    @staticmethod
+    def _compile_message(message):
+        if isinstance(message, MessagesPlaceholder):
+            return ("placeholder", (message.variable_name, message.optional))
+        prompt = getattr(message, "prompt", None)
+        if not isinstance(prompt, PromptTemplate) or prompt.template_format != "f-string":
+            return ("fallback", message)
+
+        if isinstance(message, ChatMessagePromptTemplate):
+            role = message.role
+            factory = lambda content: ChatMessage(role=role, content=content)  # noqa: E731
+        elif type(message) in _MESSAGE_CLASSES:
+            factory = _MESSAGE_CLASSES[type(message)]
+        else:
+            return ("fallback", message)
+
+        compiled = CompiledTemplate.from_prompt(prompt)
+        if not compiled.input_variables:
+            # No variables: build the message object once
+            return ("static", factory(compiled.format()))
+        return ("format", (factory, compiled))
+
+    def format_messages(self, **kwargs) -> list:
+        """Same output as ChatPromptTemplate.format_messages(**kwargs).
+
+        Static messages are shared between calls; copy them before mutating.
+        """
+        if self.partial_variables:
+            kwargs = {**self.partial_variables, **kwargs}
+        messages = []
+        for kind, payload in self._slots:
+            if kind == "static":
+                messages.append(payload)
+            elif kind == "format":
+                factory, compiled = payload
+                messages.append(factory(compiled.format(**kwargs)))
+            elif kind == "placeholder":
+                name, optional = payload
+                if name not in kwargs:
+                    if optional:
+                        continue
+                    raise KeyError(f"Missing messages for placeholder {name!r}")
+                messages.extend(convert_to_messages(kwargs[name]))
+            else:
+                messages.extend(payload.format_messages(**kwargs))
+        return messages
+
+
+class TemplateRegistry:
+    """Named, precompiled string and chat templates, loaded once at startup."""
+
+    def __init__(self):
+        self._templates = {}
+
+    def register(self, name: str, template) -> None:
+        """Compile and store a PromptTemplate, ChatPromptTemplate or raw f-string."""
+        if isinstance(template, ChatPromptTemplate):
+            self._templates[name] = CompiledChatTemplate(template)
+        elif isinstance(template, PromptTemplate):
+            self._templates[name] = CompiledTemplate.from_prompt(template)
+        elif isinstance(template, str):
+            self._templates[name] = CompiledTemplate(template)
+        else:
+            raise TypeError(f"Cannot compile template of type {type(template).__name__}")
+
+    def load(self, name: str, path: str) -> None:
+        """Load a saved template (e.g. template.json) with load_prompt() and compile it."""
+        self.register(name, load_prompt(path))
+
+    def get(self, name: str):
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"Unknown template {name!r}; registered: {sorted(self._templates)}") from None
+
+    def format(self, name: str, **kwargs) -> str:
+        return self.get(name).format(**kwargs)
+
+    def format_messages(self, name: str, **kwargs) -> list:
+        return self.get(name).format_messages(**kwargs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def names(self) -> list[str]:
+        return sorted(self._templates)
+
+
+def build_default_registry(template_path: str | None = None) -> TemplateRegistry:
+    """Registry with the templates used across Langchain_prompts."""
+    registry = TemplateRegistry()
+    # Research assistant prompt saved by promt_template.py
+    registry.load("research_summary", template_path or os.path.join(_ROOT, "template.json"))
+    # Chat template from 7_chat_prompt_template.py
+    registry.register("domain_assistant", ChatPromptTemplate([
+        ("system", "You are a helpful {domain} assistant."),
+        ("human", "Tell me something about {topic}."),
+    ]))
+    # Chat template from 8_message_placeholder.py
+    registry.register("support_agent", ChatPromptTemplate([
+        ("system", "You are a helpful customer support agent"),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{query}"),
+    ]))
+    return registry
@@ -0,0 +1,9 @@
+"""Helpers shared by the scripts in every folder of this repo.
+
+Scripts live in folders that are not Python packages (e.g. "3.EmbeddedModels"),
+so they put the repo root on sys.path before importing from here:
+
+    import sys, pathlib
+    sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+    from common.model_factory import chat_model
+"""
@@ -0,0 +1,163 @@
+'''
+Request latency with and without connection pooling, against a local stub server
+
+Starts an OpenAI-compatible stub of the HF chat completion route on localhost
+(optionally over TLS with a throwaway self-signed certificate, which is where
+the handshake really costs) and sends the same requests three ways:
+
+    fresh       new client per request: TCP (+ TLS) handshake every time,
+                like a script that builds its own client per call or process
+    pooled      one client from common.http_transport, keep-alive reused
+    hub pooled  InferenceClient.chat_completion() after http_transport.install()
+                (only when huggingface_hub is installed)
+
+The server counts accepted connections, so the reuse is visible too.
+
+Usage:
+    python common/benchmark_http_transport.py
+    python common/benchmark_http_transport.py --tls --requests 300 --threads 8
+'''
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.http_transport import TransportConfig, build_httpx_client, install
+
+MODEL = "Qwen/Qwen2.5-72B-Instruct"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the server keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body leave in one write with Nagle off
+    # Why: Otherwise delayed ACKs add ~40ms to every response and hide the handshake cost
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        body = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": MODEL,
+            "system_fingerprint": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                         "message": {"role": "assistant", "content": "New Delhi"}}],
+            "usage": {"prompt_tokens": 8, "completion_tokens": 2, "total_tokens": 10},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def self_signed_cert(directory: pathlib.Path) -> tuple[str, str]:
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+                    "-keyout", str(key), "-out", str(cert)], check=True, capture_output=True)
+    return str(cert), str(key)
+
+
+def start_server(delay: float, tls_files: tuple[str, str] | None) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("localhost", 0), StubHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.connections = 0
+    server.lock = threading.Lock()
+    if tls_files:
+        import ssl
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*tls_files)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(name: str, call, n_requests: int, threads: int, server) -> None:
+    call()  # warm-up: first connection and lazy imports are not part of the comparison
+    before = server.connections
+    latencies = []
+
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(timed, range(n_requests)))
+    wall = time.perf_counter() - start
+    q = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"{name:<12} p50 {q[49] * 1e3:7.2f}ms  p95 {q[94] * 1e3:7.2f}ms  "
+          f"{n_requests / wall:8.0f} req/s  connections opened: {server.connections - before}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--tls", action="store_true", help="Serve HTTPS with a self-signed certificate (needs openssl)")
+    parser.add_argument("--server-delay", type=float, default=0.0, help="Seconds the stub waits before answering")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    tls_files = self_signed_cert(pathlib.Path(tmp.name)) if args.tls else None
+    server = start_server(args.server_delay, tls_files)
+    base_url = f"{'https' if args.tls else 'http'}://localhost:{server.server_address[1]}"
+    url = f"{base_url}/v1/chat/completions"
+    payload = {"model": MODEL, "messages": [{"role": "user", "content": "What is the capital of India ?"}],
+               "max_tokens": 256}
+    # Plain HTTP skips loading the CA bundle so "fresh" measures the connection, not SSL setup
+    config = TransportConfig(max_connections=args.threads, max_keepalive=args.threads,
+                             verify=tls_files[0] if tls_files else False)
+    print(f"{args.requests} requests, {args.threads} threads, {'HTTPS' if args.tls else 'HTTP'} stub at {base_url}\n")
+
+    def fresh():
+        with build_httpx_client(config) as client:
+            client.post(url, json=payload).raise_for_status()
+
+    pooled_client = build_httpx_client(config)
+
+    def pooled():
+        pooled_client.post(url, json=payload).raise_for_status()
+
+    run("fresh", fresh, args.requests, args.threads, server)
+    run("pooled", pooled, args.requests, args.threads, server)
+
+    try:
+        from huggingface_hub import InferenceClient
+    except ImportError:
+        print("hub pooled   skipped (huggingface_hub is not installed)")
+    else:
+        if install(config) is None:
+            print("hub pooled   skipped (unsupported huggingface_hub version, see warning)")
+        else:
+            client = InferenceClient(base_url=base_url, token="stub")
+            run("hub pooled", lambda: client.chat_completion(**payload), args.requests, args.threads, server)
+
+    server.shutdown()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
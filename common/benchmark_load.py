@@ -0,0 +1,367 @@
+'''
+Load generator for the repo's chat invocation patterns, against the local fake HF server
+
+Replays what the entry points do, at a fixed number of concurrent workers,
+and reports p50/p95/p99 latency and throughput per pattern:
+
+    single      one question, like chatmodel_hf_api.py / 1_prompt_ui.py
+    history     system prompt + prior turns + new question, like 6_chatbot_with_history_using_messages.py
+    chain       report, then a summary of the report (two calls), like ostrOutputParser.py
+    structured  Review extraction through tool calling, like 02_with_structured_output_typeddict.py
+
+Clients (--client):
+    http        pooled httpx client from common.http_transport, same request bodies (always available)
+    hub         huggingface_hub InferenceClient.chat_completion()
+    langchain   ChatHuggingFace(HuggingFaceEndpoint(endpoint_url=...)), incl. with_structured_output()
+
+Comparing http with hub / langchain shows how much of the latency is the client stack.
+The fake server (common/fake_hf_server.py) is started in-process unless --url is given.
+
+Usage:
+    python common/benchmark_load.py
+    python common/benchmark_load.py --client langchain --concurrency 16 --requests 400 --stream
+    python common/benchmark_load.py --patterns single chain --ttft 0.3 --rate-limit-rate 0.05
+    python common/benchmark_load.py --url http://127.0.0.1:8089 --json load.json
+'''
+import argparse
+import itertools
+import json
+import pathlib
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Optional
+
+# typing_extensions.TypedDict, because pydantic rejects typing.TypedDict before Python 3.12
+from typing_extensions import TypedDict
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from common.fake_hf_server import FakeServerConfig, start_server
+from common.http_transport import TransportConfig, build_httpx_client, install
+
+MODEL = "Qwen/Qwen2.5-72B-Instruct"
+
+REVIEW_TEXT = ("I recently upgraded to the Samsung Galaxy S24 Ultra. The Snapdragon 8 Gen 3 is fast and "
+               "the 5000mAh battery lasts all day, but it is heavy and One UI still ships with bloatware.")
+
+
+class Review(TypedDict):
+    key_themes: Annotated[list[str], "Write down all the key themes mentioned in  the review"]
+    summary: Annotated[str, "A brief summary of the review "]
+    sentiment: Annotated[str, "A brief sentiment of the review , either Positive , Negative or Neutral"]
+    pros: Optional[Annotated[list[str], "List down the pros mentioned in the review"]]
+    cons: Optional[Annotated[list[str], "List down the cons mentioned in the review"]]
+    name: Optional[Annotated[str, "Name of the person who reviewed the product"]]
+
+
+def review_tool() -> dict:
+    """OpenAI tool definition for Review, as with_structured_output() sends it."""
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    return convert_to_openai_tool(Review)
+
+
+def history_messages(turns: int) -> list[tuple[str, str]]:
+    messages = [("system", "You are a helpful assistant.")]
+    for i in range(turns):
+        messages.append(("human", f"Question {i}: what changed in LangChain messages since the last version?"))
+        messages.append(("ai", "Messages are typed objects now; " * 12))
+    return messages
+
+
+# ---------- Clients ----------
+# Each client offers chat(messages) -> (text, ttft) and structured(messages) -> (dict, ttft)
+# messages are (role, content) tuples; ttft is None unless streaming
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class HttpClient:
+    """Raw chat-completion requests over one pooled httpx client."""
+
+    def __init__(self, url: str, stream: bool, max_tokens: int, concurrency: int):
+        self.url = f"{url.rstrip('/')}/v1/chat/completions"
+        self.stream = stream
+        self.max_tokens = max_tokens
+        self.client = build_httpx_client(TransportConfig(max_connections=concurrency, max_keepalive=concurrency,
+                                                         verify=False))
+        self.tool = review_tool()
+
+    def _body(self, messages, **extra) -> dict:
+        return {"model": MODEL, "max_tokens": self.max_tokens, "temperature": 0.7, "stream": self.stream,
+                "messages": [{"role": _ROLES[role], "content": content} for role, content in messages], **extra}
+
+    def _send(self, body: dict) -> tuple[dict, float | None]:
+        if not self.stream:
+            response = self.client.post(self.url, json=body)
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"], None
+        start = time.perf_counter()
+        ttft = None
+        content, arguments = [], []
+        with self.client.stream("POST", self.url, json=body) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data:") or line.endswith("[DONE]"):
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                delta = json.loads(line[5:])["choices"][0]["delta"]
+                content.append(delta.get("content") or "")
+                for call in delta.get("tool_calls") or []:
+                    arguments.append(call["function"].get("arguments") or "")
+        message = {"content": "".join(content)}
+        if arguments:
+            message["tool_calls"] = [{"function": {"arguments": "".join(arguments)}}]
+        return message, ttft
+
+    def chat(self, messages):
+        message, ttft = self._send(self._body(messages))
+        return message["content"], ttft
+
+    def structured(self, messages):
+        name = self.tool["function"]["name"]
+        message, ttft = self._send(self._body(messages, tools=[self.tool],
+                                              tool_choice={"type": "function", "function": {"name": name}}))
+        return json.loads(message["tool_calls"][0]["function"]["arguments"]), ttft
+
+
+class HubClient(HttpClient):
+    """The same requests through huggingface_hub.InferenceClient, on the pooled transport."""
+
+    def __init__(self, url: str, stream: bool, max_tokens: int, concurrency: int):
+        from huggingface_hub import InferenceClient
+
+        install(TransportConfig(max_connections=concurrency, max_keepalive=concurrency, verify=False), force=True)
+        self.inference = InferenceClient(base_url=url, token="fake")
+        self.stream = stream
+        self.max_tokens = max_tokens
+        self.tool = review_tool()
+
+    def _send(self, body: dict) -> tuple[dict, float | None]:
+        body = dict(body)
+        if not self.stream:
+            output = self.inference.chat_completion(**body)
+            message = output.choices[0].message
+            # Why: The hub parses arguments into a dict for some servers and leaves a JSON string for others
+            calls = [{"function": {"arguments": c.function.arguments if isinstance(c.function.arguments, str)
+                                   else json.dumps(c.function.arguments)}} for c in message.tool_calls or []]
+            return {"content": message.content or "", "tool_calls": calls}, None
+        start = time.perf_counter()
+        ttft = None
+        content, arguments = [], []
+        for chunk in self.inference.chat_completion(**body):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            content.append(delta.content or "")
+            for call in delta.tool_calls or []:
+                arguments.append(call.function.arguments or "")
+        message = {"content": "".join(content)}
+        if arguments:
+            message["tool_calls"] = [{"function": {"arguments": "".join(arguments)}}]
+        return message, ttft
+
+
+class LangChainClient:
+    """ChatHuggingFace over HuggingFaceEndpoint, pointed at the fake server."""
+
+    def __init__(self, url: str, stream: bool, max_tokens: int, concurrency: int):
+        from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
+        install(TransportConfig(max_connections=concurrency, max_keepalive=concurrency, verify=False), force=True)
+        llm = HuggingFaceEndpoint(endpoint_url=url, task="text-generation", max_new_tokens=max_tokens,
+                                  temperature=0.7, huggingfacehub_api_token="fake")
+        # model_id given up front, so ChatHuggingFace does not look the endpoint up on the Hub
+        self.model = ChatHuggingFace(llm=llm, model_id=MODEL)
+        self.extractor = self.model.with_structured_output(Review)
+        self.stream = stream
+
+    def chat(self, messages):
+        if not self.stream:
+            return self.model.invoke(messages).content, None
+        start = time.perf_counter()
+        ttft = None
+        parts = []
+        for chunk in self.model.stream(messages):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            parts.append(chunk.content)
+        return "".join(parts), ttft
+
+    def structured(self, messages):
+        if not self.stream:
+            return self.extractor.invoke(messages), None
+        start = time.perf_counter()
+        ttft = None
+        result = None
+        for partial in self.extractor.stream(messages):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            result = partial
+        return result, ttft
+
+
+CLIENTS = {"http": HttpClient, "hub": HubClient, "langchain": LangChainClient}
+
+
+# ---------- Patterns ----------
+# Each returns (model calls made, ttft of the first call)
+
+def single(client, args):
+    _, ttft = client.chat([("human", "What is the capital of India ?")])
+    return 1, ttft
+
+
+def history(client, args):
+    messages = history_messages(args.history_turns) + [("human", "And what about chat prompt templates?")]
+    _, ttft = client.chat(messages)
+    return 1, ttft
+
+
+def chain(client, args):
+    report, ttft = client.chat([("human", "Make a detailed report on the GenAI")])
+    client.chat([("human", f"write a 5 line summary of the following report: {report}")])
+    return 2, ttft
+
+
+def structured(client, args):
+    data, ttft = client.structured([("human", REVIEW_TEXT)])
+    if not isinstance(data, dict) or "summary" not in data:
+        raise ValueError(f"structured output missing fields: {data!r}")
+    return 1, ttft
+
+
+PATTERNS = {"single": single, "history": history, "chain": chain, "structured": structured}
+
+
+# ---------- Runner ----------
+
+def _error_name(error: Exception) -> str:
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return f"HTTP {status}" if status else type(error).__name__
+
+
+# Warm-up calls tried per pattern before measuring, until one succeeds
+WARMUP_ATTEMPTS = 5
+
+
+def percentile(q: list[float], p: int) -> float:
+    return q[p - 1] if q else float("nan")
+
+
+def run_pattern(name: str, client, args) -> dict:
+    """Run args.requests operations of one pattern with args.concurrency workers."""
+    pattern = PATTERNS[name]
+    # Warm-up: connections and lazy imports are not part of the numbers
+    # Why: With --error-rate a single warm-up call can fail; that must not abort the run,
+    #      so retry a few times and move on even if none succeeded
+    for _ in range(WARMUP_ATTEMPTS):
+        try:
+            pattern(client, args)
+            break
+        except Exception:
+            continue
+
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, ttfts, errors = [], [], Counter()
+    calls = 0
+
+    def worker():
+        nonlocal calls
+        while next(counter) < args.requests:
+            start = time.perf_counter()
+            try:
+                made, ttft = pattern(client, args)
+            except Exception as error:
+                with lock:
+                    errors[_error_name(error)] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                calls += made
+                if ttft is not None:
+                    ttfts.append(ttft)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - start
+
+    q = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "pattern": name,
+        "ok": len(latencies),
+        "errors": dict(errors),
+        "p50_ms": percentile(q, 50) * 1e3,
+        "p95_ms": percentile(q, 95) * 1e3,
+        "p99_ms": percentile(q, 99) * 1e3,
+        "ttft_p50_ms": statistics.median(ttfts) * 1e3 if ttfts else None,
+        "ops_per_s": len(latencies) / wall,
+        "calls_per_s": calls / wall,
+        "wall_s": wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--client", choices=sorted(CLIENTS), default="http")
+    parser.add_argument("--patterns", nargs="+", choices=list(PATTERNS), default=list(PATTERNS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Operations per pattern (a chain is one operation)")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and report time to first token")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--history-turns", type=int, default=10)
+    parser.add_argument("--url", help="Use an already running fake server instead of starting one")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    server_args = parser.add_argument_group("in-process fake server")
+    server_args.add_argument("--ttft", type=float, default=0.05)
+    server_args.add_argument("--token-delay", type=float, default=0.002)
+    server_args.add_argument("--error-rate", type=float, default=0.0)
+    server_args.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_server(FakeServerConfig(ttft=args.ttft, token_delay=args.token_delay, tokens=args.max_tokens,
+                                               error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                                               seed=0))
+        url = server.url
+    try:
+        client = CLIENTS[args.client](url, args.stream, args.max_tokens, args.concurrency)
+    except ImportError as error:
+        sys.exit(f"--client {args.client} needs a package that is not installed: {error}")
+
+    print(f"client={args.client} concurrency={args.concurrency} requests={args.requests} "
+          f"stream={args.stream} server={url}\n")
+    print(f"{'pattern':<11} {'ok':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'ttft p50':>9} "
+          f"{'ops/s':>8} {'calls/s':>8}  errors")
+    results = []
+    for name in args.patterns:
+        result = run_pattern(name, client, args)
+        results.append(result)
+        ttft = f"{result['ttft_p50_ms']:7.1f}ms" if result["ttft_p50_ms"] is not None else f"{'-':>9}"
+        print(f"{name:<11} {result['ok']:>5} {result['p50_ms']:7.1f}ms {result['p95_ms']:7.1f}ms "
+              f"{result['p99_ms']:7.1f}ms {ttft} {result['ops_per_s']:8.1f} {result['calls_per_s']:8.1f}  "
+              f"{', '.join(f'{k}: {v}' for k, v in sorted(result['errors'].items())) or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"client": args.client, "concurrency": args.concurrency, "stream": args.stream,
+                       "server": vars(server.config) if server else url, "results": results}, f, indent=2)
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+'''
+Cold-start import cost of the repo's entry points, before vs after the lazy factory
+
+For each script, the top-level imports are pulled out of its source (nothing is
+executed, so no prompts, network or Streamlit server) and timed in a fresh
+interpreter with `python -X importtime`:
+
+    after   the script's imports as they are now
+    before  simulated: the same imports plus `import langchain_huggingface`,
+            which is what the scripts paid at startup before
+            common/model_factory.py. The original scripts are not run.
+
+Each variant runs --repeat times and the fastest total is reported, together
+with the heaviest top-level packages from that run.
+
+Usage:
+    python common/benchmark_startup.py
+    python common/benchmark_startup.py --repeat 5 --top 8 Langchain_prompts/4_chatbot_with_history.py
+'''
+import argparse
+import ast
+import pathlib
+import subprocess
+import sys
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+ENTRY_POINTS = [
+    "Langchain_prompts/1_prompt_ui.py",
+    "Langchain_prompts/2_Dynamic_prompt_ui.py",
+    "Langchain_prompts/3_chatbot_without_context.py",
+    "Langchain_prompts/4_chatbot_with_history.py",
+    "Langchain_prompts/6_chatbot_with_history_using_messages.py",
+    "Langchain_Output_Parsers/w/ostrOutputParser.py",
+    "1.LLMs/chatting_with_llm.py",
+    "Langchain_prompts/5_messages_.py",
+    "Langchain_StructuredOutputs/01_with_structured_output_typeddict.py",
+    "Langchain_StructuredOutputs/02_with_structured_output_typeddict.py",
+    "Langchain_StructuredOutputs/03_with_structured_output_pydantic.py",
+]
+
+
+def top_level_imports(path: pathlib.Path) -> list[str]:
+    """Source of the import statements at module level, in file order."""
+    source = path.read_text(encoding="utf-8")
+    tree = ast.parse(source)
+    return [ast.get_source_segment(source, node) for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_time(statements: list[str], script_dir: pathlib.Path) -> tuple[float, dict[str, int]]:
+    """Run the imports in a fresh interpreter; return (total seconds, microseconds per top-level package)."""
+    # Same sys.path a script gets: its own folder first, then the repo root it appends
+    prelude = f"import sys; sys.path[:0] = [{str(script_dir)!r}, {str(REPO_ROOT)!r}]"
+    code = "\n".join([prelude, *statements])
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=script_dir)
+    packages: dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level entries (no indentation) add up to the wall total without double counting
+        if name.startswith(" ") and not name.startswith("  "):
+            us = int(cumulative)
+            total_us += us
+            root = name.strip().split(".")[0]
+            packages[root] = packages.get(root, 0) + us
+    if proc.returncode != 0:
+        missing = proc.stderr.strip().splitlines()[-1]
+        raise RuntimeError(missing)
+    return total_us / 1e6, packages
+
+
+def best_of(statements, script_dir, repeat: int) -> tuple[float, dict[str, int]]:
+    # Why: The first run also pays for cold .pyc reads; the minimum is the stable number
+    return min((import_time(statements, script_dir) for _ in range(repeat)), key=lambda run: run[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scripts", nargs="*", help="Entry points relative to the repo root (default: all converted scripts)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to list per script")
+    args = parser.parse_args()
+
+    print("* before = current imports + a simulated `import langchain_huggingface`, not the original scripts")
+    print(f"{'entry point':<68} {'before*':>8} {'after':>8} {'saved':>8}")
+    for relative in args.scripts or ENTRY_POINTS:
+        path = REPO_ROOT / relative
+        statements = top_level_imports(path)
+        try:
+            after, packages = best_of(statements, path.parent, args.repeat)
+            before, _ = best_of(statements + ["import langchain_huggingface"], path.parent, args.repeat)
+        except RuntimeError as exc:
+            print(f"{relative:<68} skipped ({exc})")
+            continue
+        print(f"{relative:<68} {before:>7.2f}s {after:>7.2f}s {before - after:>7.2f}s")
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print("    heaviest now: " + ", ".join(f"{name} {us / 1e3:.0f}ms" for name, us in heaviest))
+
+
+if __name__ == "__main__":
+    main()
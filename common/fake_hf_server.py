@@ -0,0 +1,269 @@
+'''
+Local stand-in for the Hugging Face inference endpoint
+
+Speaks the two protocols the repo's clients use, so HuggingFaceEndpoint,
+ChatHuggingFace and InferenceClient can run offline against it:
+
+    POST .../v1/chat/completions   OpenAI-style chat completion (InferenceClient.chat_completion,
+                                   ChatHuggingFace), incl. SSE streaming and tool calls
+                                   (with_structured_output)
+    POST anything else             TGI text generation {"inputs", "parameters", "stream"}
+                                   (HuggingFaceEndpoint.invoke / .stream)
+
+Timing and failures are configurable: --ttft before the first token,
+--token-delay between tokens, --tokens per answer, --error-rate for HTTP 500s
+and --rate-limit-rate for HTTP 429s with Retry-After.
+
+Usage:
+    python common/fake_hf_server.py --port 8089 --ttft 0.2 --token-delay 0.01
+    llm = HuggingFaceEndpoint(endpoint_url="http://127.0.0.1:8089", task="text-generation", max_new_tokens=64)
+    client = InferenceClient(base_url="http://127.0.0.1:8089")
+'''
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("the model answers every question with a short and confident sentence about "
+         "langchain hugging face qwen tokens latency throughput and batching").split()
+
+
+@dataclass
+class FakeServerConfig:
+    ttft: float = 0.1               # seconds before the first token
+    token_delay: float = 0.01       # seconds between tokens
+    tokens: int = 32                # answer length when the request does not ask for fewer
+    error_rate: float = 0.0         # fraction of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0    # fraction of requests answered with HTTP 429
+    model: str = "Qwen/Qwen2.5-72B-Instruct"
+    seed: int | None = None
+
+
+def fake_value(schema: dict, rng: random.Random):
+    """A value matching a JSON Schema fragment, enough for tool-call arguments."""
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"] or schema["anyOf"]
+        return fake_value(options[0], rng)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "string")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {name: fake_value(sub, rng) for name, sub in properties.items()}
+    if kind == "array":
+        return [fake_value(schema.get("items", {}), rng) for _ in range(2)]
+    if kind == "integer":
+        return rng.randint(1, 5)
+    if kind == "number":
+        return round(rng.uniform(1, 5), 1)
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return " ".join(rng.choices(WORDS, k=4))
+
+
+class FakeHFHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # One write per response part with Nagle off, so delays are the configured ones only
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    @property
+    def config(self) -> FakeServerConfig:
+        return self.server.config
+
+    def log_message(self, *args):
+        pass
+
+    # ---------- plumbing ----------
+
+    def _send_json(self, status: int, body, headers: dict | None = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_sse(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _sse(self, payload) -> None:
+        data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode()
+        # HTTP/1.1 chunked framing keeps the connection reusable after the stream
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_sse(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _injected_failure(self) -> bool:
+        roll = self.server.rng.random()
+        if roll < self.config.rate_limit_rate:
+            self._send_json(429, {"error": "Rate limit reached"}, {"Retry-After": "1"})
+            return True
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self._send_json(500, {"error": "Injected server error"})
+            return True
+        return False
+
+    def _tokens(self, limit: int | None):
+        """Yield answer words, sleeping for TTFT before the first and token_delay between the rest."""
+        n = min(limit or self.config.tokens, self.config.tokens)
+        time.sleep(self.config.ttft)
+        for i in range(n):
+            if i:
+                time.sleep(self.config.token_delay)
+            yield ("" if i == 0 else " ") + self.server.rng.choice(WORDS)
+
+    # ---------- routes ----------
+
+    def do_GET(self):
+        # InferenceClient / HuggingFaceEndpoint may probe /info or /health
+        self._send_json(200, {"model_id": self.config.model, "status": "ok"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+        if self._injected_failure():
+            return
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat_completion(body)
+        else:
+            self._text_generation(body)
+
+    def _chat_completion(self, body: dict) -> None:
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model") or self.config.model
+        prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in body.get("messages", []))
+        tools = body.get("tools") or []
+        base = {"id": completion_id, "created": created, "model": model, "system_fingerprint": "fake-hf"}
+
+        if tools:
+            # Structured output: answer with a call to the requested (or first) tool
+            choice = body.get("tool_choice")
+            name = (choice.get("function", {}).get("name") if isinstance(choice, dict) else None) or tools[0]["function"]["name"]
+            tool = next((t for t in tools if t["function"]["name"] == name), tools[0])
+            time.sleep(self.config.ttft)
+            arguments = json.dumps(fake_value(tool["function"].get("parameters", {}), self.server.rng))
+            call = {"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                    "function": {"name": name, "arguments": arguments}}
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(arguments) // 4,
+                     "total_tokens": prompt_tokens + len(arguments) // 4}
+            if body.get("stream"):
+                self._start_sse()
+                pieces = [arguments[i:i + 16] for i in range(0, len(arguments), 16)]
+                for i, piece in enumerate(pieces):
+                    if i:
+                        time.sleep(self.config.token_delay)
+                    delta_call = {"index": 0, "function": {"arguments": piece}}
+                    if i == 0:
+                        delta_call.update(id=call["id"], type="function")
+                        delta_call["function"]["name"] = name
+                    self._sse({**base, "object": "chat.completion.chunk",
+                               "choices": [{"index": 0, "delta": {"role": "assistant", "tool_calls": [delta_call]},
+                                            "finish_reason": None, "logprobs": None}]})
+                self._sse({**base, "object": "chat.completion.chunk", "usage": usage,
+                           "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls", "logprobs": None}]})
+                self._sse("[DONE]")
+                self._end_sse()
+            else:
+                self._send_json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [{
+                    "index": 0, "finish_reason": "tool_calls", "logprobs": None,
+                    "message": {"role": "assistant", "content": None, "tool_calls": [call]}}]})
+            return
+
+        limit = body.get("max_tokens") or body.get("max_new_tokens")
+        if body.get("stream"):
+            self._start_sse()
+            count = 0
+            for word in self._tokens(limit):
+                count += 1
+                self._sse({**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {"role": "assistant", "content": word}, "finish_reason": None, "logprobs": None}]})
+            self._sse({**base, "object": "chat.completion.chunk",
+                       "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": count,
+                                 "total_tokens": prompt_tokens + count},
+                       "choices": [{"index": 0, "delta": {}, "finish_reason": "length", "logprobs": None}]})
+            self._sse("[DONE]")
+            self._end_sse()
+        else:
+            words = list(self._tokens(limit))
+            self._send_json(200, {**base, "object": "chat.completion",
+                                  "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                                            "total_tokens": prompt_tokens + len(words)},
+                                  "choices": [{"index": 0, "finish_reason": "length", "logprobs": None,
+                                               "message": {"role": "assistant", "content": "".join(words)}}]})
+
+    def _text_generation(self, body: dict) -> None:
+        parameters = body.get("parameters") or {}
+        limit = parameters.get("max_new_tokens")
+        if body.get("stream"):
+            self._start_sse()
+            n = min(limit or self.config.tokens, self.config.tokens)
+            text = ""
+            # Each token is sent as soon as it is "generated", so clients see the real TTFT
+            for i, word in enumerate(self._tokens(limit)):
+                text += word
+                last = i == n - 1
+                self._sse({"index": i + 1, "token": {"id": i, "text": word, "logprob": -0.1, "special": False},
+                           "generated_text": text if last else None,
+                           "details": {"finish_reason": "length", "generated_tokens": n, "seed": None}
+                           if last else None})
+            self._end_sse()
+        else:
+            text = "".join(self._tokens(limit))
+            self._send_json(200, [{"generated_text": text}])
+
+
+def start_server(config: FakeServerConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the fake server in a background thread; server.url is its base URL."""
+    config = config or FakeServerConfig()
+    server = ThreadingHTTPServer((host, port), FakeHFHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.rng = random.Random(config.seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="fake-hf-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--ttft", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--tokens", type=int, default=32)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = FakeServerConfig(ttft=args.ttft, token_delay=args.token_delay, tokens=args.tokens,
+                              error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    server = start_server(config, args.host, args.port)
+    print(f"fake HF server on {server.url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+'''
+Pooled keep-alive HTTP transport for the Hugging Face clients
+
+InferenceClient (2.ChatModels/chatmodel_hf_api.py) and HuggingFaceEndpoint (every
+LangChain script) both send their requests through huggingface_hub's shared
+HTTP session. By default that session is whatever huggingface_hub builds, with
+no say over pool size, keep-alive or timeouts. install() replaces it with one
+configured client, so every call in the process reuses warm connections
+instead of paying a TCP + TLS handshake:
+
+    from common.http_transport import TransportConfig, install
+    install(TransportConfig(max_connections=32, http2=True))
+    client = InferenceClient(token=hf_token)          # uses the pool
+    model = chat_model("qwen-72b", transport=TransportConfig())   # so does ChatHuggingFace
+
+Nothing is installed unless an entry point asks for it: install() changes the
+HTTP client of every huggingface_hub call in the process.
+
+huggingface_hub 0.x talks HTTP through requests (configure_http_backend), 1.x
+through httpx and 2.x through its fork httpx2 (set_client_factory); install()
+detects which one is in use and keeps the hub's own request hooks (auth
+headers, request ids). HTTP/2 needs the optional `h2` package
+(pip install "httpx[http2]") and is skipped with a warning when it is missing
+or when requests is the backend.
+
+On 1.x/2.x the hub's request hooks live in the private huggingface_hub.utils._http
+module. install() only uses them on major versions it was written against
+(SUPPORTED_HUB_MAJORS) and when they are all present; otherwise it warns and
+leaves huggingface_hub's default client in place.
+'''
+import threading
+import warnings
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TransportConfig:
+    max_connections: int = 20          # open sockets across all hosts
+    max_keepalive: int = 10            # idle sockets kept warm for reuse
+    keepalive_expiry: float = 60.0     # seconds an idle socket is kept
+    http2: bool = False
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0        # generation can take a while before the first byte
+    # Per-host connection caps, e.g. {"router.huggingface.co": 8}
+    per_host_limits: dict[str, int] = field(default_factory=dict)
+    retries: int = 0                   # connection-level retries (not HTTP 5xx)
+    verify: bool | str = True          # False, or a CA bundle path for private endpoints
+
+
+def _http2_available(config: TransportConfig) -> bool:
+    if not config.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        warnings.warn("http2=True but the 'h2' package is not installed; using HTTP/1.1", stacklevel=3)
+        return False
+    return True
+
+
+def _httpx_options(config: TransportConfig, max_connections: int, httpx) -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(config.max_keepalive, max_connections),
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        "http2": _http2_available(config),
+        "retries": config.retries,
+        "verify": config.verify,
+    }
+
+
+def _client_kwargs(config: TransportConfig, httpx, transport_cls, event_hooks) -> dict:
+    return {
+        "transport": transport_cls(**_httpx_options(config, config.max_connections, httpx)),
+        # One transport, and so one pool, per capped host
+        # Why: httpx.Limits applies to the whole client; mounts give each host its own ceiling
+        "mounts": {f"all://{host}": transport_cls(**_httpx_options(config, limit, httpx))
+                   for host, limit in config.per_host_limits.items()},
+        "timeout": httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+        "event_hooks": event_hooks or {},
+        "follow_redirects": True,
+    }
+
+
+def build_httpx_client(config: TransportConfig | None = None, httpx=None, event_hooks: dict | None = None):
+    """httpx.Client with the pool, keep-alive, HTTP/2 and timeouts from config.
+
+    httpx: the module to build with (httpx or httpx2); defaults to httpx.
+    """
+    if httpx is None:
+        import httpx
+    config = config or TransportConfig()
+    return httpx.Client(**_client_kwargs(config, httpx, httpx.HTTPTransport, event_hooks))
+
+
+def build_async_httpx_client(config: TransportConfig | None = None, httpx=None, event_hooks: dict | None = None):
+    """httpx.AsyncClient counterpart, used by AsyncInferenceClient / model.ainvoke()."""
+    if httpx is None:
+        import httpx
+    config = config or TransportConfig()
+    return httpx.AsyncClient(**_client_kwargs(config, httpx, httpx.AsyncHTTPTransport, event_hooks))
+
+
+def build_requests_session(config: TransportConfig | None = None):
+    """requests.Session with a sized urllib3 pool and default timeouts (HTTP/1.1 only)."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    config = config or TransportConfig()
+
+    class _Session(requests.Session):
+        def request(self, method, url, **kwargs):
+            # requests has no session-wide timeout; without one a stalled socket hangs forever
+            kwargs.setdefault("timeout", (config.connect_timeout, config.read_timeout))
+            return super().request(method, url, **kwargs)
+
+    session = _Session()
+    session.verify = config.verify
+    # pool_maxsize is per host in urllib3, so it doubles as the default per-host cap
+    adapter = HTTPAdapter(pool_connections=config.max_keepalive, pool_maxsize=config.max_connections,
+                          max_retries=config.retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    for host, limit in config.per_host_limits.items():
+        host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=limit, pool_block=True,
+                                   max_retries=config.retries)
+        session.mount(f"https://{host}", host_adapter)
+        session.mount(f"http://{host}", host_adapter)
+    return session
+
+
+# huggingface_hub major versions whose private _http hooks install() knows
+SUPPORTED_HUB_MAJORS = (0, 1, 2)
+
+_installed: TransportConfig | None = None
+_install_lock = threading.Lock()
+
+
+def _hub_hooks(hf_http):
+    """(httpx module, sync hooks, async hooks) from huggingface_hub's private _http module."""
+    httpx = getattr(hf_http, "httpx2", None) or hf_http.httpx
+    hooks = {"request": [hf_http.hf_request_event_hook]}
+    async_hooks = {"request": [hf_http.async_hf_request_event_hook]}
+    if hasattr(hf_http, "async_hf_response_event_hook"):
+        async_hooks["response"] = [hf_http.async_hf_response_event_hook]
+    return httpx, hooks, async_hooks
+
+
+def install(config: TransportConfig | None = None, force: bool = False) -> TransportConfig | None:
+    """Route all huggingface_hub HTTP traffic in this process through one configured pool.
+
+    Safe to call many times: only the first call (or one with force=True) takes effect.
+    Returns the config in use, or None when this huggingface_hub version is not
+    supported and its default client was kept (a warning says why).
+    """
+    global _installed
+    with _install_lock:
+        if _installed is not None and not force:
+            return _installed
+        config = config or TransportConfig()
+        import huggingface_hub
+
+        version = huggingface_hub.__version__
+        major = int(version.split(".")[0])
+        if major not in SUPPORTED_HUB_MAJORS:
+            warnings.warn(f"huggingface_hub {version} is not supported by common.http_transport; "
+                          "keeping its default HTTP client", stacklevel=2)
+            return None
+
+        if hasattr(huggingface_hub, "set_client_factory"):
+            # huggingface_hub >= 1.0: build with the same httpx flavour and hooks the hub uses
+            # Why: Without the hub's hooks, requests would lose auth headers and request ids,
+            #      so a hub that moved them keeps its own client instead
+            try:
+                from huggingface_hub.utils import _http as hf_http
+
+                httpx, hooks, async_hooks = _hub_hooks(hf_http)
+            except (ImportError, AttributeError) as exc:
+                warnings.warn(f"huggingface_hub {version} internals changed ({exc}); "
+                              "keeping its default HTTP client", stacklevel=2)
+                return None
+            huggingface_hub.set_client_factory(lambda: build_httpx_client(config, httpx, hooks))
+            huggingface_hub.set_async_client_factory(lambda: build_async_httpx_client(config, httpx, async_hooks))
+        else:
+            # huggingface_hub < 1.0 (requests); the async client keeps using aiohttp
+            if config.http2:
+                warnings.warn("http2 is not supported by the requests backend; using HTTP/1.1", stacklevel=2)
+            huggingface_hub.configure_http_backend(backend_factory=lambda: build_requests_session(config))
+        _installed = config
+        return config
+
+
+def installed_config() -> TransportConfig | None:
+    """Config passed to install(), or None if the default huggingface_hub session is in use."""
+    return _installed
@@ -0,0 +1,261 @@
+'''
+Per-call latency and token metrics for every chat model call, via LangChain callbacks
+
+One line at the top of an entry point turns it on for every model.invoke(),
+model.stream(), chain and ResponseCache hit in the process:
+
+    from common import metrics
+    metrics.enable()
+
+Recorded per call, labelled by model id and cache status (none / miss / memory / disk):
+    llm_request_latency_seconds      wall time from request to last token
+    llm_time_to_first_token_seconds  streaming calls only
+    llm_input_tokens, llm_output_tokens   from the provider's usage data, when it reports it
+    llm_requests_total               by status (ok / error)
+
+Export:
+    metrics.REGISTRY.prometheus_text()   Prometheus text exposition format
+    metrics.REGISTRY.snapshot()          dict, also written to a JSON file periodically
+
+Configured through environment variables so no script needs more than the one line:
+    CHAT_METRICS=0                 disable (enable() becomes a no-op; no handler is attached)
+    CHAT_METRICS_JSON=path.json    write a JSON snapshot every CHAT_METRICS_INTERVAL seconds (default 30) and at exit
+    CHAT_METRICS_PORT=9464         serve /metrics for Prometheus to scrape
+'''
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, Prometheus style."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple, label_names: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series: dict[tuple, list] = {}   # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, labels: tuple) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        # Only the first bucket that fits is incremented; buckets are made cumulative on export
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def export(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            label_text = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            running = 0
+            for bound, count in zip(self.buckets, series):
+                running += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {running}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series[-1]}")
+        return lines
+
+    def snapshot(self) -> list[dict]:
+        out = []
+        for labels, series in sorted(self._series.items()):
+            count = series[-1]
+            out.append({
+                "labels": dict(zip(self.label_names, labels)),
+                "count": count,
+                "sum": series[-2],
+                "mean": series[-2] / count if count else 0.0,
+                "buckets": dict(zip(map(str, self.buckets), series[:len(self.buckets)])),
+            })
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = Histogram("llm_request_latency_seconds", "Wall time of one chat model call",
+                                 LATENCY_BUCKETS, ("model", "cache"))
+        self.ttft = Histogram("llm_time_to_first_token_seconds", "Time until the first streamed token",
+                              LATENCY_BUCKETS, ("model",))
+        self.input_tokens = Histogram("llm_input_tokens", "Prompt tokens per call", TOKEN_BUCKETS, ("model",))
+        self.output_tokens = Histogram("llm_output_tokens", "Generated tokens per call", TOKEN_BUCKETS, ("model",))
+        self.requests: dict[tuple, int] = {}   # (model, cache, status) -> count
+
+    def record(self, model: str, latency: float, cache: str = "none", status: str = "ok",
+               ttft: float | None = None, input_tokens: int | None = None, output_tokens: int | None = None) -> None:
+        with self._lock:
+            self.latency.observe(latency, (model, cache))
+            if ttft is not None:
+                self.ttft.observe(ttft, (model,))
+            if input_tokens is not None:
+                self.input_tokens.observe(input_tokens, (model,))
+            if output_tokens is not None:
+                self.output_tokens.observe(output_tokens, (model,))
+            key = (model, cache, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            lines = ["# HELP llm_requests_total Chat model calls", "# TYPE llm_requests_total counter"]
+            for (model, cache, status), count in sorted(self.requests.items()):
+                lines.append(f'llm_requests_total{{model="{model}",cache="{cache}",status="{status}"}} {count}')
+            for histogram in (self.latency, self.ttft, self.input_tokens, self.output_tokens):
+                lines.extend(histogram.export())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "requests": [{"model": m, "cache": c, "status": s, "count": n}
+                             for (m, c, s), n in sorted(self.requests.items())],
+                **{h.name: h.snapshot() for h in (self.latency, self.ttft, self.input_tokens, self.output_tokens)},
+            }
+
+    def write_json(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)  # readers never see a half-written file
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _model_id(serialized: dict | None, metadata: dict | None, invocation_params: dict | None) -> str:
+    metadata = metadata or {}
+    params = invocation_params or {}
+    return str(metadata.get("ls_model_name") or params.get("model") or params.get("model_id")
+               or params.get("repo_id") or (serialized or {}).get("name") or "unknown")
+
+
+class MetricsCallback(BaseCallbackHandler):
+    """Times each LLM run from start to end and reports it to a MetricsRegistry."""
+
+    # Why: Inline handlers run in the caller's thread, so timestamps are taken when events happen
+    run_inline = True
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.registry = registry
+        self._runs: dict = {}   # run_id -> [start, first token time, model, cache]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, invocation_params=None, **kwargs):
+        self._start(run_id, serialized, metadata, invocation_params)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, invocation_params=None, **kwargs):
+        self._start(run_id, serialized, metadata, invocation_params)
+
+    def _start(self, run_id, serialized, metadata, invocation_params):
+        cache = (metadata or {}).get("response_cache", "none")
+        self._runs[run_id] = [time.perf_counter(), None, _model_id(serialized, metadata, invocation_params), cache]
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and run[1] is None:
+            run[1] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        start, first_token, model, cache = run
+        input_tokens = output_tokens = None
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            input_tokens, output_tokens = usage.get("input_tokens"), usage.get("output_tokens")
+        else:
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            input_tokens, output_tokens = token_usage.get("prompt_tokens"), token_usage.get("completion_tokens")
+        if message is not None:
+            cache = message.response_metadata.get("cache", cache)
+        self.registry.record(model, time.perf_counter() - start, cache=cache,
+                             ttft=None if first_token is None else first_token - start,
+                             input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            self.registry.record(run[2], time.perf_counter() - run[0], cache=run[3], status="error")
+
+
+_enabled = None   # ContextVar whose default is the handler, once enable() has run
+_enable_lock = threading.Lock()
+
+
+def enable(json_path: str | None = None, interval: float | None = None, port: int | None = None) -> bool:
+    """Attach MetricsCallback to every LangChain run in the process. Returns False if disabled by env.
+
+    Safe to call on every Streamlit rerun; only the first call does anything.
+    """
+    global _enabled
+    if os.environ.get("CHAT_METRICS", "1") == "0":
+        return False
+    with _enable_lock:
+        if _enabled is not None:
+            return True
+        from langchain_core.tracers.context import register_configure_hook
+
+        # The handler is the ContextVar's default, so every thread sees it without copying contexts
+        _enabled = contextvars.ContextVar("chat_metrics_callback", default=MetricsCallback())
+        register_configure_hook(_enabled, inheritable=True)
+
+        json_path = json_path or os.environ.get("CHAT_METRICS_JSON")
+        if json_path:
+            start_json_snapshots(json_path, interval or float(os.environ.get("CHAT_METRICS_INTERVAL", 30)))
+        port = port or (int(os.environ["CHAT_METRICS_PORT"]) if os.environ.get("CHAT_METRICS_PORT") else None)
+        if port:
+            serve_prometheus(port)
+    return True
+
+
+def enabled() -> bool:
+    return _enabled is not None
+
+
+def start_json_snapshots(path: str, interval: float = 30.0, registry: MetricsRegistry = REGISTRY) -> threading.Thread:
+    """Write registry.snapshot() to path every interval seconds and once more at exit."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            registry.write_json(path)
+
+    thread = threading.Thread(target=loop, name="metrics-json", daemon=True)
+    thread.start()
+    atexit.register(registry.write_json, path)
+    return thread
+
+
+def serve_prometheus(port: int, registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve GET /metrics in a background thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.prometheus_text().encode()
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
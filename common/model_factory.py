@@ -0,0 +1,159 @@
+'''
+Lazy-import provider factory for chat models and embeddings
+
+Every script used to import langchain_huggingface (and through it transformers
+and torch) at the top and copy the same HuggingFaceEndpoint settings by hand.
+This module keeps those settings in one place and defers the heavy imports
+until a model is actually used:
+
+    model = chat_model("qwen-72b", temperature=0.3)   # instant, nothing heavy imported yet
+    model.invoke("Hello")                              # imports + builds ChatHuggingFace here
+
+    # Opt in to the pooled keep-alive HTTP client of common/http_transport.py
+    model = chat_model("qwen-72b", transport=TransportConfig(max_connections=32))
+
+Names:
+    chat models  - "qwen-72b" (HF Inference API), "qwen-0.5b-local" (local pipeline)
+    embeddings   - "minilm" (sentence-transformers/all-MiniLM-L6-v2, runs locally)
+'''
+import copy
+import threading
+
+# Model settings the scripts used to repeat by hand
+CHAT_MODELS = {
+    "qwen-72b": {
+        "provider": "endpoint",
+        "repo_id": "Qwen/Qwen2.5-72B-Instruct",
+        "task": "text-generation",
+        "temperature": 0.7,
+        "max_new_tokens": 256,
+    },
+    "qwen-0.5b-local": {
+        "provider": "pipeline",
+        "model_id": "Qwen/Qwen2.5-0.5B-Instruct",
+        "task": "text-generation",
+        "pipeline_kwargs": {"max_new_tokens": 256, "do_sample": False},
+    },
+}
+
+EMBEDDINGS = {
+    "minilm": {"model_name": "sentence-transformers/all-MiniLM-L6-v2"},
+}
+
+
+def _lookup(registry: dict, kind: str, name: str) -> dict:
+    try:
+        return copy.deepcopy(registry[name])
+    except KeyError:
+        raise KeyError(f"Unknown {kind} {name!r}; choose from {sorted(registry)}") from None
+
+
+def model_config(name: str = "qwen-72b", **overrides) -> dict:
+    """Settings for a named chat model with overrides applied, e.g. temperature=0.3.
+
+    For local pipelines, generation overrides (max_new_tokens, do_sample, ...) go
+    into pipeline_kwargs, mirroring HuggingFacePipeline.from_model_id().
+    """
+    config = _lookup(CHAT_MODELS, "chat model", name)
+    if config["provider"] == "pipeline":
+        for key in list(overrides):
+            if key not in ("model_id", "task", "pipeline_kwargs", "model_kwargs", "device"):
+                config["pipeline_kwargs"][key] = overrides.pop(key)
+    config.update(overrides)
+    return config
+
+
+def build_chat_model(name: str = "qwen-72b", transport=None, **overrides):
+    """Import langchain_huggingface and build a ChatHuggingFace right away.
+
+    transport: a common.http_transport.TransportConfig to route the endpoint's HTTP
+               traffic through one pooled client; None keeps huggingface_hub's default.
+    """
+    config = model_config(name, **overrides)
+    provider = config.pop("provider")
+    # Heavy import happens here, not at module import time
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint, HuggingFacePipeline
+
+    if provider == "endpoint":
+        if transport is not None:
+            # Opt-in only: install() swaps huggingface_hub's HTTP client for the whole process
+            from common.http_transport import install
+
+            install(transport)
+        llm = HuggingFaceEndpoint(**config)
+    else:
+        llm = HuggingFacePipeline.from_model_id(**config)
+    return ChatHuggingFace(llm=llm)
+
+
+def build_embeddings(name: str = "minilm", **overrides):
+    """Import langchain_huggingface and build HuggingFaceEmbeddings right away."""
+    config = _lookup(EMBEDDINGS, "embedding model", name)
+    config.update(overrides)
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(**config)
+
+
+class LazyModel:
+    """Stands in for a model and builds it on first attribute access.
+
+    model.invoke(), model.stream(), model.llm, ... all work as usual. Code that
+    needs the real object (isinstance checks, `prompt | model` pipelines) should
+    call .load() first.
+    """
+
+    def __init__(self, builder, *args, **kwargs):
+        self._builder = builder
+        self._args = args
+        self._kwargs = kwargs
+        self._model = None
+        # Streamlit and thread pools may touch the model from several threads at once
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._builder(*self._args, **self._kwargs)
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def __getattr__(self, attr):
+        # Only called for attributes LazyModel itself does not define
+        # Private and dunder names are never forwarded
+        # Why: copy/pickle look up __deepcopy__, __setstate__, ... on a bare instance whose
+        #      _builder/_model are not set yet; forwarding them would recurse forever
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __getstate__(self):
+        # The lock cannot be pickled or deep-copied; the copy gets a fresh one
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        state = repr(self._model) if self._model is not None else "not loaded"
+        return f"LazyModel({state})"
+
+
+def chat_model(name: str = "qwen-72b", transport=None, **overrides) -> LazyModel:
+    """Chat model by name; langchain_huggingface is imported on first use."""
+    # Validate the name now so typos fail at startup, not at the first prompt
+    model_config(name, **overrides)
+    return LazyModel(build_chat_model, name, transport=transport, **overrides)
+
+
+def embeddings(name: str = "minilm", **overrides) -> LazyModel:
+    """Embedding model by name; langchain_huggingface is imported on first use."""
+    _lookup(EMBEDDINGS, "embedding model", name)
+    return LazyModel(build_embeddings, name, **overrides)